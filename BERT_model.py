@@ -1,29 +1,39 @@
 # %%
+import argparse
 import pandas as pd
 import numpy as np
-from transformers import BertTokenizerFast, BertForSequenceClassification, Trainer, TrainingArguments
+from transformers import (BertTokenizerFast, BertForSequenceClassification, DataCollatorWithPadding, Trainer,
+                          TrainingArguments)
 from datasets import Dataset
-from sklearn.metrics import accuracy_score, f1_score, roc_auc_score, classification_report, confusion_matrix
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
-import matplotlib.pyplot as plt
-import seaborn as sns
 from pathlib import Path
 import torch
 from torch import nn
+from model_evaluation import evaluate_probabilities, print_metrics, write_metrics, report_figures, render_figures
+from prediction_cache import artifact_fingerprint
+from tokenization_cache import TOKENIZATION_CACHE_DIR, cached_map
+
+# %%
+# Reviews are tokenized without padding and each batch is padded to its own longest review by
+# DataCollatorWithPadding (most feedback is a few dozen tokens, padding everything to MAX_LENGTH spent most
+# of the compute on padding). Training batches are drawn from groups of similar length (group_by_length)
+# and the test set is sorted by length, so little padding is left even inside a batch.
+# --fixed-padding restores the old setup, every review padded to MAX_LENGTH.
+TRAINING_DATA = ['clean-data/labeled_feedback.csv', 'External_Datasets/reviews.csv']
+BERT_MODEL_NAME = 'bert-base-uncased'
+MAX_LENGTH = 128
+OUTPUT_DIR = './results'
+VISUALS_DIR = 'visuals/bert_class'
+DEFAULT_SEED = 42
 
 # %%
 # Load and preprocess external datasets
 def load_and_preprocess_external_data():
-    reviews_df = pd.read_csv('External_Datasets/reviews.csv')
+    reviews_df = pd.read_csv(TRAINING_DATA[1])
     reviews_df = reviews_df.rename(columns={'Review': 'text'})
     return reviews_df
 
-# %%
-# Load data
-data = pd.read_csv('clean-data/labeled_feedback.csv')
-external_data = load_and_preprocess_external_data()
-
 # %%
 # Map numerical sentiment to categories
 def map_sentiment(score):
@@ -34,196 +44,191 @@ def map_sentiment(score):
     else:
         return 'Positive'
 
-# Prepare datasets
-data['sentiment'] = data['p_sentiment'].apply(map_sentiment)
-data = data.rename(columns={'feedback_prepped': 'text'})
-external_data['sentiment_source'] = 'external'
-data['sentiment_source'] = 'original'
-
 # %%
-# Combine datasets
-combined_data = pd.concat([
-    data[['text', 'sentiment', 'sentiment_source']],
-    external_data[['text', 'Sentiment', 'sentiment_source']].rename(
-        columns={'Sentiment': 'sentiment'})
-], ignore_index=True)
+# Load, label and combine the datasets
+def load_data():
+    """Labeled feedback + external reviews with encoded labels. Returns (combined data, label encoder)."""
+    data = pd.read_csv(TRAINING_DATA[0])
+    external_data = load_and_preprocess_external_data()
 
-# %%
-# Encode labels
-le = LabelEncoder()
-combined_data['label'] = le.fit_transform(combined_data['sentiment'])
+    # Prepare datasets
+    data['sentiment'] = data['p_sentiment'].apply(map_sentiment)
+    data = data.rename(columns={'feedback_prepped': 'text'})
+    external_data['sentiment_source'] = 'external'
+    data['sentiment_source'] = 'original'
 
-# %%
-# Initialize tokenizer
-tokenizer = BertTokenizerFast.from_pretrained('bert-base-uncased')
+    # Combine datasets
+    combined_data = pd.concat([
+        data[['text', 'sentiment', 'sentiment_source']],
+        external_data[['text', 'Sentiment', 'sentiment_source']].rename(
+            columns={'Sentiment': 'sentiment'})
+    ], ignore_index=True)
+
+    # Encode labels
+    le = LabelEncoder()
+    combined_data['label'] = le.fit_transform(combined_data['sentiment'])
+    return combined_data, le
 
 # %%
 # Tokenize function
-def tokenize_function(examples):
-    return tokenizer(
+def tokenize_function(examples, tokenizer, fixed_padding=False):
+    """Truncated encodings plus each review's token count ('length', used for length grouping)"""
+    encoded = tokenizer(
         examples['text'],
-        padding='max_length',
+        padding='max_length' if fixed_padding else False,
         truncation=True,
-        max_length=128,
-        return_tensors='pt'
+        max_length=MAX_LENGTH,
     )
+    encoded['length'] = [sum(mask) for mask in encoded['attention_mask']]
+    return encoded
 
 # %%
-# Create dataset
-dataset = Dataset.from_pandas(combined_data)
-tokenized_dataset = dataset.map(tokenize_function, batched=True)
+# Create dataset, tokenized across worker processes and cached in cache/tokenized/ (see tokenization_cache.py)
+def tokenize_dataset(combined_data, tokenizer, fixed_padding=False, use_cache=True, cache_dir=TOKENIZATION_CACHE_DIR,
+                     num_proc=None):
+    """Tokenized Dataset of combined_data (as loaded from TRAINING_DATA), memory-mapped from the cache
+    when the training files, tokenizer and settings are unchanged"""
+    params = {'sources': artifact_fingerprint(TRAINING_DATA), 'columns': list(combined_data.columns),
+              'rows': len(combined_data), 'tokenizer': tokenizer.name_or_path, 'max_length': MAX_LENGTH,
+              'fixed_padding': fixed_padding}
+    return cached_map(lambda: Dataset.from_pandas(combined_data), tokenize_function, params, cache_dir,
+                      enabled=use_cache, num_proc=num_proc,
+                      fn_kwargs={'tokenizer': tokenizer, 'fixed_padding': fixed_padding})
 
 # %%
 # Split data
-train_indices, test_indices = train_test_split(
-    range(len(tokenized_dataset)),
-    test_size=0.2,
-    stratify=combined_data['label'],
-    random_state=42
-)
-train_dataset = tokenized_dataset.select(train_indices)
-test_dataset = tokenized_dataset.select(test_indices)
+def split_indices(labels, seed=DEFAULT_SEED):
+    """Stratified train/test row indices"""
+    return train_test_split(
+        range(len(labels)),
+        test_size=0.2,
+        stratify=labels,
+        random_state=seed
+    )
+
+def split_dataset(tokenized_dataset, labels, seed=DEFAULT_SEED):
+    """Stratified train/test split, the test set sorted by review length"""
+    train_indices, test_indices = split_indices(labels, seed)
+    train_dataset = tokenized_dataset.select(train_indices)
+    # Evaluation runs through the test set in order, so sorting it keeps each batch's lengths close
+    # (every metric below is computed from the same sorted order, so nothing needs unsorting)
+    test_dataset = tokenized_dataset.select(test_indices).sort('length')
+    return train_dataset, test_dataset
 
 # %%
 # Model initialization
-model = BertForSequenceClassification.from_pretrained(
-    'bert-base-uncased',
-    num_labels=len(le.classes_),
-    hidden_dropout_prob=0.2,
-    attention_probs_dropout_prob=0.2
-)
+def make_model(num_labels):
+    return BertForSequenceClassification.from_pretrained(
+        BERT_MODEL_NAME,
+        num_labels=num_labels,
+        hidden_dropout_prob=0.2,
+        attention_probs_dropout_prob=0.2
+    )
 
 # %%
 # Training arguments
-training_args = TrainingArguments(
-    output_dir='./results',
-    num_train_epochs=5,
-    per_device_train_batch_size=16,
-    per_device_eval_batch_size=16,
-    evaluation_strategy="steps",
-    eval_steps=100,
-    save_strategy="steps",
-    save_steps=100,
-    save_total_limit=2,
-    learning_rate=2e-5,
-    weight_decay=0.01,
-    warmup_steps=500,
-    load_best_model_at_end=True,
-    metric_for_best_model='f1',
-    greater_is_better=True,
-)
+def make_training_args(output_dir=OUTPUT_DIR, fixed_padding=False, **overrides):
+    args = dict(
+        output_dir=output_dir,
+        num_train_epochs=5,
+        per_device_train_batch_size=16,
+        per_device_eval_batch_size=16,
+        eval_strategy="steps",
+        eval_steps=100,
+        save_strategy="steps",
+        save_steps=100,
+        save_total_limit=2,
+        learning_rate=2e-5,
+        weight_decay=0.01,
+        warmup_steps=500,
+        load_best_model_at_end=True,
+        metric_for_best_model='f1',
+        greater_is_better=True,
+        # Batches of similarly long reviews (shuffled between groups), lengths read from the 'length' column
+        group_by_length=not fixed_padding,
+        length_column_name='length',
+    )
+    args.update(overrides)
+    return TrainingArguments(**args)
 
 # %%
 # Evaluation metrics
-def compute_metrics(pred):
-    labels = pred.label_ids
-    preds = pred.predictions.argmax(-1)
-    probs = torch.nn.functional.softmax(torch.tensor(pred.predictions), dim=-1).numpy()
-    
-    return {
-        'accuracy': accuracy_score(labels, preds),
-        'f1': f1_score(labels, preds, average='macro'),
-        'roc_auc': roc_auc_score(labels, probs, multi_class='ovr')
-    }
-
-# %%
-# Initialize trainer
-trainer = Trainer(
-    model=model,
-    args=training_args,
-    train_dataset=train_dataset,
-    eval_dataset=test_dataset,
-    compute_metrics=compute_metrics,
-)
-
-# %%
-# Train model
-trainer.train()
-
-# %%
-# Create directory for visuals
-Path("visuals/bert_class").mkdir(parents=True, exist_ok=True)
-
-# %%
-# Get predictions
-predictions = trainer.predict(test_dataset)
-probs = torch.nn.functional.softmax(torch.tensor(predictions.predictions), dim=-1).numpy()
-y_pred = predictions.predictions.argmax(-1)
-y_true = test_dataset['label']
+def make_compute_metrics(class_names):
+    def compute_metrics(pred):
+        probs = torch.nn.functional.softmax(torch.tensor(pred.predictions), dim=-1).numpy()
+        evaluation = evaluate_probabilities(pred.label_ids, probs, class_names)
 
-# %%
-# Plot confusion matrix
-def plot_confusion_matrix(y_test, y_pred, title, filename):
-    cm = confusion_matrix(y_test, y_pred)
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
-                xticklabels=le.classes_, yticklabels=le.classes_)
-    plt.title(title)
-    plt.xlabel('Predicted')
-    plt.ylabel('Actual')
-    plt.text(0.5, -0.1, f'Accuracy: {accuracy_score(y_test, y_pred):.2f}', 
-             ha='center', va='center', transform=plt.gca().transAxes)
-    plt.savefig(f'visuals/bert_class/{filename}.png')
-    plt.close()
-
-plot_confusion_matrix(y_true, y_pred, 'BERT Confusion Matrix', 'confusion_matrix')
-
-# %%
-# Distribution comparison
-plt.figure(figsize=(10, 6))
-sns.countplot(x=pd.Series(y_true).map({i: label for i, label in enumerate(
-    le.classes_)}), order=le.classes_, color='blue', label='Actual')
-sns.countplot(x=pd.Series(y_pred).map({i: label for i, label in enumerate(
-    le.classes_)}), order=le.classes_, color='red', alpha=0.6, label='Predicted')
-plt.title('Sentiment Distribution: Actual vs Predictions')
-plt.xlabel('Sentiment')
-plt.ylabel('Count')
-plt.legend(title='Legend')
-plt.text(0.5, -0.1, 'Blue: Actual, Red: Predicted', 
-         ha='center', va='center', transform=plt.gca().transAxes)
-plt.savefig('visuals/bert_class/distribution_comparison.png')
-plt.close()
+        return {
+            'accuracy': evaluation['accuracy'],
+            'f1': evaluation['f1_macro'],
+            'roc_auc': evaluation['roc_auc']
+        }
+    return compute_metrics
 
 # %%
-# Metrics comparison
-metrics = {
-    'BERT': {
-        'Accuracy': accuracy_score(y_true, y_pred),
-        'F1 Score': f1_score(y_true, y_pred, average='macro'),
-        'ROC-AUC': roc_auc_score(y_true, probs, multi_class='ovr')
-    }
-}
-
-metrics_df = pd.DataFrame(metrics).T.reset_index().rename(
-    columns={'index': 'Model'})
-metrics_melted = metrics_df.melt(
-    id_vars='Model', var_name='Metric', value_name='Score')
-
-plt.figure(figsize=(10, 6))
-sns.barplot(x='Metric', y='Score', hue='Model', data=metrics_melted)
-plt.title('Model Performance')
-plt.ylim(0, 1)
-plt.xlabel('Performance Metric')
-plt.ylabel('Score')
-plt.legend(title='Model')
-for index, row in metrics_melted.iterrows():
-    plt.text(index, row['Score'] + 0.02, f"{row['Score']:.2f}", 
-             ha='center', va='bottom')
-plt.savefig('visuals/bert_class/metrics_comparison.png')
-plt.close()
-
-# %%
-# Save metrics to text file
-with open('visuals/bert_class/metrics.txt', 'w') as f:
-    f.write("=== BERT Model Metrics ===\n")
-    f.write(f"Accuracy: {metrics['BERT']['Accuracy']:.4f}\n")
-    f.write(f"F1 Score: {metrics['BERT']['F1 Score']:.4f}\n")
-    f.write(f"ROC-AUC: {metrics['BERT']['ROC-AUC']:.4f}\n")
+# Initialize trainer
+def make_trainer(model, training_args, train_dataset, test_dataset, tokenizer, class_names, fixed_padding=False):
+    return Trainer(
+        model=model,
+        args=training_args,
+        train_dataset=train_dataset,
+        eval_dataset=test_dataset,
+        # Pads each batch to its longest review (fixed-length encodings are already padded)
+        data_collator=None if fixed_padding else DataCollatorWithPadding(tokenizer),
+        compute_metrics=make_compute_metrics(class_names),
+    )
 
 # %%
-# Save evaluation results
-eval_results = trainer.evaluate()
-with open('visuals/bert_class/eval_results.txt', 'w') as f:
-    f.write("=== Evaluation Results ===\n")
-    for metric, value in eval_results.items():
-        f.write(f"{metric}: {value:.4f}\n")
+# Run the pipeline
+def main(seed=DEFAULT_SEED, fixed_padding=False, output_dir=OUTPUT_DIR, visuals_dir=VISUALS_DIR, use_cache=True,
+         cache_dir=TOKENIZATION_CACHE_DIR, num_proc=None):
+    combined_data, le = load_data()
+    tokenizer = BertTokenizerFast.from_pretrained(BERT_MODEL_NAME)
+    tokenized_dataset = tokenize_dataset(combined_data, tokenizer, fixed_padding, use_cache, cache_dir, num_proc)
+    train_dataset, test_dataset = split_dataset(tokenized_dataset, combined_data['label'], seed)
+
+    model = make_model(len(le.classes_))
+    training_args = make_training_args(output_dir, fixed_padding, seed=seed)
+    trainer = make_trainer(model, training_args, train_dataset, test_dataset, tokenizer, le.classes_, fixed_padding)
+
+    # Train model
+    train_output = trainer.train()
+    print(f"Trained at {train_output.metrics['train_samples_per_second']:.1f} examples/sec")
+
+    # Get predictions (one pass over the test set, every metric and figure below comes from it)
+    predictions = trainer.predict(test_dataset)
+    probs = torch.nn.functional.softmax(torch.tensor(predictions.predictions), dim=-1).numpy()
+    evaluation = evaluate_probabilities(test_dataset['label'], probs, le.classes_)
+    print_metrics(evaluation, 'BERT')
+
+    # Confusion matrix, distribution comparison and metrics plots, drawn in parallel worker processes
+    figures = report_figures(evaluation, 'BERT', visuals_dir, 'BERT Confusion Matrix', 'confusion_matrix',
+                             metrics_title='Model Performance', confusion_figsize=(8, 6),
+                             distribution_note='Blue: Actual, Red: Predicted')
+    render_figures(figures)
+
+    # Save metrics to text file
+    write_metrics(evaluation, 'BERT', f'{visuals_dir}/metrics.txt', include_report=False)
+
+    # Save evaluation results (the metrics of the trainer.predict pass above, no separate trainer.evaluate pass;
+    # Trainer names them test_* rather than eval_*)
+    with open(f'{visuals_dir}/eval_results.txt', 'w') as f:
+        f.write("=== Evaluation Results (trainer.predict on the test set) ===\n")
+        for metric, value in predictions.metrics.items():
+            f.write(f"{metric}: {value:.4f}\n")
+    return {'trainer': trainer, 'tokenizer': tokenizer, 'label_encoder': le, 'test_dataset': test_dataset,
+            'evaluation': evaluation}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fine-tune BERT for sentiment classification")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--fixed-padding', action='store_true',
+                        help=f"pad every review to {MAX_LENGTH} tokens instead of per batch")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help="Trainer checkpoints")
+    parser.add_argument('--visuals-dir', default=VISUALS_DIR)
+    parser.add_argument('--no-cache', action='store_true', help="tokenize again instead of using cache/tokenized")
+    parser.add_argument('--cache-dir', default=TOKENIZATION_CACHE_DIR)
+    parser.add_argument('--tokenize-workers', type=int, help="tokenization processes, default one per 10,000 rows")
+    args = parser.parse_args()
+    main(seed=args.seed, fixed_padding=args.fixed_padding, output_dir=args.output_dir, visuals_dir=args.visuals_dir,
+         use_cache=not args.no_cache, cache_dir=args.cache_dir, num_proc=args.tokenize_workers)
@@ -0,0 +1,137 @@
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import torch
+from transformers import BertForSequenceClassification
+from columnar_io import SENTIMENT_CLASSES, ScoredWriter
+from prediction_cache import artifact_fingerprint
+from tokenization_cache import TOKENIZATION_CACHE_DIR, cached_map
+from bert_export import (BATCH_SIZE, ENGINES, EXPORT_DIR, MAX_LENGTH, TorchEngine, check_class_names, encode,
+                         load_engine, load_tokenizer, predict_encoded, predict_proba)
+
+'''
+summary:
+    Batch sentiment predictions with the fine-tuned BERT model, the transformer counterpart of
+    TF_IDF_model.predict_new_data_in_chunks. BertSentimentScorer loads the model once, either a Trainer
+    checkpoint / save_pretrained directory (fp32) or one of bert_export.py's artifacts in models/bert, and
+    scores texts in batches sorted by token length under torch.inference_mode. score_csv streams a CSV in
+    chunks and writes the same predicted_sentiment and <class>_probability columns as the TF-IDF model
+    (CSV, Parquet or Arrow by the output suffix):
+        python BERT_predict.py clean-data/feedback_data_cleaned.csv --engine int8 --threads 4
+    Each chunk is tokenized as it is scored. With --cache the whole text column is tokenized up front
+    across worker processes and cached in cache/tokenized/ keyed by the file's contents (see
+    tokenization_cache.py), so scoring the same file again (another engine, thread count or batch size)
+    memory-maps the encodings instead; worth it only for a file that is scored more than once.
+'''
+
+CHUNK_SIZE = 10000
+
+def _encode_batch(examples, tokenizer):
+    # Missing text is scored as an empty review
+    return encode(tokenizer, ['' if text is None else str(text) for text in examples['text']])
+
+class BertSentimentScorer:
+    """BERT class probabilities for texts, with the model loaded once.
+
+    checkpoint is a model directory loaded as fp32, otherwise `engine` is loaded from export_dir.
+    threads sets the intra-op threads (process wide for the torch engines)."""
+
+    def __init__(self, checkpoint=None, engine='int8', export_dir=EXPORT_DIR, threads=None, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        if checkpoint is None:
+            self.engine, self.tokenizer, class_names = load_engine(engine, export_dir, threads)
+        else:
+            if threads:
+                torch.set_num_threads(threads)
+            model = BertForSequenceClassification.from_pretrained(checkpoint)
+            self.engine, self.tokenizer = TorchEngine(model), load_tokenizer(checkpoint)
+            class_names = [model.config.id2label[index] for index in range(model.config.num_labels)]
+            # Trainer checkpoints keep the default LABEL_<i> names, BERT_model.py's labels are the
+            # label-encoded (alphabetical) sentiment names
+            if class_names == [f'LABEL_{index}' for index in range(len(SENTIMENT_CLASSES))]:
+                class_names = SENTIMENT_CLASSES
+        self.class_names = check_class_names(class_names)
+
+    def predict_proba(self, texts):
+        """Class probabilities (n_texts x n_classes, columns in class_names order) in input order"""
+        texts = ['' if pd.isna(text) else str(text) for text in texts]
+        probabilities = predict_proba(self.engine, self.tokenizer, texts, self.batch_size)
+        return probabilities.reshape(len(texts), len(self.class_names))
+
+    def predict(self, texts):
+        return np.asarray(self.class_names)[np.argmax(self.predict_proba(texts), axis=1)]
+
+    def tokenize_csv(self, data_path, text_column='Feedback', cache_dir=TOKENIZATION_CACHE_DIR, num_proc=None):
+        """Unpadded encodings of data_path's text column as a memory-mapped Dataset, one row per CSV row"""
+        from datasets import Dataset
+        params = {'sources': artifact_fingerprint([data_path]), 'text_column': text_column,
+                  'tokenizer': self.tokenizer.name_or_path, 'max_length': MAX_LENGTH}
+
+        def load_texts():
+            texts = Dataset.from_csv(str(data_path), usecols=[text_column])
+            return texts if text_column == 'text' else texts.rename_column(text_column, 'text')
+        return cached_map(load_texts, _encode_batch, params, cache_dir, num_proc=num_proc,
+                          fn_kwargs={'tokenizer': self.tokenizer}, remove_columns=['text'])
+
+    def add_predictions(self, df, probabilities):
+        """df with predicted_sentiment and <class>_probability columns added"""
+        probabilities = probabilities.reshape(len(df), len(self.class_names))
+        df['predicted_sentiment'] = np.asarray(self.class_names)[np.argmax(probabilities, axis=1)]
+        for i, class_name in enumerate(self.class_names):
+            df[f'{class_name}_probability'] = probabilities[:, i]
+        return df
+
+    def score_frame(self, df, text_column='Feedback'):
+        if text_column not in df.columns:
+            raise ValueError(f"Column '{text_column}' not found in the data. Available columns: {df.columns.tolist()}")
+        return self.add_predictions(df, self.predict_proba(df[text_column]))
+
+    def score_csv(self, data_path, output_path, text_column='Feedback', chunksize=CHUNK_SIZE, use_cache=False,
+                  cache_dir=TOKENIZATION_CACHE_DIR, num_proc=None):
+        """Stream data_path in chunks of chunksize rows, scoring each and appending it to output_path.
+        With use_cache the whole text column is tokenized (or loaded from cache_dir) up front.
+        Returns the number of rows scored."""
+        encodings = self.tokenize_csv(data_path, text_column, cache_dir, num_proc) if use_cache else None
+        print(f"Streaming data from {data_path} in chunks of {chunksize:,} rows...")
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        start_time = time.perf_counter()
+        rows_scored = 0
+        with ScoredWriter(output_path) as writer:
+            for chunk in pd.read_csv(data_path, chunksize=chunksize):
+                if encodings is None:
+                    chunk = self.score_frame(chunk, text_column)
+                else:
+                    chunk_encodings = encodings[rows_scored:rows_scored + len(chunk)]
+                    chunk = self.add_predictions(chunk, predict_encoded(self.engine, self.tokenizer, chunk_encodings,
+                                                                        self.batch_size))
+                writer.write(chunk)
+                rows_scored += len(chunk)
+                elapsed = time.perf_counter() - start_time
+                print(f"Scored {rows_scored:,} rows ({rows_scored / elapsed:,.1f} rows/sec)")
+        print(f"\nPredictions saved to {output_path}")
+        return rows_scored
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a feedback CSV with the fine-tuned BERT model")
+    parser.add_argument('input', help="CSV with a text column")
+    parser.add_argument('--output', default='predictions/bert_sentiment_predictions.csv',
+                        help="output file, .csv, .parquet or .arrow")
+    parser.add_argument('--text-column', default='Feedback')
+    parser.add_argument('--checkpoint', help="model directory to load as fp32 instead of an exported engine")
+    parser.add_argument('--engine', choices=ENGINES, default='int8', help="bert_export.py artifact to load")
+    parser.add_argument('--export-dir', default=EXPORT_DIR)
+    parser.add_argument('--threads', type=int, help="intra-op threads")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help="CSV rows read and scored per step")
+    parser.add_argument('--cache', action='store_true',
+                        help="tokenize the whole file up front and cache it in --cache-dir (for files scored again)")
+    parser.add_argument('--cache-dir', default=TOKENIZATION_CACHE_DIR)
+    parser.add_argument('--tokenize-workers', type=int,
+                        help="tokenization processes with --cache, default one per 10,000 rows")
+    args = parser.parse_args()
+
+    scorer = BertSentimentScorer(args.checkpoint, args.engine, args.export_dir, args.threads, args.batch_size)
+    scorer.score_csv(args.input, args.output, args.text_column, args.chunksize, use_cache=args.cache,
+                     cache_dir=args.cache_dir, num_proc=args.tokenize_workers)
@@ -0,0 +1,143 @@
+import zlib
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import LabelEncoder
+from sklearn.metrics import accuracy_score, f1_score, classification_report
+from instrumentation import peak_rss_mb
+
+'''
+summary:
+    Out-of-core training of the sentiment classifier. The labeled feedback and the external reviews are
+    streamed in chunks through a stateless HashingVectorizer (no vocabulary to build, so nothing needs the
+    whole corpus in memory) into an SGDClassifier trained with partial_fit. Memory depends on the chunk
+    size and the number of hashed features, not on the corpus size.
+    A fixed hash of each review's text holds out ~20% of rows for evaluation, so the split is the same on
+    every pass without keeping anything in memory. The artifacts are written to models/online/ in the
+    layout sentiment_scorer.load_models expects (python sentiment_scorer.py --model-dir models/online).
+'''
+
+ONLINE_MODEL_DIR = 'models/online'
+
+SENTIMENT_CLASSES = ['Negative', 'Neutral', 'Positive']
+
+# Percentage of rows held out for evaluation, chosen by a hash of the text
+HOLDOUT_PERCENT = 20
+
+# Same mapping as TF_IDF_model.py
+def map_sentiment(score):
+    if score <= 4:
+        return 'Negative'
+    elif score == 5:
+        return 'Neutral'
+    else:
+        return 'Positive'
+
+# (path, text column, label column, label mapping) of every training source
+SOURCES = [
+    ('clean-data/labeled_feedback.csv', 'Feedback', 'p_sentiment', map_sentiment),
+    ('External_Datasets/reviews.csv', 'Review', 'Sentiment', None),
+]
+
+def stream_labeled_chunks(chunksize, sources=SOURCES, repeat=1):
+    """Yield (texts, sentiment labels) arrays chunk by chunk from every source, `repeat` times over"""
+    for _ in range(repeat):
+        for path, text_column, label_column, map_labels in sources:
+            for chunk in pd.read_csv(path, usecols=[text_column, label_column], chunksize=chunksize):
+                chunk = chunk.dropna(subset=[label_column])
+                labels = chunk[label_column]
+                if map_labels is not None:
+                    labels = labels.apply(map_labels)
+                yield chunk[text_column].fillna('').astype(str).to_numpy(), labels.to_numpy()
+
+def holdout_mask(texts):
+    """True for the rows held out for evaluation. Identical texts always land on the same side."""
+    return np.array([zlib.crc32(text.encode('utf-8')) % 100 < HOLDOUT_PERCENT for text in texts], dtype=bool)
+
+def make_vectorizer(n_features=2 ** 20):
+    # Same n-grams as the TF-IDF model, non-negative so the features look like (unweighted) term frequencies
+    return HashingVectorizer(n_features=n_features, ngram_range=(1, 2), alternate_sign=False, norm='l2')
+
+def class_weights(label_encoder, chunksize, repeat=1):
+    """'balanced' class weights over the training rows, from a pass that only counts labels"""
+    counts = np.zeros(len(label_encoder.classes_))
+    for texts, labels in stream_labeled_chunks(chunksize, repeat=repeat):
+        train = ~holdout_mask(texts)
+        counts += np.bincount(label_encoder.transform(labels[train]), minlength=len(counts))
+    return counts.sum() / (len(counts) * np.maximum(counts, 1))
+
+def train_online(chunksize=10000, epochs=5, n_features=2 ** 20, alpha=1e-5, repeat=1, random_state=42):
+    """Stream the sources `epochs` times through partial_fit. Returns (model, vectorizer, label encoder)."""
+    vectorizer = make_vectorizer(n_features)
+    label_encoder = LabelEncoder().fit(SENTIMENT_CLASSES)
+    weights = class_weights(label_encoder, chunksize, repeat)
+    classes = np.arange(len(SENTIMENT_CLASSES))
+    model = SGDClassifier(loss='log_loss', alpha=alpha, random_state=random_state)
+
+    rng = np.random.default_rng(random_state)
+    for epoch in range(epochs):
+        start = time.perf_counter()
+        rows = 0
+        for texts, labels in stream_labeled_chunks(chunksize, repeat=repeat):
+            train = ~holdout_mask(texts)
+            # Shuffle within the chunk, the sources themselves are stored in label/source order
+            order = rng.permutation(np.flatnonzero(train))
+            y = label_encoder.transform(labels[order])
+            model.partial_fit(vectorizer.transform(texts[order]), y, classes=classes, sample_weight=weights[y])
+            rows += len(order)
+        print(f"Epoch {epoch + 1}/{epochs}: {rows:,} rows in {time.perf_counter() - start:.1f}s")
+    return model, vectorizer, label_encoder
+
+def evaluate_online(model, vectorizer, label_encoder, chunksize=10000, repeat=1):
+    """Accuracy/macro-F1 on the held-out rows, predicted chunk by chunk"""
+    y_true, y_pred = [], []
+    for texts, labels in stream_labeled_chunks(chunksize, repeat=repeat):
+        holdout = holdout_mask(texts)
+        if holdout.any():
+            y_true.append(label_encoder.transform(labels[holdout]))
+            y_pred.append(model.predict(vectorizer.transform(texts[holdout])))
+    y_true, y_pred = np.concatenate(y_true), np.concatenate(y_pred)
+    print(classification_report(y_true, y_pred, target_names=label_encoder.classes_))
+    return {'accuracy': accuracy_score(y_true, y_pred), 'f1_macro': f1_score(y_true, y_pred, average='macro'),
+            'holdout_rows': len(y_true)}
+
+def save_online_artifacts(model, vectorizer, label_encoder, model_dir=ONLINE_MODEL_DIR):
+    Path(model_dir).mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, f'{model_dir}/sgd_model.joblib')
+    joblib.dump(vectorizer, f'{model_dir}/hashing_vectorizer.joblib')
+    joblib.dump(label_encoder, f'{model_dir}/label_encoder.joblib')
+    print(f"Models saved to {model_dir}/")
+
+def main(chunksize, epochs, n_features, alpha, repeat, model_dir):
+    start = time.perf_counter()
+    print("\n=== Training Online Model ===")
+    model, vectorizer, label_encoder = train_online(chunksize, epochs, n_features, alpha, repeat)
+    train_seconds = time.perf_counter() - start
+
+    print("\n=== Evaluating Online Model ===")
+    metrics = evaluate_online(model, vectorizer, label_encoder, chunksize, repeat)
+    print(f"Accuracy: {metrics['accuracy']:.4f}")
+    print(f"F1 Score: {metrics['f1_macro']:.4f}")
+    peak = peak_rss_mb()
+    print(f"Training time: {train_seconds:.1f}s, peak RSS: {f'{peak:.0f} MB' if peak is not None else 'n/a'}")
+
+    print("\n=== Saving Models ===")
+    save_online_artifacts(model, vectorizer, label_encoder, model_dir)
+    return metrics
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the out-of-core HashingVectorizer + SGD sentiment model")
+    parser.add_argument('--chunksize', type=int, default=10000, help="rows read and learned from per step")
+    parser.add_argument('--epochs', type=int, default=5, help="passes over the training data")
+    parser.add_argument('--n-features', type=int, default=2 ** 20, help="hashed feature dimension")
+    parser.add_argument('--alpha', type=float, default=1e-5, help="SGD regularization strength")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="stream the sources this many times per epoch (to simulate a larger corpus)")
+    parser.add_argument('--model-dir', default=ONLINE_MODEL_DIR)
+    args = parser.parse_args()
+    main(args.chunksize, args.epochs, args.n_features, args.alpha, args.repeat, args.model_dir)
@@ -4,15 +4,41 @@ import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split, GridSearchCV, ParameterGrid, StratifiedShuffleSplit
+from sklearn.model_selection import train_test_split, ParameterGrid, StratifiedShuffleSplit
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, f1_score, roc_auc_score, classification_report, confusion_matrix
-import matplotlib.pyplot as plt
-import seaborn as sns
 from pathlib import Path
-from imblearn.over_sampling import SMOTE
-from tqdm import tqdm
+import json
 import joblib
+import time
+import argparse
+from columnar_io import ScoredWriter, write_scored
+from instrumentation import StageTimer
+from model_search import SEARCH_STRATEGIES, run_search
+from pipeline_cache import PIPELINE_CACHE_DIR, StageCache
+from prediction_cache import artifact_fingerprint
+from sentiment_scorer import REDUCER_FILENAME
+from model_evaluation import (evaluate_classifier, print_metrics, write_metrics, report_figures,
+                              plot_feature_importance, render_figures)
+
+# %%
+# Training pipeline: load -> vectorize -> split -> (reduce) -> resample -> search -> evaluate -> export -> visualize,
+# then with --linear a sparse linear model on the same features (linear -> export_linear, to models/linear/).
+# Every stage is checkpointed in cache/pipeline/ keyed by its parameters, the seed and the stages before it
+# (see pipeline_cache.py; sparse results such as the TF-IDF feature matrix are saved beside the checkpoint as .npz),
+# so a rerun resumes from the first stage whose inputs changed:
+#   python TF_IDF_model.py --seed 42 --strategy halving
+#   python TF_IDF_model.py --rerun-from visualize     (recompute the figures only)
+PIPELINE_STAGES = ['load', 'vectorize', 'split', 'reduce', 'resample', 'search', 'evaluate', 'export', 'visualize',
+                   'linear', 'export_linear']
+
+TRAINING_DATA = ['clean-data/labeled_feedback.csv', 'External_Datasets/reviews.csv']
+MODEL_DIR = 'models'
+VISUALS_DIR = 'visuals/tf-idf_class'
+DEFAULT_SEED = 42
+
+# Written with the exported models, so scripts that report on the test split (forest_compaction.py) use the
+# split the models were actually trained with
+TRAINING_INFO_FILENAME = 'training_info.json'
 
 # %%
 # Load and preprocess external datasets
@@ -33,94 +59,82 @@ def map_sentiment(score):
         return 'Positive'
 
 # %%
-# Train models with GridSearch
-def train_model(X, y):
-    print("\n=== Training Model ===")
-    rf = RandomForestClassifier(random_state=42)
-    
-    # Calculate total iterations
-    param_grid = list(ParameterGrid(rf_params))
-    n_iter = len(param_grid) * 5  # 5 for 5-fold CV
-    print(f"Starting Grid Search with {n_iter} total iterations...")
-    print("This may take several minutes. Progress will be shown below:")
-    
-    # Setting verbose to show progress
-    grid_search = GridSearchCV(
-        rf, rf_params, cv=5, scoring='f1_macro', n_jobs=-1,
-        verbose=7
-    )
-    
-    # Fit the model
-    grid_search.fit(X, y)
-    print("\n=== Training Complete ===")
-    print(f"Best parameters found: {grid_search.best_params_}")
-    return grid_search.best_estimator_
+# Hyperparameter tuning for Random Forest with more variation
+## Noted tweaks made for better accuracy
+
+rf_params = {
+    'n_estimators': [200, 300, 400],  # More trees for better accuracy
+    'max_depth': [15, 25, 35, None],  # Deeper trees to capture more complex patterns
+    'min_samples_split': [2, 5, 10],   
+    'min_samples_leaf': [1, 2, 3],  # Smaller leaf sizes for more detailed predictions
+    'class_weight': ['balanced', 'balanced_subsample'],
+    'max_features': ['sqrt', 'log2', 0.5, None],  # Added fractional features
+}
 
 # %%
-# Evaluate models
-def evaluate_model(model, X_test, y_test, model_name):
-    y_pred = model.predict(X_test)
-    y_pred_proba = model.predict_proba(X_test)
-    
-    # Calculate metrics
-    accuracy = accuracy_score(y_test, y_pred)
-    f1 = f1_score(y_test, y_pred, average="macro")
-    roc_auc = roc_auc_score(y_test, y_pred_proba, multi_class="ovr")
-    class_report = classification_report(y_test, y_pred)
-    
-    # Print metrics
-    print(f"\n=== {model_name} Model Metrics ===")
-    print(f'Accuracy: {accuracy:.4f}')
-    print(f'F1 Score: {f1:.4f}')
-    print(f'ROC-AUC: {roc_auc:.4f}')
-    print("\nClassification Report:")
-    print(class_report)
+# Hyperparameter search used by train_model (see model_search.py):
+#   'halving' - successive halving over the number of trees, SEARCH_BUDGET random candidates
+#   'random'  - SEARCH_BUDGET random candidates at full size
+#   'grid'    - every combination in rf_params (864 x 5 folds = 4,320 forests, takes hours)
+#   'warm_start' - SEARCH_BUDGET random combinations of the other parameters (None for all 288), each forest
+#                  grown once through every n_estimators value; SEARCH_OOB scores it out-of-bag instead of 5-fold CV
+SEARCH_STRATEGY = 'halving'
+SEARCH_BUDGET = 60
+SEARCH_OOB = False
+
+# Train models with a budgeted search
+def train_model(X, y, strategy=SEARCH_STRATEGY, budget=SEARCH_BUDGET, oob=SEARCH_OOB, random_state=DEFAULT_SEED):
+    print("\n=== Training Model ===")
     
-    # Save metrics 
-    metrics_dir = Path('visuals/tf-idf_class')
-    metrics_dir.mkdir(parents=True, exist_ok=True)
+    if strategy == 'grid':
+        # Calculate total iterations
+        n_iter = len(ParameterGrid(rf_params)) * 5  # 5 for 5-fold CV
+        print(f"Starting Grid Search with {n_iter} total iterations...")
+        print("This may take several minutes. Progress will be shown below:")
+    else:
+        print(f"Starting {strategy} search over {budget} candidates...")
     
-    with open(metrics_dir / 'metrics_comparison.txt', 'w') as f:
-        f.write(f"=== {model_name} Model Metrics ===\n")
-        f.write(f'Accuracy: {accuracy:.4f}\n')
-        f.write(f'F1 Score: {f1:.4f}\n')
-        f.write(f'ROC-AUC: {roc_auc:.4f}\n\n')
-        f.write("Classification Report:\n")
-        f.write(class_report)
-        
-    return y_pred, y_pred_proba
+    # Fit the search, its best params and fit time are appended to visuals/tf-idf_class/search_log.csv
+    search, _ = run_search(X, y, rf_params, strategy=strategy, budget=budget, cv=5,
+                           random_state=random_state, verbose=7 if strategy == 'grid' else 1, oob=oob)
+    print("\n=== Training Complete ===")
+    return search.best_estimator_
 
 # %%
-# Visualization Functions
-def plot_confusion_matrix(y_test, y_pred, title, filename, label_encoder):
-    cm = confusion_matrix(y_test, y_pred)
-    plt.figure(figsize=(6, 4))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
-                xticklabels=label_encoder.classes_, 
-                yticklabels=label_encoder.classes_)
-    plt.title(title)
-    plt.xlabel('Predicted')
-    plt.ylabel('Actual')
-    plt.text(0.5, -0.1, f'Accuracy: {accuracy_score(y_test, y_pred):.2f}',
-             ha='center', va='center', transform=plt.gca().transAxes)
-    plt.savefig(f'visuals/tf-idf_class/{filename}.png')
-    plt.close()
-
-def plot_feature_importance(model, feature_names, title, output_path):
-    importances = model.feature_importances_
-    indices = np.argsort(importances)[-20:]  # Top 20 features
-    plt.figure(figsize=(10, 6))
-    plt.title(f'Top 20 Most Important Features ({title})')
-    plt.barh(range(20), importances[indices], color='skyblue')
-    plt.yticks(range(20), [feature_names[i] for i in indices])
-    plt.xlabel('Importance Score')
-    plt.tight_layout()
-    plt.savefig(output_path)
-    plt.close()
+# Optional sparse linear model on the same features, a drop-in replacement for the forest when scoring
+# latency matters more than the last bit of accuracy (a dot product per review instead of 400 tree walks):
+#   'logistic' - multinomial logistic regression
+#   'svm'      - linear SVM, with sigmoid-calibrated probabilities
+LINEAR_MODELS = ['logistic', 'svm']
+LINEAR_MODEL_DIR = 'models/linear'
+linear_params = {'C': [0.1, 1, 10, 100]}
+
+def make_linear_model(kind, random_state=DEFAULT_SEED):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.svm import LinearSVC
+    from sklearn.calibration import CalibratedClassifierCV
+    if kind == 'logistic':
+        return LogisticRegression(max_iter=1000, class_weight='balanced', random_state=random_state)
+    if kind == 'svm':
+        # ensemble=False keeps one SVM at prediction time, calibrated on cross-validated decision values
+        svm = LinearSVC(class_weight='balanced', max_iter=10000, random_state=random_state)
+        return CalibratedClassifierCV(svm, cv=5, ensemble=False)
+    raise ValueError(f"Unknown linear model '{kind}', expected one of {LINEAR_MODELS}")
+
+def train_linear_model(X, y, kind='logistic', random_state=DEFAULT_SEED):
+    """Linear model with C picked by 5-fold CV macro-F1 over linear_params"""
+    from sklearn.model_selection import GridSearchCV
+    print(f"\n=== Training Linear Model ({kind}) ===")
+    model = make_linear_model(kind, random_state)
+    param_grid = {('estimator__C' if kind == 'svm' else 'C'): linear_params['C']}
+    search = GridSearchCV(model, param_grid, cv=5, scoring='f1_macro', n_jobs=-1).fit(X, y)
+    print(f"Best parameters found: {search.best_params_}, CV macro-F1 {search.best_score_:.4f}")
+    return search.best_estimator_
 
 # %%
 # Predict new data
-def predict_new_data(model, vectorizer, label_encoder, data_path, text_column='Feedback'):
+def predict_new_data(model, vectorizer, label_encoder, data_path, text_column='Feedback',
+                     output_path='predictions/sentiment_predictions.csv'):
     """
     Predict sentiment for new data using the trained model
     
@@ -130,6 +144,7 @@ def predict_new_data(model, vectorizer, label_encoder, data_path, text_column='F
         label_encoder: Fitted LabelEncoder
         data_path: Path to CSV file containing new data
         text_column: Name of the column containing text to analyze
+        output_path: File the predictions are saved to (.csv, .parquet or .arrow)
     
     Returns:
         DataFrame with original data plus predictions
@@ -156,9 +171,8 @@ def predict_new_data(model, vectorizer, label_encoder, data_path, text_column='F
     for i, class_name in enumerate(label_encoder.classes_):
         new_data[f'{class_name}_probability'] = probabilities[:, i]
 
-    output_path = 'predictions/sentiment_predictions.csv'
-    Path('predictions').mkdir(parents=True, exist_ok=True)
-    new_data.to_csv(output_path, index=False)
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    write_scored(new_data, output_path)
     print(f"\nPredictions saved to {output_path}")
     
     print("\nSample predictions:")
@@ -167,175 +181,299 @@ def predict_new_data(model, vectorizer, label_encoder, data_path, text_column='F
     
     return new_data
 
-# %%
-# Load data
-print("\n=== Loading Data ===")
-print("Loading labeled feedback data...")
-data = pd.read_csv('clean-data/labeled_feedback.csv')
-external_data = load_and_preprocess_external_data()
-
-# %%
-# Map numerical sentiment to categories
-print("\n=== Preprocessing Data ===")
-print("Mapping sentiment scores to categories...")
-data['sentiment'] = data['p_sentiment'].apply(map_sentiment)
-external_data['sentiment_source'] = 'external'
-data['sentiment_source'] = 'original'
-
-# %%
-# Combine datasets
-combined_data = pd.concat([
-    data[['Feedback', 'sentiment', 'sentiment_source']],
-    external_data[['Feedback', 'Sentiment', 'sentiment_source']].rename(
-        columns={'Sentiment': 'sentiment'})
-], ignore_index=True)
-
-# %%
-# Convert text to TF-IDF features
-print("\n=== Creating TF-IDF Features ===")
-print("Converting text to TF-IDF features (this may take a few minutes)...")
-tfidf = TfidfVectorizer(max_features=5000, ngram_range=(1, 2))
-tfidf_features = tfidf.fit_transform(combined_data['Feedback'])
-print(f"Created {tfidf_features.shape[1]} TF-IDF features")
-
-# %%
-# Encode labels
-print("\n=== Encoding Labels ===")
-le = LabelEncoder()
-labels = le.fit_transform(combined_data['sentiment'])
-print("Labels encoded successfully")
-
-# %%
-# Split data with a dynamic random state
-print("\n=== Splitting Data ===")
-random_seed = np.random.randint(1, 10000)  # Generate a random seed
-sss = StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state=random_seed)
-train_index, test_index = next(sss.split(tfidf_features, labels))
-
-X_train_text = tfidf_features[train_index]
-X_test_text = tfidf_features[test_index]
-y_train_text = labels[train_index]
-y_test_text = labels[test_index]
-source_train = combined_data['sentiment_source'].iloc[train_index]
-source_test = combined_data['sentiment_source'].iloc[test_index].reset_index(drop=True)
-
-print("Data split completed")
-
-# %%
-# Handle class imbalance using SMOTE with dynamic random state
-print("\n=== Handling Class Imbalance ===")
-print("Applying SMOTE to balance classes...")
-smote = SMOTE(random_state=random_seed)
-X_text_resampled, y_resampled = smote.fit_resample(X_train_text, y_train_text)
-print("Class balancing completed")
+def predict_new_data_in_chunks(model, vectorizer, label_encoder, data_path, text_column='Feedback',
+                               chunksize=50000, output_path='predictions/sentiment_predictions.csv'):
+    """
+    Streaming version of predict_new_data for inputs that do not fit in memory.
+    Reads data_path in chunks of `chunksize` rows, predicts each chunk and appends it to output_path,
+    so peak memory stays flat regardless of the input size.
 
-# %%
-# Hyperparameter tuning for Random Forest with more variation
-## Noted tweaks made for better accuracy
+    Args:
+        model: Trained RandomForestClassifier
+        vectorizer: Fitted TfidfVectorizer
+        label_encoder: Fitted LabelEncoder
+        data_path: Path to CSV file containing new data
+        text_column: Name of the column containing text to analyze
+        chunksize: Number of rows read and scored per chunk
+        output_path: File the predictions are appended to (.csv, .parquet or .arrow)
 
-rf_params = {
-    'n_estimators': [200, 300, 400],  # More trees for better accuracy
-    'max_depth': [15, 25, 35, None],  # Deeper trees to capture more complex patterns
-    'min_samples_split': [2, 5, 10],   
-    'min_samples_leaf': [1, 2, 3],  # Smaller leaf sizes for more detailed predictions
-    'class_weight': ['balanced', 'balanced_subsample'],
-    'max_features': ['sqrt', 'log2', 0.5, None],  # Added fractional features
-}
+    Returns:
+        Total number of rows scored
+    """
+    print(f"Streaming data from {data_path} in chunks of {chunksize:,} rows...")
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
 
-# %%
-# Train the model ONCE
-print("\n=== Training Model ===")
-best_model = train_model(X_text_resampled, y_resampled)
-print("Model training completed!")
+    start_time = time.perf_counter()
+    rows_scored = 0
+    with ScoredWriter(output_path) as writer:
+        for chunk in pd.read_csv(data_path, chunksize=chunksize):
+            if text_column not in chunk.columns:
+                raise ValueError(f"Column '{text_column}' not found in the data. Available columns: {chunk.columns.tolist()}")
 
-# %%
-# Get predictions and reuse them
-print("\n=== Evaluating Model ===")
-y_pred, y_pred_proba = evaluate_model(best_model, X_test_text, y_test_text, 'Text-Only')
+            # One forest pass per chunk, the predicted class is the most probable one (same as model.predict)
+            probabilities = model.predict_proba(vectorizer.transform(chunk[text_column]))
+            predictions = model.classes_[np.argmax(probabilities, axis=1)]
 
+            chunk['predicted_sentiment'] = label_encoder.inverse_transform(predictions)
+            for i, class_name in enumerate(label_encoder.classes_):
+                chunk[f'{class_name}_probability'] = probabilities[:, i]
 
-# Save the trained models
-print("\n=== Saving Models ===")
-Path("models").mkdir(exist_ok=True)
-joblib.dump(best_model, 'models/random_forest_model.joblib')
-joblib.dump(tfidf, 'models/tfidf_vectorizer.joblib')
-joblib.dump(le, 'models/label_encoder.joblib')
-print("Models saved successfully!")
+            writer.write(chunk)
 
-# %%
-# Create visualizations
-print("\n=== Creating Visualizations ===")
-# Confusion matrix
-plot_confusion_matrix(y_test_text, y_pred, 'Text-Only Confusion Matrix', 'confusion_text_only', le)
-
-# Distribution comparison
-plt.figure(figsize=(10, 6))
-sns.countplot(x=pd.Series(y_test_text).map({i: label for i, label in enumerate(le.classes_)}), order=le.classes_, color='blue', label='Actual')
-sns.countplot(x=pd.Series(y_pred).map({i: label for i, label in enumerate(le.classes_)}), 
-              order=le.classes_, color='red', alpha=0.6, label='Predicted')
-plt.title('Sentiment Distribution: Actual vs Predictions')
-plt.xlabel('Sentiment')
-plt.ylabel('Count')
-plt.legend(title='Legend')
-plt.savefig('visuals/tf-idf_class/distribution_comparison.png')
-plt.close()
-
-# Metrics comparison
-metrics = {
-    'Text-Only': {
-        'Accuracy': accuracy_score(y_test_text, y_pred),
-        'F1 Score': f1_score(y_test_text, y_pred, average='macro'),
-        'ROC-AUC': roc_auc_score(y_test_text, y_pred_proba, multi_class='ovr')
-    }
-}
+            rows_scored += len(chunk)
+            elapsed = time.perf_counter() - start_time
+            print(f"Scored {rows_scored:,} rows ({rows_scored / elapsed:,.0f} rows/sec)")
 
-metrics_df = pd.DataFrame(metrics).T.reset_index().rename(columns={'index': 'Model'})
-metrics_melted = metrics_df.melt(id_vars='Model', var_name='Metric', value_name='Score')
-
-plt.figure(figsize=(10, 6))
-sns.barplot(x='Metric', y='Score', hue='Model', data=metrics_melted)
-plt.title('Model Performance Comparison')
-plt.ylim(0, 1)
-plt.xlabel('Performance Metric')
-plt.ylabel('Score')
-plt.legend(title='Model')
-for index, row in metrics_melted.iterrows():
-    plt.text(index, row['Score'] + 0.02, f"{row['Score']:.2f}",
-             ha='center', va='bottom')
-plt.savefig('visuals/tf-idf_class/metrics_comparison.png')
-plt.close()
-
-# Feature importance
-feature_names = tfidf.get_feature_names_out()
-plot_feature_importance(best_model, feature_names, 'Text-Only Model',
-                        'visuals/tf-idf_class/feature_importance_text.png')
-
-print("\n=== All Done! ===")
-print("Model is trained and ready to use. We will use predict_new_data() to score new records.")
+    print(f"\nPredictions saved to {output_path}")
+    return rows_scored
 
 # %%
-# Save example predictions
-print("\n=== Saving Example Predictions ===")
-print(f"Length of y_test_text: {len(y_test_text)}")
-print(f"Length of y_pred: {len(y_pred)}")
-
-if len(y_test_text) == len(y_pred):
+# Pipeline stages
+def load_data():
+    """Labeled feedback + external reviews with encoded labels. Returns (combined data, label encoder, labels)."""
+    print("\n=== Loading Data ===")
+    print("Loading labeled feedback data...")
+    data = pd.read_csv(TRAINING_DATA[0])
+    external_data = load_and_preprocess_external_data()
+
+    print("Mapping sentiment scores to categories...")
+    data['sentiment'] = data['p_sentiment'].apply(map_sentiment)
+    external_data['sentiment_source'] = 'external'
+    data['sentiment_source'] = 'original'
+    combined_data = pd.concat([
+        data[['Feedback', 'sentiment', 'sentiment_source']],
+        external_data[['Feedback', 'Sentiment', 'sentiment_source']].rename(
+            columns={'Sentiment': 'sentiment'})
+    ], ignore_index=True)
+
+    print("Encoding labels...")
+    le = LabelEncoder()
+    labels = le.fit_transform(combined_data['sentiment'])
+    return combined_data, le, labels
+
+def make_vectorizer():
+    return TfidfVectorizer(max_features=5000, ngram_range=(1, 2))
+
+def vectorize(texts):
+    """Fit the TF-IDF vectorizer. Returns (vectorizer, sparse feature matrix)."""
+    print("\n=== Creating TF-IDF Features ===")
+    tfidf = make_vectorizer()
+    tfidf_features = tfidf.fit_transform(texts)
+    print(f"Created {tfidf_features.shape[1]} TF-IDF features")
+    return tfidf, tfidf_features
+
+def split_indices(labels, seed, test_size=0.2):
+    """Stratified train/test row indices"""
+    print("\n=== Splitting Data ===")
+    sss = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=seed)
+    return next(sss.split(np.zeros(len(labels)), labels))
+
+def reduce_features(X_train, y_train, X_test, reduction, seed):
+    """Optional reduction between the vectorizer and the forest (see feature_reduction.py), e.g. ('chi2', 1000).
+    Returns (fitted reducer, X_train, X_test)."""
+    print("\n=== Reducing Features ===")
+    from feature_reduction import make_reducer
+    method, k = reduction
+    feature_reducer = make_reducer(method, k, random_state=seed)
+    X_train_reduced = feature_reducer.fit_transform(X_train, y_train)
+    print(f"Reduced {X_train.shape[1]} TF-IDF features to {X_train_reduced.shape[1]} with {method}")
+    return feature_reducer, X_train_reduced, feature_reducer.transform(X_test)
+
+def resample(X_train, y_train, seed):
+    """Balance the classes with SMOTE"""
+    print("\n=== Handling Class Imbalance ===")
+    from imblearn.over_sampling import SMOTE
+    return SMOTE(random_state=seed).fit_resample(X_train, y_train)
+
+def export_models(model, tfidf, le, feature_reducer, seed, model_dir=MODEL_DIR,
+                  model_filename='random_forest_model.joblib'):
+    """Write the artifacts in the layout sentiment_scorer.load_models reads (see MODEL_FILENAMES there),
+    plus the seed of the train/test split in TRAINING_INFO_FILENAME"""
+    print("\n=== Saving Models ===")
+    Path(model_dir).mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, f'{model_dir}/{model_filename}')
+    joblib.dump(tfidf, f'{model_dir}/tfidf_vectorizer.joblib')
+    joblib.dump(le, f'{model_dir}/label_encoder.joblib')
+    if feature_reducer is not None:
+        joblib.dump(feature_reducer, reducer_path(model_dir))
+    with open(f'{model_dir}/{TRAINING_INFO_FILENAME}', 'w') as f:
+        json.dump({'seed': seed, 'test_size': 0.2, 'model': model_filename}, f, indent=2)
+    print(f"Models saved to {model_dir}/")
+
+def reducer_path(model_dir):
+    return Path(model_dir) / REDUCER_FILENAME
+
+def training_seed(model_dir=MODEL_DIR):
+    """Seed of the split the models in model_dir were trained on, None if they weren't exported with one"""
+    path = Path(model_dir) / TRAINING_INFO_FILENAME
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f).get('seed')
+
+def model_outputs(model_dir, with_reducer, model_filename='random_forest_model.joblib'):
+    outputs = [f'{model_dir}/{model_filename}', f'{model_dir}/tfidf_vectorizer.joblib',
+               f'{model_dir}/label_encoder.joblib', f'{model_dir}/{TRAINING_INFO_FILENAME}']
+    return outputs + [str(reducer_path(model_dir))] if with_reducer else outputs
+
+def visualize(evaluation, model, tfidf, le, feature_reducer, review_texts, seed, visuals_dir=VISUALS_DIR):
+    """Report figures (drawn in parallel worker processes) and 5 sample test reviews per predicted class"""
+    print("\n=== Creating Visualizations ===")
+    figures = report_figures(evaluation, 'Text-Only', visuals_dir, 'Text-Only Confusion Matrix', 'confusion_text_only')
+    feature_names = tfidf.get_feature_names_out()
+    if feature_reducer is not None:
+        feature_names = feature_reducer.get_feature_names_out(feature_names)
+    figures.append((plot_feature_importance, dict(importances=model.feature_importances_,
+                                                  feature_names=feature_names, title='Text-Only Model',
+                                                  output_path=f'{visuals_dir}/feature_importance_text.png')))
+    render_figures(figures)
+
+    print("\n=== Saving Example Predictions ===")
     # Create a DataFrame with the actual and predicted labels, and the review text
     df_reviews = pd.DataFrame({
-        'Review_Text': combined_data['Feedback'].iloc[test_index].reset_index(drop=True),  
-        'Actual': y_test_text,
-        'Predicted': y_pred
+        'Review_Text': review_texts,
+        'Actual': evaluation['y_true'],
+        'Predicted': evaluation['y_pred']
     })
+    df_reviews['Actual_Sentiment'] = le.classes_[df_reviews['Actual']]
+    df_reviews['Predicted_Sentiment'] = le.classes_[df_reviews['Predicted']]
+    # Sample 5 reviews for each sentiment category
+    sampled_reviews = (df_reviews.sample(frac=1, random_state=seed).groupby('Predicted_Sentiment').head(5)
+                       .sort_values('Predicted_Sentiment', kind='stable').reset_index(drop=True))
+    sampled_reviews.to_csv(f'{visuals_dir}/sample_reviews.csv', index=False)
 
-    # Map numerical labels to sentiment categories
-    label_map = {i: label for i, label in enumerate(le.classes_)}
-    df_reviews['Actual_Sentiment'] = df_reviews['Actual'].map(label_map)
-    df_reviews['Predicted_Sentiment'] = df_reviews['Predicted'].map(label_map)
+def train_and_evaluate_linear(X_train, y_train, X_test, y_test, le, kind, seed):
+    linear_model = train_linear_model(X_train, y_train, kind, seed)
+    return linear_model, evaluate_classifier(linear_model, X_test, y_test, le.classes_)
 
-    # Sample 5 reviews for each sentiment category
-    sampled_reviews = df_reviews.groupby('Predicted_Sentiment', group_keys=False).apply(
-        lambda x: x.sample(min(len(x), 5))).reset_index(drop=True)
+def visual_outputs(visuals_dir):
+    return [f'{visuals_dir}/{name}' for name in ['confusion_text_only.png', 'distribution_comparison.png',
+                                                 'metrics_comparison.png', 'feature_importance_text.png',
+                                                 'sample_reviews.csv']]
 
-    sampled_reviews.to_csv('visuals/tf-idf_class/sample_reviews.csv', index=False)
-else:
-    print("Arrays are not   the same length")
+# %%
+# Run the pipeline
+def main(seed=DEFAULT_SEED, strategy=SEARCH_STRATEGY, budget=SEARCH_BUDGET, oob=SEARCH_OOB, reduction=None,
+         rerun_from=None, use_cache=True, cache_dir=PIPELINE_CACHE_DIR, model_dir=MODEL_DIR, visuals_dir=VISUALS_DIR,
+         linear=None, linear_model_dir=LINEAR_MODEL_DIR):
+    """Train, evaluate and export the model, resuming every stage whose checkpoint is still valid.
+
+    Returns a dict with the fitted artifacts, the train/test split and the evaluation."""
+    # Per-stage timing/memory report, turned on with INSTRUMENT=1 (see instrumentation.py)
+    timer = StageTimer.from_env(run_name='tf_idf_training')
+    cache = StageCache(PIPELINE_STAGES, cache_dir=cache_dir, enabled=use_cache, rerun_from=rerun_from)
+    print(f"Random seed: {seed}")
+
+    with timer.stage('load') as stage:
+        combined_data, le, labels = cache.run('load', {'inputs': artifact_fingerprint(TRAINING_DATA)}, load_data)
+        stage.rows = len(combined_data)
+
+    with timer.stage('vectorize', rows=len(combined_data)):
+        tfidf, tfidf_features = cache.run('vectorize', {'vectorizer': make_vectorizer().get_params()},
+                                          lambda: vectorize(combined_data['Feedback']))
+
+    with timer.stage('split', rows=len(labels)):
+        train_index, test_index = cache.run('split', {'seed': seed, 'test_size': 0.2},
+                                            lambda: split_indices(labels, seed))
+        X_train_text, X_test_text = tfidf_features[train_index], tfidf_features[test_index]
+        y_train_text, y_test_text = labels[train_index], labels[test_index]
+
+    feature_reducer = None
+    if reduction is not None:
+        with timer.stage('reduce', rows=X_train_text.shape[0]):
+            feature_reducer, X_train_text, X_test_text = cache.run(
+                'reduce', {'reduction': list(reduction), 'seed': seed},
+                lambda: reduce_features(X_train_text, y_train_text, X_test_text, reduction, seed))
+
+    with timer.stage('resample') as stage:
+        X_text_resampled, y_resampled = cache.run('resample', {'method': 'smote', 'seed': seed},
+                                                  lambda: resample(X_train_text, y_train_text, seed))
+        stage.rows = X_text_resampled.shape[0]
+
+    with timer.stage('search', rows=X_text_resampled.shape[0]):
+        search_params = {'strategy': strategy, 'budget': budget, 'oob': oob, 'param_grid': rf_params, 'seed': seed}
+        best_model = cache.run('search', search_params,
+                               lambda: train_model(X_text_resampled, y_resampled, strategy, budget, oob, seed))
+
+    with timer.stage('evaluate', rows=X_test_text.shape[0]):
+        # Every metric comes from one predict_proba pass, see model_evaluation.py
+        evaluation = cache.run('evaluate', {},
+                               lambda: evaluate_classifier(best_model, X_test_text, y_test_text, le.classes_))
+        print_metrics(evaluation, 'Text-Only')
+        write_metrics(evaluation, 'Text-Only', f'{visuals_dir}/metrics_comparison.txt')
+
+    with timer.stage('export'):
+        # sentiment_scorer.load_models applies the reducer whenever the file exists, so remove a stale one
+        if feature_reducer is None:
+            reducer_path(model_dir).unlink(missing_ok=True)
+        cache.run('export', {'model_dir': model_dir},
+                  lambda: export_models(best_model, tfidf, le, feature_reducer, seed, model_dir),
+                  outputs=model_outputs(model_dir, feature_reducer is not None))
+
+    with timer.stage('visualize'):
+        review_texts = combined_data['Feedback'].iloc[test_index].reset_index(drop=True)
+        cache.run('visualize', {'visuals_dir': visuals_dir},
+                  lambda: visualize(evaluation, best_model, tfidf, le, feature_reducer, review_texts, seed, visuals_dir),
+                  outputs=visual_outputs(visuals_dir))
+
+    linear_model = linear_evaluation = None
+    if linear is not None:
+        with timer.stage('linear', rows=X_text_resampled.shape[0]):
+            linear_model, linear_evaluation = cache.run(
+                'linear', {'kind': linear, 'param_grid': linear_params, 'seed': seed},
+                lambda: train_and_evaluate_linear(X_text_resampled, y_resampled, X_test_text, y_test_text, le,
+                                                  linear, seed))
+            print_metrics(linear_evaluation, f'Linear ({linear})')
+            write_metrics(linear_evaluation, f'Linear ({linear})', f'{visuals_dir}/metrics_linear.txt')
+
+        with timer.stage('export_linear'):
+            if feature_reducer is None:
+                reducer_path(linear_model_dir).unlink(missing_ok=True)
+            cache.run('export_linear', {'model_dir': linear_model_dir},
+                      lambda: export_models(linear_model, tfidf, le, feature_reducer, seed, linear_model_dir,
+                                            'linear_model.joblib'),
+                      outputs=model_outputs(linear_model_dir, feature_reducer is not None, 'linear_model.joblib'))
+
+    print("\n=== All Done! ===")
+    if cache.resumed:
+        print(f"Resumed from checkpoints: {', '.join(cache.resumed)}")
+    print("Model is trained and ready to use. We will use predict_new_data() to score new records.")
+
+    # Per-stage timing report (only when INSTRUMENT=1)
+    timer.print_report()
+    timer.save()
+    return {'model': best_model, 'vectorizer': tfidf, 'label_encoder': le, 'feature_reducer': feature_reducer,
+            'train_index': train_index, 'test_index': test_index, 'evaluation': evaluation,
+            'linear_model': linear_model, 'linear_evaluation': linear_evaluation}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the TF-IDF + random forest sentiment model")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="seed of the split, SMOTE, reduction and search")
+    parser.add_argument('--strategy', choices=SEARCH_STRATEGIES, default=SEARCH_STRATEGY,
+                        help="hyperparameter search strategy (see model_search.py)")
+    parser.add_argument('--budget', type=int, default=SEARCH_BUDGET, help="candidates for the non-grid searches")
+    parser.add_argument('--oob', action='store_true', help="score warm_start candidates out-of-bag instead of CV")
+    parser.add_argument('--reduce', nargs=2, metavar=('METHOD', 'K'),
+                        help="feature reduction before the forest, METHOD one of chi2, mutual_info, svd "
+                             "(see feature_reduction.py)")
+    parser.add_argument('--linear', choices=LINEAR_MODELS,
+                        help="also train a sparse linear model on the same features, saved to --linear-model-dir")
+    parser.add_argument('--linear-model-dir', default=LINEAR_MODEL_DIR)
+    parser.add_argument('--rerun-from', choices=PIPELINE_STAGES,
+                        help="recompute this stage and every later one even if their checkpoints are valid")
+    parser.add_argument('--no-cache', action='store_true', help="don't read or write stage checkpoints")
+    parser.add_argument('--cache-dir', default=PIPELINE_CACHE_DIR)
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--visuals-dir', default=VISUALS_DIR)
+    args = parser.parse_args()
+
+    reduction = None
+    if args.reduce:
+        from feature_reduction import REDUCTION_METHODS
+        if args.reduce[0] not in REDUCTION_METHODS:
+            parser.error(f"--reduce METHOD must be one of {REDUCTION_METHODS}")
+        reduction = (args.reduce[0], int(args.reduce[1]))
+    main(seed=args.seed, strategy=args.strategy, budget=args.budget, oob=args.oob, reduction=reduction,
+         rerun_from=args.rerun_from, use_cache=not args.no_cache, cache_dir=args.cache_dir,
+         model_dir=args.model_dir, visuals_dir=args.visuals_dir, linear=args.linear,
+         linear_model_dir=args.linear_model_dir)
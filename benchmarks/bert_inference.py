@@ -0,0 +1,85 @@
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+import numpy as np
+
+# Run from the repo root: python benchmarks/bert_inference.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from instrumentation import peak_rss_mb
+
+'''
+summary:
+    Load time, single-review latency (p50/p95), batch throughput and peak memory of the BERT inference
+    artifacts bert_export.py writes to models/bert (fp32, int8, and with --onnx the ONNX graphs) across
+    intra-op thread counts. Every (engine, threads) run happens in a fresh process, so its peak RSS and
+    thread settings are its own. The reviews are BERT_model.py's test split, tiled --repeat times for
+    the batch pass.
+'''
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+def run_child(engine_name, threads, export_dir, single, repeat, batch_size, seed):
+    import BERT_model
+    from bert_export import load_engine, predict_proba
+
+    combined_data, _ = BERT_model.load_data()
+    _, test_indices = BERT_model.split_indices(combined_data['label'], seed)
+    texts = combined_data['text'].iloc[test_indices].tolist()
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    engine, tokenizer, _ = load_engine(engine_name, export_dir, threads)
+    load_seconds = time.perf_counter() - start
+    predict_proba(engine, tokenizer, texts[:batch_size], batch_size)  # warm up outside the timings
+
+    latencies = []
+    for text in texts[:single]:
+        start = time.perf_counter()
+        predict_proba(engine, tokenizer, [text], batch_size)
+        latencies.append(time.perf_counter() - start)
+
+    batch_texts = texts * repeat
+    start = time.perf_counter()
+    predict_proba(engine, tokenizer, batch_texts, batch_size)
+    batch_seconds = time.perf_counter() - start
+    print(json.dumps({'load_seconds': load_seconds, 'p50_ms': np.percentile(latencies, 50) * 1000,
+                      'p95_ms': np.percentile(latencies, 95) * 1000,
+                      'reviews_per_second': len(batch_texts) / batch_seconds,
+                      'peak_rss_mb': peak_rss_mb(), 'baseline_rss_mb': baseline}))
+
+def main(engines, threads_list, export_dir, single, repeat, batch_size, seed):
+    print(f"{'engine':<10} {'threads':>7} {'load s':>7} {'p50 ms':>7} {'p95 ms':>7} {'reviews/s':>10} "
+          f"{'peak RSS MB':>12} {'+ over data':>12}")
+    for engine in engines:
+        for threads in threads_list:
+            result = subprocess.run([sys.executable, __file__, '--child', engine, '--threads', str(threads),
+                                     '--export-dir', export_dir, '--single', str(single), '--repeat', str(repeat),
+                                     '--batch-size', str(batch_size), '--seed', str(seed)],
+                                    cwd=REPO_ROOT, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"{engine:<10} {threads:>7} failed: {result.stderr.strip().splitlines()[-1]}")
+                continue
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"{engine:<10} {threads:>7} {stats['load_seconds']:>7.2f} {stats['p50_ms']:>7.1f} "
+                  f"{stats['p95_ms']:>7.1f} {stats['reviews_per_second']:>10.1f} {stats['peak_rss_mb']:>12.0f} "
+                  f"{stats['peak_rss_mb'] - stats['baseline_rss_mb']:>12.0f}")
+
+if __name__ == "__main__":
+    from bert_export import ENGINES, EXPORT_DIR, BATCH_SIZE
+    parser = argparse.ArgumentParser(description="Latency, throughput and memory of the exported BERT engines")
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=['fp32', 'int8'])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4], help="intra-op thread counts")
+    parser.add_argument('--export-dir', default=EXPORT_DIR)
+    parser.add_argument('--single', type=int, default=50, help="reviews scored one at a time for the latency")
+    parser.add_argument('--repeat', type=int, default=5, help="tile the test reviews this many times for throughput")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--seed', type=int, default=42, help="BERT_model.py seed of the test split")
+    parser.add_argument('--child', choices=ENGINES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.child, args.threads[0], args.export_dir, args.single, args.repeat, args.batch_size, args.seed)
+    else:
+        main(args.engines, args.threads, args.export_dir, args.single, args.repeat, args.batch_size, args.seed)
@@ -0,0 +1,101 @@
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+import numpy as np
+
+# Run from the repo root: python benchmarks/bert_padding.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+'''
+summary:
+    Examples/sec of BERT_model.py's fine-tuning and test set prediction with every review padded to
+    MAX_LENGTH (the old setup) against per-batch dynamic padding with length-grouped/sorted batches, and
+    the test metrics of both. The attention mask hides the padding, so the class probabilities should
+    only differ by float rounding. Training runs --train-steps optimizer steps from the same initial
+    weights each way, prediction uses --checkpoint (a fine-tuned model directory, default an untuned
+    bert-base-uncased with a fresh classification head, which is enough for timing and parity).
+'''
+
+def setup(fixed_padding, tokenizer, combined_data, seed):
+    import BERT_model
+    tokenized_dataset = BERT_model.tokenize_dataset(combined_data, tokenizer, fixed_padding)
+    return BERT_model.split_dataset(tokenized_dataset, combined_data['label'], seed)
+
+def time_training(model, train_dataset, tokenizer, class_names, fixed_padding, steps, seed):
+    import BERT_model
+    with tempfile.TemporaryDirectory() as output_dir:
+        training_args = BERT_model.make_training_args(
+            output_dir, fixed_padding, seed=seed, max_steps=steps, eval_strategy='no', save_strategy='no',
+            load_best_model_at_end=False, warmup_steps=0, report_to=[], disable_tqdm=True)
+        trainer = BERT_model.make_trainer(model, training_args, train_dataset, None, tokenizer, class_names,
+                                          fixed_padding)
+        return trainer.train().metrics['train_samples_per_second']
+
+def time_prediction(model, test_dataset, tokenizer, class_names, fixed_padding, seed):
+    """(examples/sec, labels and class probabilities in the original test order)"""
+    import torch
+    import BERT_model
+    with tempfile.TemporaryDirectory() as output_dir:
+        training_args = BERT_model.make_training_args(output_dir, fixed_padding, seed=seed, report_to=[],
+                                                      disable_tqdm=True)
+        trainer = BERT_model.make_trainer(model, training_args, None, test_dataset, tokenizer, class_names,
+                                          fixed_padding)
+        start = time.perf_counter()
+        predictions = trainer.predict(test_dataset)
+        seconds = time.perf_counter() - start
+    probabilities = torch.nn.functional.softmax(torch.tensor(predictions.predictions), dim=-1).numpy()
+    # Both test sets are sorted by length, ties can land in a different order, so line them up by row id
+    order = np.argsort(test_dataset['row_id'], kind='stable')
+    return len(test_dataset) / seconds, np.asarray(test_dataset['label'])[order], probabilities[order]
+
+def main(checkpoint, train_steps, threads, seed):
+    import copy
+    import torch
+    from transformers import BertTokenizerFast, BertForSequenceClassification
+    import BERT_model
+    from model_evaluation import evaluate_probabilities
+
+    if threads:
+        torch.set_num_threads(threads)
+    combined_data, le = BERT_model.load_data()
+    combined_data['row_id'] = np.arange(len(combined_data))
+    tokenizer = BertTokenizerFast.from_pretrained(checkpoint or BERT_model.BERT_MODEL_NAME)
+    if checkpoint:
+        model = BertForSequenceClassification.from_pretrained(checkpoint)
+    else:
+        torch.manual_seed(seed)
+        model = BERT_model.make_model(len(le.classes_))
+    print(f"{len(combined_data)} reviews, {torch.get_num_threads()} threads\n")
+
+    results = {}
+    for name, fixed_padding in [('fixed (128)', True), ('dynamic', False)]:
+        train_dataset, test_dataset = setup(fixed_padding, tokenizer, combined_data, seed)
+        padded_tokens = len(test_dataset) * BERT_model.MAX_LENGTH if fixed_padding else sum(test_dataset['length'])
+        train_speed = (time_training(copy.deepcopy(model), train_dataset, tokenizer, le.classes_, fixed_padding,
+                                     train_steps, seed) if train_steps else None)
+        predict_speed, y_true, probabilities = time_prediction(model, test_dataset, tokenizer, le.classes_,
+                                                               fixed_padding, seed)
+        results[name] = dict(train_speed=train_speed, predict_speed=predict_speed, probabilities=probabilities,
+                             tokens=padded_tokens, evaluation=evaluate_probabilities(y_true, probabilities,
+                                                                                     le.classes_))
+
+    print(f"{'padding':<12} {'train ex/s':>11} {'predict ex/s':>13} {'test tokens':>12} {'accuracy':>9} "
+          f"{'macro-F1':>9} {'ROC-AUC':>8}")
+    for name, result in results.items():
+        train_speed = f"{result['train_speed']:.1f}" if result['train_speed'] is not None else '-'
+        evaluation = result['evaluation']
+        print(f"{name:<12} {train_speed:>11} {result['predict_speed']:>13.1f} {result['tokens']:>12,} "
+              f"{evaluation['accuracy']:>9.4f} {evaluation['f1_macro']:>9.4f} {evaluation['roc_auc']:>8.4f}")
+    fixed, dynamic = results.values()
+    print(f"\nmax |probability difference| {np.abs(fixed['probabilities'] - dynamic['probabilities']).max():.2e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare fixed-length and dynamic padding for BERT")
+    parser.add_argument('--checkpoint', help="fine-tuned model directory, default an untuned bert-base-uncased")
+    parser.add_argument('--train-steps', type=int, default=20, help="optimizer steps timed each way (0 to skip)")
+    parser.add_argument('--threads', type=int, help="torch intra-op threads")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    main(args.checkpoint, args.train_steps, args.threads, args.seed)
@@ -0,0 +1,71 @@
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+import numpy as np
+
+'''
+summary:
+    Time-to-first-prediction of a fresh scoring process, before and after the fast-start changes.
+    Each run starts a new interpreter that imports sentiment_scorer, loads the models and scores one
+    review. "before" reproduces the old start-up by importing matplotlib/seaborn up front and loading
+    the three joblib files normally, "fast start" uses lazy imports and the memory-mapped bundle,
+    "flat engine" memory-maps the flattened forest from forest_engine.py instead of the sklearn one.
+'''
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+CHILD_SCRIPT = '''
+import time
+start = time.perf_counter()
+import json, sys, warnings
+warnings.filterwarnings('ignore')
+sys.path.insert(0, '.')
+if {eager_plotting}:
+    import matplotlib.pyplot
+    import seaborn
+import sentiment_scorer
+imported = time.perf_counter()
+model, vectorizer, label_encoder = sentiment_scorer.load_models(fast_start={fast_start}, engine='{engine}')
+loaded = time.perf_counter()
+sentiment_scorer.get_text_sentiment('great service, very helpful support team', model, vectorizer, label_encoder)
+predicted = time.perf_counter()
+print(json.dumps({{'import': imported - start, 'load': loaded - imported, 'predict': predicted - loaded}}))
+'''
+
+MODES = {
+    'before': {'eager_plotting': True, 'fast_start': False, 'engine': 'sklearn'},
+    'fast start': {'eager_plotting': False, 'fast_start': True, 'engine': 'sklearn'},
+    'flat engine': {'eager_plotting': False, 'fast_start': True, 'engine': 'flat'},
+}
+
+def time_first_prediction(eager_plotting, fast_start, engine):
+    """Wall time of a new process up to its first prediction, plus the in-process breakdown"""
+    script = CHILD_SCRIPT.format(eager_plotting=eager_plotting, fast_start=fast_start, engine=engine)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', script], cwd=REPO_ROOT,
+                            capture_output=True, text=True, check=True)
+    total = time.perf_counter() - start
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    phases['total'] = total
+    return phases
+
+def main(repeats):
+    if not (REPO_ROOT / 'models' / 'fast_start.joblib').exists():
+        subprocess.run([sys.executable, 'sentiment_scorer.py', '--export-fast-start'], cwd=REPO_ROOT, check=True)
+
+    print(f"Median of {repeats} runs (seconds)\n")
+    print(f"{'mode':<12} {'import':>8} {'load':>8} {'predict':>8} {'total':>8}")
+    for name, settings in MODES.items():
+        runs = [time_first_prediction(**settings) for _ in range(repeats)]
+        medians = {phase: np.median([run[phase] for run in runs]) for phase in runs[0]}
+        print(f"{name:<12} {medians['import']:>8.3f} {medians['load']:>8.3f} "
+              f"{medians['predict']:>8.3f} {medians['total']:>8.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark scoring start-up time")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+    main(args.repeats)
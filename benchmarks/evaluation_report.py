@@ -0,0 +1,92 @@
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score, classification_report, confusion_matrix
+
+# Run from the repo root: python benchmarks/evaluation_report.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from model_evaluation import evaluate_classifier, report_figures, plot_feature_importance, render_figures
+import sentiment_scorer
+import TF_IDF_model
+
+'''
+summary:
+    Time to evaluate the saved forest in models/ (or --model-dir) and draw the four TF-IDF report
+    figures, the way TF_IDF_model.py used to (predict + predict_proba, metrics computed again for the
+    plots, figures drawn one after the other) against model_evaluation.py (one predict_proba pass, figures
+    drawn in parallel worker processes). --repeat tiles the test set to make the forest passes larger.
+    Figures are written to a temporary directory.
+'''
+
+def evaluate_twice(model, X_test, y_test):
+    """The old evaluate_model + plots cell: two forest passes, metrics computed twice"""
+    y_pred = model.predict(X_test)
+    y_pred_proba = model.predict_proba(X_test)
+    for _ in range(2):
+        accuracy_score(y_test, y_pred)
+        f1_score(y_test, y_pred, average='macro')
+        roc_auc_score(y_test, y_pred_proba, multi_class='ovr')
+    classification_report(y_test, y_pred)
+    confusion_matrix(y_test, y_pred)
+    return y_pred
+
+def figure_jobs(evaluation, model, vectorizer, output_dir):
+    figures = report_figures(evaluation, 'Text-Only', output_dir, 'Text-Only Confusion Matrix', 'confusion_text_only')
+    # Names of the forest's input columns, the reduced ones when load_models chained a feature reducer
+    feature_names = vectorizer.get_feature_names_out()
+    figures.append((plot_feature_importance, dict(importances=model.feature_importances_, feature_names=feature_names,
+                                                  title='Text-Only Model',
+                                                  output_path=Path(output_dir) / 'feature_importance_text.png')))
+    return figures
+
+def test_data(vectorizer, seed):
+    """TF_IDF_model.py's test split, transformed by the saved vectorizer (and feature reducer)"""
+    combined_data, _, labels = TF_IDF_model.load_data()
+    _, test_index = TF_IDF_model.split_indices(labels, seed)
+    return vectorizer.transform(combined_data['Feedback'].iloc[test_index]), labels[test_index]
+
+def main(repeat, n_jobs, model_dir):
+    import scipy.sparse as sp
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401 (imported up front so neither side pays for it)
+    import seaborn  # noqa: F401
+
+    model, vectorizer, label_encoder = sentiment_scorer.load_models(model_dir=model_dir)
+    seed = TF_IDF_model.training_seed(model_dir)
+    X_test, y_test = test_data(vectorizer, TF_IDF_model.DEFAULT_SEED if seed is None else seed)
+    # svd reduction gives dense features
+    X_test = sp.vstack([X_test] * repeat).tocsr() if sp.issparse(X_test) else np.vstack([X_test] * repeat)
+    y_test = np.tile(y_test, repeat)
+    print(f"{X_test.shape[0]:,} test rows, {model.n_estimators} trees\n")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        evaluate_twice(model, X_test, y_test)
+        old_evaluate = time.perf_counter() - start
+        start = time.perf_counter()
+        evaluation = evaluate_classifier(model, X_test, y_test, label_encoder.classes_)
+        new_evaluate = time.perf_counter() - start
+
+        jobs = figure_jobs(evaluation, model, vectorizer, output_dir)
+        start = time.perf_counter()
+        render_figures(jobs, n_jobs=1)
+        serial_plots = time.perf_counter() - start
+        start = time.perf_counter()
+        render_figures(jobs, n_jobs=n_jobs)
+        parallel_plots = time.perf_counter() - start
+
+    print(f"{'':<22} {'evaluate s':>11} {'figures s':>10} {'total s':>8}")
+    print(f"{'predict x2, serial':<22} {old_evaluate:>11.2f} {serial_plots:>10.2f} {old_evaluate + serial_plots:>8.2f}")
+    print(f"{'one pass, parallel':<22} {new_evaluate:>11.2f} {parallel_plots:>10.2f} {new_evaluate + parallel_plots:>8.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the old and shared evaluation/report paths")
+    parser.add_argument('--repeat', type=int, default=1, help="tile the test set this many times")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="figure worker processes")
+    parser.add_argument('--model-dir', default=sentiment_scorer.MODEL_DIR)
+    args = parser.parse_args()
+    main(args.repeat, args.n_jobs, args.model_dir)
@@ -0,0 +1,82 @@
+import io
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+import joblib
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score
+
+# Run from the repo root: python benchmarks/feature_reduction.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from feature_reduction import REDUCTION_METHODS, make_reducer
+from search_strategies import split_data
+
+'''
+summary:
+    Training time, scoring latency, model size and macro-F1 of the forest with and without a feature
+    reduction stage, for several k. Uses the train/test split from search_strategies.py and the
+    hyperparameters of the saved model in models/, with SMOTE applied after the reduction like
+    TF_IDF_model.py does. Scoring covers reducer + forest (the TF-IDF transform is the same for every k).
+'''
+
+def serialized_mb(*objects):
+    buffer = io.BytesIO()
+    joblib.dump(objects, buffer)
+    return buffer.tell() / 1e6
+
+def single_row_ms(predict, X, repeats=50):
+    times = []
+    for i in range(repeats):
+        row = X[i % X.shape[0]]
+        start = time.perf_counter()
+        predict(row)
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1000
+
+def run(method, k, X_train, y_train, X_test, y_test, forest_params, seed):
+    from imblearn.over_sampling import SMOTE
+    start = time.perf_counter()
+    reducer = None
+    if method is not None:
+        reducer = make_reducer(method, k, random_state=seed)
+        X_train = reducer.fit_transform(X_train, y_train)
+    X_resampled, y_resampled = SMOTE(random_state=seed).fit_resample(X_train, y_train)
+    forest = RandomForestClassifier(**forest_params).fit(X_resampled, y_resampled)
+    train_seconds = time.perf_counter() - start
+
+    def predict_proba(X):
+        return forest.predict_proba(reducer.transform(X) if reducer is not None else X)
+
+    start = time.perf_counter()
+    y_pred = np.argmax(predict_proba(X_test), axis=1)
+    batch_seconds = time.perf_counter() - start
+    return {
+        'train_seconds': train_seconds,
+        'single_ms': single_row_ms(predict_proba, X_test),
+        'rows_per_second': X_test.shape[0] / batch_seconds,
+        'size_mb': serialized_mb(forest, reducer),
+        'f1_macro': f1_score(y_test, y_pred, average='macro'),
+    }
+
+def main(methods, ks, seed):
+    X_train, y_train, X_test, y_test = split_data(seed)
+    forest_params = joblib.load('models/random_forest_model.joblib').get_params()
+    forest_params.update(random_state=seed, n_jobs=1)
+    print(f"{X_train.shape[0]} training rows, {X_test.shape[0]} test rows, {X_train.shape[1]} TF-IDF features\n")
+
+    print(f"{'reduction':<12} {'k':>6} {'train s':>8} {'1 row ms':>9} {'rows/sec':>9} {'size MB':>8} {'macro-F1':>9}")
+    configs = [(None, X_train.shape[1])] + [(method, k) for method in methods for k in ks if k < X_train.shape[1]]
+    for method, k in configs:
+        result = run(method, k, X_train, y_train, X_test, y_test, forest_params, seed)
+        print(f"{method or 'none':<12} {k:>6} {result['train_seconds']:>8.2f} {result['single_ms']:>9.2f} "
+              f"{result['rows_per_second']:>9,.0f} {result['size_mb']:>8.2f} {result['f1_macro']:>9.4f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep feature reduction settings for the random forest")
+    parser.add_argument('--methods', nargs='+', choices=REDUCTION_METHODS, default=['chi2', 'svd'])
+    parser.add_argument('--k', type=int, nargs='+', default=[50, 200, 500, 1000])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    main(args.methods, args.k, args.seed)
@@ -0,0 +1,79 @@
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+import numpy as np
+import joblib
+import scipy.sparse as sp
+from sklearn.ensemble import RandomForestClassifier
+
+# Run from the repo root: python benchmarks/forest_compaction.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import TF_IDF_model
+import forest_engine
+from forest_compaction import compact_forest, save_compact_forest, load_compact_forest, measure
+from search_strategies import split_data
+
+'''
+summary:
+    Artifact size, load time, scoring throughput and macro-F1 of the random forest before and after
+    forest_compaction.py, for several compaction settings. The forest is fitted on TF_IDF_model.py's
+    train split (after SMOTE) with the hyperparameters of models/random_forest_model.joblib, or with
+    --unpruned the largest ones in rf_params (max_depth=None, min_samples_leaf=1), and every artifact is
+    scored on the held-out test rows (tiled --repeat times for the throughput numbers).
+'''
+
+# (name, n_trees, max_depth, tolerance, compress)
+SETTINGS = [
+    ('lossless', None, None, 0.0, 0),
+    ('lossless, zlib 3', None, None, 0.0, 3),
+    ('200 trees', 200, None, 0.0, 0),
+    ('depth 15', None, 15, 0.0, 0),
+    ('tolerance 0.01', None, None, 0.01, 0),
+    ('tolerance 0.03', None, None, 0.03, 0),
+    ('200 trees, tol 0.01, zlib 3', 200, None, 0.01, 3),
+]
+
+def main(unpruned, seed, repeat):
+    X_train, y_train, X_test, y_test = split_data(seed)
+    X_train, y_train = TF_IDF_model.resample(X_train, y_train, seed)
+    params = joblib.load('models/random_forest_model.joblib').get_params()
+    if unpruned:
+        params.update(max_depth=None, min_samples_leaf=1, min_samples_split=2)
+    params.update(random_state=seed)
+    forest = RandomForestClassifier(**params).fit(X_train, y_train)
+    X_test, y_test = sp.vstack([X_test] * repeat).tocsr(), np.tile(y_test, repeat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        sklearn_path = f'{directory}/random_forest_model.joblib'
+        joblib.dump(forest, sklearn_path)
+        flat_path = f'{directory}/random_forest_flat.joblib'
+        forest_engine.FlatForest.from_sklearn(forest).save(flat_path)
+        results = [(measure('sklearn forest', sklearn_path, joblib.load, X_test, y_test), forest.n_estimators,
+                    sum(e.tree_.node_count for e in forest.estimators_)),
+                   (measure('flat (float64)', flat_path, forest_engine.load_forest, X_test, y_test), None, None)]
+        results[1] = (results[1][0], forest.n_estimators, results[0][2])
+        for name, n_trees, max_depth, tolerance, compress in SETTINGS:
+            path = f'{directory}/{len(results)}.joblib'
+            flat_forest = compact_forest(forest, n_trees, max_depth, tolerance)
+            save_compact_forest(flat_forest, path, compress)
+            results.append((measure(name, path, load_compact_forest, X_test, y_test), flat_forest.n_estimators,
+                            flat_forest.node_count))
+
+    expected = results[0][0]['probabilities']
+    print(f"\n{X_test.shape[0]:,} test rows, forest params: max_depth={params['max_depth']}, "
+          f"min_samples_leaf={params['min_samples_leaf']}, n_estimators={params['n_estimators']}\n")
+    print(f"{'artifact':<38} {'trees':>5} {'nodes':>9} {'size MB':>8} {'load ms':>8} {'rows/sec':>9} "
+          f"{'macro-F1':>9} {'max |dp|':>9}")
+    for result, n_trees, n_nodes in results:
+        difference = np.abs(result['probabilities'] - expected).max()
+        print(f"{result['name']:<38} {n_trees:>5} {n_nodes:>9,} {result['size_mb']:>8.2f} {result['load_ms']:>8.1f} "
+              f"{result['rows_per_second']:>9,.0f} {result['f1_macro']:>9.4f} {difference:>9.2e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare compacted forest artifacts")
+    parser.add_argument('--unpruned', action='store_true', help="fit the largest forest in rf_params instead")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=50, help="tile the test rows this many times")
+    args = parser.parse_args()
+    main(args.unpruned, args.seed, args.repeat)
@@ -0,0 +1,74 @@
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Run from the repo root: python benchmarks/forest_engine.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import forest_engine
+import sentiment_scorer
+
+'''
+summary:
+    Latency/throughput of sklearn's RandomForestClassifier.predict_proba against the flattened
+    FlatForest engine (compiled kernel when numba is installed, and the NumPy fallback), on the
+    same TF-IDF rows, plus the max absolute probability difference.
+'''
+
+def time_calls(predict_proba, X, batch_size, min_seconds=1.0):
+    """Median seconds per call and rows/sec for predict_proba on consecutive batches of X"""
+    call_times = []
+    start = time.perf_counter()
+    position = 0
+    while time.perf_counter() - start < min_seconds or len(call_times) < 3:
+        batch = X[position:position + batch_size]
+        if batch.shape[0] < batch_size:
+            position = 0
+            continue
+        call_start = time.perf_counter()
+        predict_proba(batch)
+        call_times.append(time.perf_counter() - call_start)
+        position += batch_size
+    median = np.median(call_times)
+    return median, batch_size / median
+
+def main(input_path, n_rows, batch_sizes, model_dir):
+    # The vectorizer comes with the feature reducer chained in when the forest was trained on reduced features
+    forest, vectorizer, _ = sentiment_scorer.load_models(model_dir=model_dir)
+    flat_forest = forest_engine.FlatForest.from_sklearn(forest)
+
+    texts = pd.read_csv(input_path, usecols=['Feedback'])['Feedback'].fillna('').tolist()
+    texts = (texts * (n_rows // len(texts) + 1))[:n_rows]
+    X = vectorizer.transform(texts)
+
+    expected = forest.predict_proba(X)
+    engines = {
+        'sklearn': forest.predict_proba,
+        # What FlatForest falls back to without numba
+        'flat (numpy)': lambda batch: flat_forest.predict_proba(batch, compiled=False),
+    }
+    if forest_engine.njit is not None:
+        flat_forest.predict_proba(X[:1])  # compile (or load the cached kernel) before timing
+        engines['flat (compiled)'] = flat_forest.predict_proba
+
+    print(f"{forest.n_estimators} trees, {flat_forest.node_count:,} nodes, {X.shape[0]:,} rows\n")
+    for name, predict_proba in engines.items():
+        difference = np.abs(predict_proba(X) - expected).max()
+        print(f"{name:<16} max |difference| vs sklearn: {difference:.2e}")
+
+    print(f"\n{'engine':<16} {'batch':>6} {'ms/call':>9} {'rows/sec':>12}")
+    for batch_size in batch_sizes:
+        for name, predict_proba in engines.items():
+            seconds, rows_per_second = time_calls(predict_proba, X, batch_size)
+            print(f"{name:<16} {batch_size:>6} {seconds * 1000:>9.2f} {rows_per_second:>12,.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the flattened forest engine against sklearn")
+    parser.add_argument('--input', default='clean-data/labeled_feedback.csv')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 16, 256, 4096])
+    parser.add_argument('--model-dir', default=sentiment_scorer.MODEL_DIR, help="random forest artifacts to benchmark")
+    args = parser.parse_args()
+    main(args.input, args.rows, args.batch_sizes, args.model_dir)
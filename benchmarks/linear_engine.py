@@ -0,0 +1,101 @@
+import io
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+import joblib
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score
+
+# Run from the repo root: python benchmarks/linear_engine.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import TF_IDF_model
+from sentiment_scorer import get_text_sentiment, get_text_probabilities_batch
+from search_strategies import split_data
+
+'''
+summary:
+    Latency, throughput, size and macro-F1 of the sparse linear models TF_IDF_model.py --linear trains
+    against the random forest, on the same train/test split and SMOTE-resampled TF-IDF features.
+    The forest uses the hyperparameters of models/random_forest_model.joblib, refitted on the split so
+    its F1 isn't inflated by test rows it was trained on. "model" times only predict_proba on
+    already-vectorized rows, "end-to-end" includes the TF-IDF transform, single rows go through
+    sentiment_scorer.get_text_sentiment and batches through get_text_probabilities_batch.
+'''
+
+def serialized_mb(model):
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.tell() / 1e6
+
+def median_us(call, items, repeats=200):
+    times = []
+    for i in range(repeats):
+        item = items[i % len(items)]
+        start = time.perf_counter()
+        call(item)
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1e6
+
+def main(batch_rows, seed):
+    X_train, y_train, X_test, y_test = split_data(seed)
+    X_resampled, y_resampled = TF_IDF_model.resample(X_train, y_train, seed)
+    combined_data, label_encoder, labels = TF_IDF_model.load_data()
+    vectorizer, _ = TF_IDF_model.vectorize(combined_data['Feedback'])
+    _, test_index = TF_IDF_model.split_indices(labels, seed)
+    test_texts = combined_data['Feedback'].iloc[test_index].tolist()
+    batch_texts = (test_texts * (batch_rows // len(test_texts) + 1))[:batch_rows]
+    X_batch = vectorizer.transform(batch_texts)
+
+    forest_params = joblib.load('models/random_forest_model.joblib').get_params()
+    forest_params.update(random_state=seed)
+    trainers = {
+        'random forest': lambda: RandomForestClassifier(**forest_params).fit(X_resampled, y_resampled),
+        'logistic': lambda: TF_IDF_model.train_linear_model(X_resampled, y_resampled, 'logistic', seed),
+        'svm': lambda: TF_IDF_model.train_linear_model(X_resampled, y_resampled, 'svm', seed),
+    }
+
+    results = []
+    for name, train in trainers.items():
+        start = time.perf_counter()
+        model = train()
+        train_seconds = time.perf_counter() - start
+        X_rows = [X_test[i] for i in range(X_test.shape[0])]
+
+        start = time.perf_counter()
+        model.predict_proba(X_batch)
+        batch_model = time.perf_counter() - start
+        start = time.perf_counter()
+        get_text_probabilities_batch(batch_texts, model, vectorizer)
+        batch_end_to_end = time.perf_counter() - start
+
+        y_pred = model.classes_[np.argmax(model.predict_proba(X_test), axis=1)]
+        results.append({
+            'name': name,
+            'train_seconds': train_seconds,
+            'single_model_us': median_us(model.predict_proba, X_rows),
+            'single_end_to_end_us': median_us(lambda text: get_text_sentiment(text, model, vectorizer, label_encoder),
+                                              test_texts),
+            'batch_model_us': batch_model / batch_rows * 1e6,
+            'batch_end_to_end_us': batch_end_to_end / batch_rows * 1e6,
+            'size_mb': serialized_mb(model),
+            'f1_macro': f1_score(y_test, y_pred, average='macro'),
+        })
+
+    print(f"\n{X_resampled.shape[0]} training rows (after SMOTE), {X_test.shape[0]} test rows, "
+          f"{X_test.shape[1]} TF-IDF features, batches of {batch_rows:,} rows")
+    print(f"\n{'':<14} {'train s':>8} {'----- 1 review (us) -----':>26} {'-- per review in batch (us) --':>31} "
+          f"{'size MB':>8} {'macro-F1':>9}")
+    print(f"{'model':<14} {'':>8} {'model':>12} {'end-to-end':>13} {'model':>15} {'end-to-end':>15}")
+    for r in results:
+        print(f"{r['name']:<14} {r['train_seconds']:>8.2f} {r['single_model_us']:>12,.0f} "
+              f"{r['single_end_to_end_us']:>13,.0f} {r['batch_model_us']:>15,.2f} {r['batch_end_to_end_us']:>15,.2f} "
+              f"{r['size_mb']:>8.2f} {r['f1_macro']:>9.4f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the sparse linear models with the random forest")
+    parser.add_argument('--batch-rows', type=int, default=20000, help="rows per batch in the throughput test")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    main(args.batch_rows, args.seed)
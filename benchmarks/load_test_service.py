@@ -0,0 +1,95 @@
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+import urllib.request
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+'''
+summary:
+    Localhost load test for scoring_service.py. For every --max-wait-ms setting a fresh service is
+    started on 127.0.0.1, --clients threads send single-review requests back to back for --seconds,
+    and the client-side latency percentiles and throughput are printed next to the service's own /stats.
+    A max wait of 0 scores every request on its own (no coalescing), which is the baseline.
+'''
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+def post_json(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+def get_json(url):
+    with urllib.request.urlopen(url) as response:
+        return json.loads(response.read())
+
+def start_service(port, max_wait_ms, max_batch_size, engine):
+    process = subprocess.Popen(
+        [sys.executable, 'scoring_service.py', '--port', str(port), '--max-wait-ms', str(max_wait_ms),
+         '--max-batch-size', str(max_batch_size), '--engine', engine],
+        cwd=REPO_ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    # The service prints "listening" once the models are loaded and warmed up
+    for line in process.stdout:
+        if 'listening' in line:
+            return process
+    raise RuntimeError("scoring service exited before it started listening")
+
+def run_clients(url, texts, n_clients, seconds):
+    """Each client posts one review at a time until the deadline, return all latencies and the elapsed time"""
+    latencies = [[] for _ in range(n_clients)]
+    deadline = time.perf_counter() + seconds
+
+    def client(i):
+        rng = np.random.default_rng(i)
+        while time.perf_counter() < deadline:
+            j = rng.integers(len(texts))
+            start = time.perf_counter()
+            post_json(url, {'text': texts[j], 'rating': 4})
+            latencies[i].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.concatenate([np.array(l) for l in latencies]), time.perf_counter() - start
+
+def main(input_path, n_clients, seconds, max_waits, max_batch_size, engine, port):
+    texts = pd.read_csv(input_path, usecols=['Feedback'])['Feedback'].dropna().astype(str).tolist()
+
+    print(f"{n_clients} concurrent clients, {seconds}s per setting, engine={engine}\n")
+    print(f"{'max wait':>9} {'requests/s':>11} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'service p50':>12} {'service p99':>12} {'mean batch':>11}")
+    for max_wait_ms in max_waits:
+        service = start_service(port, max_wait_ms, max_batch_size, engine)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            latencies, elapsed = run_clients(f"{base_url}/score", texts, n_clients, seconds)
+            stats = get_json(f"{base_url}/stats")
+        finally:
+            service.terminate()
+            service.wait()
+        latencies = latencies * 1000
+        print(f"{max_wait_ms:>7.1f}ms {len(latencies) / elapsed:>11.1f} "
+              f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f} "
+              f"{stats['latency_ms_p50']:>12.2f} {stats['latency_ms_p99']:>12.2f} {stats['mean_batch_size']:>11.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the local scoring service")
+    parser.add_argument('--input', default='clean-data/labeled_feedback.csv')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--max-wait-ms', type=float, nargs='+', default=[0.0, 2.0, 5.0, 10.0])
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--engine', choices=['sklearn', 'flat'], default='sklearn')
+    parser.add_argument('--port', type=int, default=8766)
+    args = parser.parse_args()
+    main(args.input, args.clients, args.seconds, args.max_wait_ms, args.max_batch_size, args.engine, args.port)
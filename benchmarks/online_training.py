@@ -0,0 +1,85 @@
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Run from the repo root: python benchmarks/online_training.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from instrumentation import peak_rss_mb
+import SGD_online_model
+
+'''
+summary:
+    Peak memory, training time and held-out macro-F1 of the in-memory TF-IDF + random forest training
+    against the out-of-core HashingVectorizer + SGD training in SGD_online_model.py, as the corpus grows.
+    The corpus is grown by streaming the same sources --repeat times, every run happens in a fresh process
+    so its peak RSS is its own, and both models are scored on the same hash-selected holdout rows.
+'''
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+def train_in_memory(repeat):
+    """The TF_IDF_model.py path: whole corpus in pandas, TF-IDF vocabulary, SMOTE, forest"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.metrics import f1_score
+    from imblearn.over_sampling import SMOTE
+
+    chunks = list(SGD_online_model.stream_labeled_chunks(chunksize=100000, repeat=repeat))
+    texts = np.concatenate([texts for texts, _ in chunks])
+    labels = np.concatenate([labels for _, labels in chunks])
+    holdout = SGD_online_model.holdout_mask(texts)
+
+    label_encoder = LabelEncoder().fit(SGD_online_model.SENTIMENT_CLASSES)
+    vectorizer = TfidfVectorizer(max_features=5000, ngram_range=(1, 2))
+    X_train = vectorizer.fit_transform(texts[~holdout])
+    y_train = label_encoder.transform(labels[~holdout])
+    X_train, y_train = SMOTE(random_state=42).fit_resample(X_train, y_train)
+    model = RandomForestClassifier(n_estimators=400, max_depth=25, class_weight='balanced_subsample',
+                                   random_state=42, n_jobs=-1).fit(X_train, y_train)
+    y_pred = model.predict(vectorizer.transform(texts[holdout]))
+    return f1_score(label_encoder.transform(labels[holdout]), y_pred, average='macro')
+
+def train_out_of_core(repeat):
+    model, vectorizer, label_encoder = SGD_online_model.train_online(chunksize=10000, repeat=repeat)
+    return SGD_online_model.evaluate_online(model, vectorizer, label_encoder, chunksize=10000, repeat=repeat)['f1_macro']
+
+MODES = {
+    'in-memory RF': train_in_memory,
+    'out-of-core SGD': train_out_of_core,
+}
+
+def run_child(mode, repeat):
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    f1 = MODES[mode](repeat)
+    print(json.dumps({'seconds': time.perf_counter() - start, 'f1_macro': f1,
+                      'peak_rss_mb': peak_rss_mb(), 'baseline_rss_mb': baseline}))
+
+def main(repeats):
+    rows = sum(len(pd.read_csv(path, usecols=[text_column])) for path, text_column, _, _ in SGD_online_model.SOURCES)
+    print(f"{'mode':<16} {'rows':>9} {'train s':>8} {'peak RSS MB':>12} {'+ over imports':>15} {'macro-F1':>9}")
+    for repeat in repeats:
+        for mode in MODES:
+            result = subprocess.run([sys.executable, __file__, '--child', mode, '--repeat', str(repeat)],
+                                    cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"{mode:<16} {rows * repeat:>9,} {stats['seconds']:>8.1f} {stats['peak_rss_mb']:>12.0f} "
+                  f"{stats['peak_rss_mb'] - stats['baseline_rss_mb']:>15.0f} {stats['f1_macro']:>9.4f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare in-memory and out-of-core training")
+    parser.add_argument('--repeats', type=int, nargs='+', default=[1, 10, 50],
+                        help="corpus sizes, as multiples of the labeled + external data")
+    parser.add_argument('--child', choices=list(MODES), help=argparse.SUPPRESS)
+    parser.add_argument('--repeat', type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.child, args.repeat)
+    else:
+        main(args.repeats)
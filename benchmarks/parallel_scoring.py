@@ -0,0 +1,57 @@
+import sys
+import os
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Run from the repo root: python benchmarks/parallel_scoring.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import sentiment_scorer
+
+'''
+summary:
+    Measures how sharded scoring in sentiment_scorer scales with the number of worker processes.
+    Every parallel run is checked against the single-process batch path, then rows/sec and the
+    speedup over one core are printed for each worker count.
+'''
+
+def load_texts(input_path, n_rows):
+    """Feedback texts from input_path, repeated or truncated to n_rows"""
+    texts = pd.read_csv(input_path, usecols=['Feedback'])['Feedback'].fillna('').tolist()
+    if n_rows:
+        texts = (texts * (n_rows // len(texts) + 1))[:n_rows]
+    return texts
+
+def main(input_path, n_rows, core_counts):
+    model, vectorizer, label_encoder = sentiment_scorer.load_models()
+    texts = load_texts(input_path, n_rows)
+    print(f"Scoring {len(texts):,} reviews on up to {max(core_counts)} cores ({os.cpu_count()} available)\n")
+
+    start = time.perf_counter()
+    expected = sentiment_scorer.get_text_probabilities_batch(texts, model, vectorizer)
+    baseline_seconds = time.perf_counter() - start
+
+    print(f"{'cores':>6} {'seconds':>9} {'rows/sec':>12} {'speedup':>8}  matches")
+    print(f"{1:>6} {baseline_seconds:>9.2f} {len(texts) / baseline_seconds:>12,.0f} {1:>8.2f}  -")
+    for n_jobs in core_counts:
+        if n_jobs == 1:
+            continue
+        with sentiment_scorer.make_scoring_pool(model, vectorizer, label_encoder, n_jobs) as pool:
+            # Start the workers before timing so process start-up is not counted
+            list(pool.map(sentiment_scorer._score_shard, [texts[:1]] * n_jobs))
+            start = time.perf_counter()
+            probabilities = sentiment_scorer.get_text_probabilities_parallel(texts, model, pool)
+            seconds = time.perf_counter() - start
+        matches = np.array_equal(probabilities, expected)
+        print(f"{n_jobs:>6} {seconds:>9.2f} {len(texts) / seconds:>12,.0f} "
+              f"{baseline_seconds / seconds:>8.2f}  {matches}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark multi-core sentiment scoring")
+    parser.add_argument('--input', default='clean-data/feedback_data_with_company.csv')
+    parser.add_argument('--rows', type=int, default=200000, help="number of reviews to score (0 = input as is)")
+    parser.add_argument('--cores', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    main(args.input, args.rows, args.cores)
@@ -0,0 +1,59 @@
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Run from the repo root: python benchmarks/scored_formats.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from columnar_io import OUTPUT_FORMATS, output_path_for, read_scored, write_scored
+
+'''
+summary:
+    File size, write time and read time of the scored feedback as CSV, Parquet and Arrow.
+    Reads are timed for every column and for the projection downstream consumers actually use
+    (Company Name plus the two sentiment scores).
+'''
+
+PROJECTED_COLUMNS = ['Company Name', 'text_sentiment', 'combined_sentiment']
+
+def best_of(function, repeats):
+    """Fastest of `repeats` calls, in seconds"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(input_path, n_rows, repeats):
+    scored = read_scored(input_path, float_precision='round_trip')
+    if n_rows:
+        scored = pd.concat([scored] * (n_rows // len(scored) + 1), ignore_index=True).iloc[:n_rows]
+    print(f"{len(scored):,} scored rows, best of {repeats} runs\n")
+
+    print(f"{'format':<8} {'size MB':>8} {'write s':>8} {'read all s':>11} {'read 3 cols s':>14}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for output_format in OUTPUT_FORMATS:
+            path = output_path_for(Path(tmp_dir) / 'scored', output_format)
+            write_seconds = best_of(lambda: write_scored(scored, path), repeats)
+            read_all_seconds = best_of(lambda: read_scored(path), repeats)
+            read_projected_seconds = best_of(lambda: read_scored(path, columns=PROJECTED_COLUMNS), repeats)
+
+            # Every format has to give back the same scores (CSV up to the last digit of the default float parser)
+            projected = read_scored(path, columns=PROJECTED_COLUMNS)
+            assert np.allclose(projected['text_sentiment'].to_numpy(), scored['text_sentiment'].to_numpy())
+
+            size_mb = path.stat().st_size / 1e6
+            print(f"{output_format:<8} {size_mb:>8.2f} {write_seconds:>8.3f} "
+                  f"{read_all_seconds:>11.3f} {read_projected_seconds:>14.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CSV against Parquet/Arrow for the scored feedback")
+    parser.add_argument('--input', default='clean-data/feedback_data_with_sentiment.csv')
+    parser.add_argument('--rows', type=int, default=0, help="replicate the input up to this many rows (0 = as is)")
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+    main(args.input, args.rows, args.repeats)
@@ -0,0 +1,62 @@
+import sys
+import argparse
+from pathlib import Path
+from sklearn.metrics import f1_score
+
+# Run from the repo root: python benchmarks/search_strategies.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from model_search import SEARCH_STRATEGIES, run_search
+import TF_IDF_model
+
+'''
+summary:
+    Fits, trees grown, fit time and macro-F1 of the hyperparameter search strategies in model_search.py
+    on the same training data TF_IDF_model.py builds (labeled feedback + external reviews, TF-IDF,
+    stratified 80/20 split, SMOTE), with a fixed seed so every strategy sees the same split.
+    The exhaustive grid fits 4,320 forests, pass --strategies grid halving random to include it.
+    --oob adds a warm_start run scored out-of-bag next to the cross-validated one.
+'''
+
+RF_PARAMS = TF_IDF_model.rf_params
+
+def split_data(seed):
+    """TF-IDF train/test split of labeled feedback + external reviews, before SMOTE (TF_IDF_model's stages)"""
+    combined_data, _, labels = TF_IDF_model.load_data()
+    _, features = TF_IDF_model.vectorize(combined_data['Feedback'])
+    train_index, test_index = TF_IDF_model.split_indices(labels, seed)
+    return features[train_index], labels[train_index], features[test_index], labels[test_index]
+
+def training_data(seed):
+    X_train, y_train, X_test, y_test = split_data(seed)
+    X_train, y_train = TF_IDF_model.resample(X_train, y_train, seed)
+    return X_train, y_train, X_test, y_test
+
+def main(strategies, budget, cv, seed, n_jobs, oob):
+    X_train, y_train, X_test, y_test = training_data(seed)
+    print(f"{X_train.shape[0]} training rows (after SMOTE), {X_test.shape[0]} test rows\n")
+
+    runs = [(strategy, False) for strategy in strategies]
+    if oob:
+        runs.append(('warm_start', True))
+    results = []
+    for strategy, use_oob in runs:
+        search, summary = run_search(X_train, y_train, RF_PARAMS, strategy=strategy, budget=budget, cv=cv,
+                                     random_state=seed, n_jobs=n_jobs, verbose=0, log_path=None, oob=use_oob)
+        summary['test_f1_macro'] = f1_score(y_test, search.best_estimator_.predict(X_test), average='macro')
+        results.append(summary)
+
+    print(f"\n{'strategy':<14} {'forests':>8} {'trees':>10} {'fit s':>9} {'CV F1':>7} {'test F1':>8}")
+    for summary in results:
+        print(f"{summary['strategy']:<14} {summary['n_fits']:>8,} {summary['n_trees']:>10,} "
+              f"{summary['fit_seconds']:>9.1f} {summary['best_cv_f1_macro']:>7.4f} {summary['test_f1_macro']:>8.4f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare random forest hyperparameter search strategies")
+    parser.add_argument('--strategies', nargs='+', choices=SEARCH_STRATEGIES, default=['halving', 'random', 'warm_start'])
+    parser.add_argument('--budget', type=int, default=60, help="candidates for the halving/random/warm_start searches")
+    parser.add_argument('--cv', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--oob', action='store_true', help="also run warm_start scored on out-of-bag samples")
+    args = parser.parse_args()
+    main(args.strategies, args.budget, args.cv, args.seed, args.n_jobs, args.oob)
@@ -0,0 +1,317 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+from pathlib import Path
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Run from the repo root: python benchmarks/synthetic_suite.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'data-cleaning'))
+from instrumentation import peak_rss_mb
+
+'''
+summary:
+    Throughput and peak memory of every pipeline stage on synthetic feedback corpora of growing size
+    (10k and 100k rows by default, 1M and 10M with --sizes), saved as a JSON baseline per commit so a
+    later run can be compared against it with --compare.
+    A corpus is generated from the labeled feedback and external reviews: each row takes a real text as
+    its template (so row lengths follow the real length distribution) and swaps at least two of its words
+    for words drawn from texts of the same sentiment, so large corpora don't collapse into duplicates.
+    Ratings follow the sentiment (map_sentiment in reverse), and 1% of the rows have no feedback and
+    2% repeat another row's feedback, so the cleaning stage has something to drop. Corpora are written
+    tab separated like the raw feedback export, to cache/synthetic/, and reused by later runs.
+    Every stage runs in a fresh process, so its peak RSS is its own; the RSS before the timed part
+    (imports, reading the corpus) is reported next to it. The stages:
+        clean          data-cleaning/feedback_cleaning.py's clean_feedback (needs nltk and its data)
+        vectorize      TF_IDF_model.py's TF-IDF fit_transform
+        train          stratified split, SMOTE and a fit of the forest in models/ (same parameters)
+        score          sentiment_scorer.py's batch scoring with the models in models/
+        write_csv / read_csv / write_parquet / read_parquet
+                       columnar_io.py on the corpus with the score columns added
+    A stage that fails (e.g. missing dependency, out of memory) is recorded with its error and the
+    suite moves on.
+'''
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CORPUS_DIR = 'cache/synthetic'
+BASELINE_DIR = 'reports/baselines'
+DEFAULT_SIZES = [10_000, 100_000]
+
+# Share of rows with no feedback, and of rows repeating another row's feedback
+MISSING_RATE = 0.01
+DUPLICATE_RATE = 0.02
+
+# Share of a template's words that are swapped (at least MIN_SWAPS per row)
+SWAP_RATE = 0.15
+MIN_SWAPS = 2
+
+GENERATE_CHUNK_SIZE = 100_000
+
+RATINGS = {'Negative': np.arange(1, 5), 'Neutral': np.array([5]), 'Positive': np.arange(6, 11)}
+
+def corpus_path(n_rows, seed):
+    return REPO_ROOT / CORPUS_DIR / f'feedback_{n_rows}_{seed}.csv'
+
+def load_templates():
+    """Real (text, sentiment) pairs the corpus is built from, and each sentiment's words"""
+    import TF_IDF_model
+    labeled = pd.read_csv(TF_IDF_model.TRAINING_DATA[0])
+    labeled['sentiment'] = labeled['p_sentiment'].apply(TF_IDF_model.map_sentiment)
+    reviews = TF_IDF_model.load_and_preprocess_external_data().rename(columns={'Sentiment': 'sentiment'})
+    templates = pd.concat([labeled[['Feedback', 'sentiment']], reviews[['Feedback', 'sentiment']]],
+                          ignore_index=True).dropna()
+    vocabulary = {sentiment: np.unique(' '.join(group['Feedback']).split())
+                  for sentiment, group in templates.groupby('sentiment')}
+    return templates, vocabulary, labeled['UserId'].dropna().unique()
+
+def synthetic_chunks(n_rows, seed, chunksize=GENERATE_CHUNK_SIZE):
+    """Synthetic raw feedback (Timestamp, Rating, Feedback, UserId, sentiment) in DataFrame chunks"""
+    rng = np.random.default_rng(seed)
+    templates, vocabulary, user_ids = load_templates()
+    template_texts = [text.split() for text in templates['Feedback']]
+    template_sentiments = templates['sentiment'].to_numpy()
+    days = pd.date_range('2024-01-01', '2024-12-31').strftime('%Y-%m-%d').to_numpy()
+
+    for start in range(0, n_rows, chunksize):
+        size = min(chunksize, n_rows - start)
+        picks = rng.integers(len(template_texts), size=size)
+        sentiments = template_sentiments[picks]
+        feedback = []
+        for pick, sentiment in zip(picks, sentiments):
+            text = list(template_texts[pick])
+            n_swaps = max(MIN_SWAPS, rng.binomial(len(text), SWAP_RATE))
+            words = vocabulary[sentiment]
+            for position in rng.choice(len(text), size=min(n_swaps, len(text)), replace=False):
+                text[position] = words[rng.integers(len(words))]
+            feedback.append(' '.join(text))
+        feedback = np.array(feedback, dtype=object)
+
+        duplicates = np.flatnonzero(rng.random(size) < DUPLICATE_RATE)
+        feedback[duplicates] = feedback[rng.integers(size, size=len(duplicates))]
+        feedback[rng.random(size) < MISSING_RATE] = None
+        ratings = np.array([rng.choice(RATINGS[sentiment]) for sentiment in sentiments])
+        yield pd.DataFrame({
+            'Timestamp': rng.choice(days, size=size),
+            'Rating': ratings,
+            'Feedback': feedback,
+            'UserId': rng.choice(user_ids, size=size),
+            'sentiment': sentiments,
+        })
+
+def ensure_corpus(n_rows, seed):
+    """Path of the n_rows corpus, generated first if it isn't in cache/synthetic yet"""
+    path = corpus_path(n_rows, seed)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    print(f"Generating {n_rows:,} synthetic rows to {path}...")
+    start = time.perf_counter()
+    # Written under a temporary name first, so an interrupted run never leaves a truncated corpus
+    temporary_path = path.with_suffix('.tmp')
+    lengths = []
+    for index, chunk in enumerate(synthetic_chunks(n_rows, seed)):
+        chunk.to_csv(temporary_path, sep='\t', index=False, mode='w' if index == 0 else 'a', header=index == 0)
+        lengths.append(chunk['Feedback'].dropna().str.len().to_numpy())
+    os.replace(temporary_path, path)
+    lengths = np.concatenate(lengths)
+    print(f"Generated in {time.perf_counter() - start:.1f}s, feedback length mean {lengths.mean():.0f}, "
+          f"median {np.median(lengths):.0f}, max {lengths.max()} chars")
+    return path
+
+def read_corpus(n_rows, seed, dropna=True):
+    corpus = pd.read_csv(corpus_path(n_rows, seed), sep='\t')
+    return corpus.dropna(subset=['Feedback']) if dropna else corpus
+
+def scored_corpus(n_rows, seed):
+    """The corpus with the columns sentiment_scorer.py adds, filled with random scores"""
+    from sentiment_scorer import combine_scores, score_to_sentiment_batch
+    corpus = read_corpus(n_rows, seed)
+    rng = np.random.default_rng(seed)
+    corpus['text_sentiment'] = rng.uniform(0, 10, len(corpus))
+    corpus['combined_sentiment'] = combine_scores(corpus['text_sentiment'], corpus['Rating'])
+    corpus['text_sentiment_class'] = score_to_sentiment_batch(corpus['text_sentiment'])
+    corpus['combined_sentiment_class'] = score_to_sentiment_batch(corpus['combined_sentiment'])
+    return corpus
+
+def scored_path(n_rows, seed, output_format, output_dir):
+    from columnar_io import OUTPUT_FORMATS
+    return Path(output_dir) / f'scored_{n_rows}_{seed}{OUTPUT_FORMATS[output_format]}'
+
+# Each stage takes (n_rows, seed, output_dir) and returns a function running the timed part,
+# everything before that (imports, reading the corpus) is setup
+
+def stage_clean(n_rows, seed, output_dir):
+    import feedback_cleaning
+    feedback_cleaning.download_nltk_data(quiet=True)
+    corpus = read_corpus(n_rows, seed, dropna=False)
+    return lambda: feedback_cleaning.clean_feedback(corpus)
+
+def stage_vectorize(n_rows, seed, output_dir):
+    import TF_IDF_model
+    texts = read_corpus(n_rows, seed)['Feedback']
+    return lambda: TF_IDF_model.vectorize(texts)
+
+def stage_train(n_rows, seed, output_dir):
+    import joblib
+    import TF_IDF_model
+    from sklearn.base import clone
+    corpus = read_corpus(n_rows, seed)
+    labels = joblib.load('models/label_encoder.joblib').transform(corpus['sentiment'])
+    _, X = TF_IDF_model.vectorize(corpus['Feedback'])
+    forest = clone(joblib.load('models/random_forest_model.joblib')).set_params(n_jobs=-1, random_state=seed)
+
+    def train():
+        train_index, _ = TF_IDF_model.split_indices(labels, seed)
+        X_train, y_train = TF_IDF_model.resample(X[train_index], labels[train_index], seed)
+        forest.fit(X_train, y_train)
+    return train
+
+def stage_score(n_rows, seed, output_dir):
+    from sentiment_scorer import load_models, get_text_probabilities_batch
+    model, vectorizer, _ = load_models()
+    texts = read_corpus(n_rows, seed)['Feedback']
+    return lambda: get_text_probabilities_batch(texts, model, vectorizer)
+
+def write_stage(output_format):
+    def stage(n_rows, seed, output_dir):
+        from columnar_io import write_scored
+        corpus = scored_corpus(n_rows, seed)
+        return lambda: write_scored(corpus, scored_path(n_rows, seed, output_format, output_dir))
+    return stage
+
+def read_stage(output_format):
+    def stage(n_rows, seed, output_dir):
+        from columnar_io import read_scored
+        return lambda: read_scored(scored_path(n_rows, seed, output_format, output_dir))
+    return stage
+
+STAGES = {
+    'clean': stage_clean,
+    'vectorize': stage_vectorize,
+    'train': stage_train,
+    'score': stage_score,
+    'write_csv': write_stage('csv'),
+    'read_csv': read_stage('csv'),
+    'write_parquet': write_stage('parquet'),
+    'read_parquet': read_stage('parquet'),
+}
+
+def run_child(stage, n_rows, seed, output_dir):
+    run = STAGES[stage](n_rows, seed, output_dir)
+    setup_rss = peak_rss_mb()
+    start = time.perf_counter()
+    run()
+    print(json.dumps({'seconds': time.perf_counter() - start, 'peak_rss_mb': peak_rss_mb(),
+                      'setup_rss_mb': setup_rss}))
+
+def run_stage(stage, n_rows, seed, output_dir):
+    result = subprocess.run([sys.executable, __file__, '--child', stage, '--rows', str(n_rows), '--seed', str(seed),
+                             '--output-dir', str(output_dir)], cwd=REPO_ROOT, capture_output=True, text=True)
+    record = {'stage': stage, 'rows': n_rows}
+    if result.returncode != 0:
+        error_lines = result.stderr.strip().splitlines() or [f'exit code {result.returncode}']
+        record['error'] = error_lines[-1]
+        return record
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    record.update(stats, rows_per_second=n_rows / stats['seconds'])
+    return record
+
+def git_commit():
+    """(commit hash, whether the working tree has uncommitted changes), (None, False) outside git"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, bool(status)
+
+def default_baseline_path(commit, dirty):
+    name = commit[:10] if commit else datetime.now().strftime('%Y%m%d_%H%M%S')
+    return REPO_ROOT / BASELINE_DIR / f"{name}{'-dirty' if dirty else ''}.json"
+
+def print_results(results):
+    print(f"\n{'stage':<14} {'rows':>11} {'seconds':>9} {'rows/sec':>11} {'peak RSS MB':>12} {'setup RSS MB':>13}")
+    for record in results:
+        if 'error' in record:
+            print(f"{record['stage']:<14} {record['rows']:>11,} failed: {record['error']}")
+            continue
+        print(f"{record['stage']:<14} {record['rows']:>11,} {record['seconds']:>9.2f} "
+              f"{record['rows_per_second']:>11,.0f} {record['peak_rss_mb']:>12.0f} {record['setup_rss_mb']:>13.0f}")
+
+def compare(results, baseline, threshold):
+    """Print throughput and peak memory against the baseline run, returns the number of regressions
+    (throughput down or peak memory up by more than threshold)"""
+    previous = {(record['stage'], record['rows']): record for record in baseline['results'] if 'error' not in record}
+    print(f"\nAgainst {baseline['commit'] or 'baseline'} ({baseline['created']}):")
+    if baseline['machine'] != machine_info():
+        print(f"Warning: the baseline was recorded on a different machine {baseline['machine']}")
+    print(f"{'stage':<14} {'rows':>11} {'rows/sec':>9} {'peak RSS':>9}")
+    regressions = 0
+    for record in results:
+        old = previous.get((record['stage'], record['rows']))
+        if old is None or 'error' in record:
+            continue
+        speed = record['rows_per_second'] / old['rows_per_second']
+        memory = record['peak_rss_mb'] / old['peak_rss_mb']
+        regressed = speed < 1 - threshold or memory > 1 + threshold
+        regressions += regressed
+        print(f"{record['stage']:<14} {record['rows']:>11,} {speed:>8.2f}x {memory:>8.2f}x"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def machine_info():
+    return {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()}
+
+def main(sizes, stages, seed, output_path, compare_path, threshold):
+    import tempfile
+    commit, dirty = git_commit()
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for n_rows in sizes:
+            ensure_corpus(n_rows, seed)
+            for stage in stages:
+                print(f"=== {stage}, {n_rows:,} rows ===")
+                results.append(run_stage(stage, n_rows, seed, output_dir))
+    print_results(results)
+
+    baseline = {'commit': commit, 'dirty': dirty, 'created': datetime.now().isoformat(), 'seed': seed,
+                'machine': machine_info(), 'results': results}
+    output_path = Path(output_path) if output_path else default_baseline_path(commit, dirty)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+    print(f"\nBaseline saved to {output_path}")
+
+    if compare_path:
+        with open(compare_path) as f:
+            regressions = compare(results, json.load(f), threshold)
+        if regressions:
+            print(f"\n{regressions} regression(s) over {threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic corpora")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="corpus sizes in rows, e.g. 10000 100000 1000000 10000000")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help=f"baseline JSON, default {BASELINE_DIR}/<commit>.json")
+    parser.add_argument('--compare', help="earlier baseline JSON to compare against (exit code 1 on regressions)")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="relative throughput drop or peak memory growth counted as a regression")
+    parser.add_argument('--child', choices=list(STAGES), help=argparse.SUPPRESS)
+    parser.add_argument('--rows', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--output-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.child, args.rows, args.seed, args.output_dir)
+    else:
+        main(args.sizes, args.stages, args.seed, args.output, args.compare, args.threshold)
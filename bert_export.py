@@ -0,0 +1,224 @@
+import os
+import json
+import copy
+import argparse
+from pathlib import Path
+import numpy as np
+import torch
+from torch import nn
+from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+from BERT_model import BERT_MODEL_NAME, MAX_LENGTH, OUTPUT_DIR, DEFAULT_SEED
+from columnar_io import SENTIMENT_CLASSES
+
+'''
+summary:
+    CPU inference artifacts for the fine-tuned BERT model. BERT_model.py only leaves Trainer checkpoints
+    in ./results; export() takes the best one (trainer_state.json's best_model_checkpoint, else the
+    latest) and writes to models/bert/:
+        fp32       the model and tokenizer in save_pretrained layout, with the sentiment names as labels
+        int8       model_int8.pt, the state dict of the model with every nn.Linear dynamically quantized to
+                   int8 (weights stored as int8, activations quantized per batch at run time)
+        onnx       model.onnx, the fp32 graph with dynamic batch and sequence axes (--onnx)
+        onnx-int8  model_int8.onnx, the same graph with onnxruntime's dynamic int8 quantization
+    load_engine gives any of them a common logits(encodings) call, and predict_proba scores texts in
+    length-sorted batches padded to their longest review (each text is tokenized once, unpadded, and the
+    batches are padded with tokenizer.pad, so cached encodings can be scored with predict_encoded).
+    The ONNX engines need onnx and onnxruntime, which are only imported when used.
+    Running this file exports and then checks every artifact's class probabilities, predictions and
+    macro-F1 against the fp32 model on BERT_model.py's test split (benchmarks/bert_inference.py
+    measures latency, throughput and memory).
+'''
+
+EXPORT_DIR = 'models/bert'
+INT8_FILENAME = 'model_int8.pt'
+ONNX_FILENAME = 'model.onnx'
+ONNX_INT8_FILENAME = 'model_int8.onnx'
+ENGINES = ['fp32', 'int8', 'onnx', 'onnx-int8']
+INPUT_NAMES = ['input_ids', 'attention_mask', 'token_type_ids']
+BATCH_SIZE = 32
+
+def best_checkpoint(output_dir=OUTPUT_DIR):
+    """Trainer checkpoint with the best eval metric, or the latest one if no best was recorded"""
+    checkpoints = sorted(Path(output_dir).glob('checkpoint-*'), key=lambda path: int(path.name.split('-')[-1]))
+    if not checkpoints:
+        raise FileNotFoundError(f"No Trainer checkpoints in {output_dir}, run BERT_model.py first")
+    state_path = checkpoints[-1] / 'trainer_state.json'
+    if state_path.exists():
+        with open(state_path) as f:
+            best = json.load(f).get('best_model_checkpoint')
+        if best and Path(best).exists():
+            return Path(best)
+    return checkpoints[-1]
+
+def load_tokenizer(model_dir):
+    """The tokenizer saved with model_dir, else the pretrained one
+    (BERT_model.py's Trainer doesn't save it in its checkpoints, it is the unchanged pretrained tokenizer)"""
+    source = model_dir if (Path(model_dir) / 'tokenizer_config.json').exists() else BERT_MODEL_NAME
+    return BertTokenizerFast.from_pretrained(source)
+
+def check_class_names(class_names, expected=SENTIMENT_CLASSES):
+    """class_names (a config's labels in id order) as a list, or ValueError if they aren't the label encoder's
+    classes in its order (e.g. the LABEL_0.. defaults of a checkpoint that wasn't exported with this file)"""
+    class_names = list(class_names)
+    if class_names != list(expected):
+        raise ValueError(f"Model labels {class_names} don't match the label encoder's classes {list(expected)}, "
+                         f"export the checkpoint with bert_export.py")
+    return class_names
+
+def quantize(model):
+    """Dynamic int8 quantization of every nn.Linear (all of BERT's matmuls outside attention scores)"""
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+class _LogitsOnly(nn.Module):
+    """Positional inputs and a single logits output, for torch.onnx.export"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids).logits
+
+def export_onnx(model, tokenizer, path):
+    sample = tokenizer(['an example review'], return_tensors='pt')
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in INPUT_NAMES}
+    dynamic_axes['logits'] = {0: 'batch'}
+    torch.onnx.export(_LogitsOnly(model).eval(), tuple(sample[name] for name in INPUT_NAMES), str(path),
+                      input_names=INPUT_NAMES, output_names=['logits'], dynamic_axes=dynamic_axes, opset_version=14)
+
+def export(checkpoint, class_names, export_dir=EXPORT_DIR, onnx=False):
+    """Write the fp32, int8 (and with onnx=True the ONNX) artifacts of checkpoint to export_dir"""
+    export_dir = Path(export_dir)
+    export_dir.mkdir(parents=True, exist_ok=True)
+    model = BertForSequenceClassification.from_pretrained(checkpoint).eval()
+    if model.config.num_labels != len(class_names):
+        raise ValueError(f"{checkpoint} has {model.config.num_labels} labels, the label encoder {len(class_names)}")
+    model.config.id2label = dict(enumerate(class_names))
+    model.config.label2id = {name: index for index, name in enumerate(class_names)}
+    tokenizer = load_tokenizer(checkpoint)
+    model.save_pretrained(export_dir)
+    tokenizer.save_pretrained(export_dir)
+    torch.save(quantize(copy.deepcopy(model)).state_dict(), export_dir / INT8_FILENAME)
+    if onnx:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        export_onnx(model, tokenizer, export_dir / ONNX_FILENAME)
+        quantize_dynamic(str(export_dir / ONNX_FILENAME), str(export_dir / ONNX_INT8_FILENAME),
+                         weight_type=QuantType.QInt8)
+    print(f"Exported {checkpoint} to {export_dir}/")
+
+def engine_path(engine, export_dir=EXPORT_DIR):
+    filenames = {'fp32': 'config.json', 'int8': INT8_FILENAME, 'onnx': ONNX_FILENAME, 'onnx-int8': ONNX_INT8_FILENAME}
+    return Path(export_dir) / filenames[engine]
+
+def artifact_size_mb(engine, export_dir=EXPORT_DIR):
+    if engine == 'fp32':
+        paths = [Path(export_dir) / name for name in ('model.safetensors', 'pytorch_model.bin')]
+    else:
+        paths = [engine_path(engine, export_dir)]
+    return sum(os.path.getsize(path) for path in paths if path.exists()) / 1e6
+
+class TorchEngine:
+    def __init__(self, model):
+        self.model = model.eval()
+
+    def logits(self, encodings):
+        with torch.inference_mode():
+            return self.model(**{name: torch.as_tensor(encodings[name]) for name in INPUT_NAMES}).logits.numpy()
+
+class OnnxEngine:
+    def __init__(self, path, threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(path), options, providers=['CPUExecutionProvider'])
+
+    def logits(self, encodings):
+        return self.session.run(['logits'], {name: np.asarray(encodings[name], dtype=np.int64)
+                                             for name in INPUT_NAMES})[0]
+
+def load_engine(engine='int8', export_dir=EXPORT_DIR, threads=None):
+    """(engine, tokenizer, class names) for one of ENGINES exported to export_dir.
+
+    threads sets the intra-op threads (torch's are process wide, onnxruntime's per session)."""
+    path = engine_path(engine, export_dir)
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found, export it with bert_export.py"
+                                f"{' --onnx' if engine.startswith('onnx') else ''}")
+    config = BertConfig.from_pretrained(export_dir)
+    tokenizer = load_tokenizer(export_dir)
+    class_names = check_class_names(config.id2label[index] for index in range(config.num_labels))
+    if engine.startswith('onnx'):
+        return OnnxEngine(path, threads), tokenizer, class_names
+    if threads:
+        torch.set_num_threads(threads)
+    if engine == 'fp32':
+        return TorchEngine(BertForSequenceClassification.from_pretrained(export_dir)), tokenizer, class_names
+    model = quantize(BertForSequenceClassification(config).eval())
+    # Our own file, and quantized packed weights aren't plain tensors
+    model.load_state_dict(torch.load(path, weights_only=False))
+    return TorchEngine(model), tokenizer, class_names
+
+def softmax(logits):
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+def encode(tokenizer, texts):
+    """Truncated, unpadded encodings of texts (dict of per-text lists)"""
+    return tokenizer(list(texts), truncation=True, max_length=MAX_LENGTH)
+
+def predict_encoded(engine, tokenizer, encodings, batch_size=BATCH_SIZE):
+    """Class probabilities of unpadded encodings (from encode, or a slice of a tokenized Dataset) in input order,
+    scored in batches of similar token length, each padded to its longest review"""
+    input_ids = encodings['input_ids']
+    if len(input_ids) == 0:
+        return np.empty((0, 0))
+    order = np.argsort([len(ids) for ids in input_ids], kind='stable')
+    batches = []
+    for start in range(0, len(order), batch_size):
+        rows = order[start:start + batch_size]
+        batch = tokenizer.pad({name: [encodings[name][row] for row in rows] for name in INPUT_NAMES},
+                              return_tensors='np')
+        batches.append(softmax(engine.logits(batch)))
+    probabilities = np.empty((len(order), batches[0].shape[1]))
+    probabilities[order] = np.vstack(batches)
+    return probabilities
+
+def predict_proba(engine, tokenizer, texts, batch_size=BATCH_SIZE):
+    """Class probabilities of texts in input order, each text tokenized once"""
+    return predict_encoded(engine, tokenizer, encode(tokenizer, texts), batch_size)
+
+def main(checkpoint, export_dir, onnx, seed, batch_size):
+    from sklearn.metrics import f1_score
+    import BERT_model
+
+    checkpoint = checkpoint or best_checkpoint()
+    combined_data, le = BERT_model.load_data()
+    export(checkpoint, le.classes_, export_dir, onnx)
+
+    _, test_indices = BERT_model.split_indices(combined_data['label'], seed)
+    texts = combined_data['text'].iloc[test_indices].tolist()
+    y_true = combined_data['label'].iloc[test_indices].to_numpy()
+    engines = ['fp32', 'int8'] + (['onnx', 'onnx-int8'] if onnx else [])
+    reference = None
+    print(f"\n{len(texts)} test reviews (seed {seed})\n")
+    print(f"{'engine':<10} {'size MB':>8} {'max |p diff|':>13} {'same label':>11} {'macro-F1':>9}")
+    for engine_name in engines:
+        engine, tokenizer, _ = load_engine(engine_name, export_dir)
+        probabilities = predict_proba(engine, tokenizer, texts, batch_size)
+        if reference is None:
+            reference = probabilities
+        y_pred = probabilities.argmax(axis=1)
+        print(f"{engine_name:<10} {artifact_size_mb(engine_name, export_dir):>8.1f} "
+              f"{np.abs(probabilities - reference).max():>13.2e} "
+              f"{(y_pred == reference.argmax(axis=1)).mean():>11.2%} {f1_score(y_true, y_pred, average='macro'):>9.4f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the fine-tuned BERT model for CPU inference")
+    parser.add_argument('--checkpoint', help=f"Trainer checkpoint, default the best one in {OUTPUT_DIR}")
+    parser.add_argument('--export-dir', default=EXPORT_DIR)
+    parser.add_argument('--onnx', action='store_true', help="also export ONNX graphs (needs onnx and onnxruntime)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="BERT_model.py seed of the test split")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    main(args.checkpoint, args.export_dir, args.onnx, args.seed, args.batch_size)
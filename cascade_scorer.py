@@ -0,0 +1,149 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from sentiment_scorer import (BATCH_SIZE, MODEL_DIR, add_score_columns, get_text_probabilities_batch, load_models,
+                              probabilities_to_score)
+from columnar_io import write_scored
+
+'''
+summary:
+    Confidence-based cascade of the TF-IDF model and the fine-tuned BERT model. Every review is scored by
+    the TF-IDF model first (the batch path of sentiment_scorer.get_text_sentiment); only the reviews it is
+    unsure about, those whose confidence is below `threshold`, are re-scored by BERT in length-sorted
+    batches (BERT_predict.BertSentimentScorer) and take BERT's class probabilities. Confidence is either
+    the largest class probability ('max_probability') or its margin over the second largest ('margin').
+    threshold=0 is the TF-IDF model alone and any threshold above 1 sends every review to BERT.
+    Running this file reports the share of reviews routed to BERT, the throughput and the macro-F1 across
+    thresholds on the reviews held out from both models (in TF_IDF_model.py's and in BERT_model.py's test
+    split, both scripts read the same rows in the same order), or with --score scores a feedback CSV the way
+    sentiment_scorer.py does, plus a routed_to_bert column. BERT (torch) is only imported when the cascade
+    is loaded.
+'''
+
+CONFIDENCE_MEASURES = ['max_probability', 'margin']
+DEFAULT_THRESHOLD = 0.6
+DEFAULT_THRESHOLDS = [0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+
+def confidence(probabilities, measure='max_probability'):
+    top_two = np.sort(probabilities, axis=1)[:, -2:]
+    if measure == 'max_probability':
+        return top_two[:, 1]
+    if measure == 'margin':
+        return top_two[:, 1] - top_two[:, 0]
+    raise ValueError(f"Unknown confidence measure '{measure}', expected one of {CONFIDENCE_MEASURES}")
+
+class CascadeScorer:
+    """TF-IDF model probabilities, with the reviews below the confidence threshold re-scored by BERT"""
+
+    def __init__(self, model, vectorizer, label_encoder, bert_scorer, threshold=DEFAULT_THRESHOLD,
+                 measure='max_probability', batch_size=BATCH_SIZE):
+        confidence(np.ones((1, 2)), measure)  # fail early on an unknown measure
+        self.model = model
+        self.vectorizer = vectorizer
+        self.bert_scorer = bert_scorer
+        self.threshold = threshold
+        self.measure = measure
+        self.batch_size = batch_size
+        # BERT's probability columns in the label encoder's class order
+        self.bert_columns = [bert_scorer.class_names.index(name) for name in label_encoder.classes_]
+
+    def predict_proba(self, texts, threshold=None):
+        """(class probabilities, boolean mask of the reviews scored by BERT)"""
+        threshold = self.threshold if threshold is None else threshold
+        texts = list(texts)
+        probabilities = get_text_probabilities_batch(texts, self.model, self.vectorizer, self.batch_size)
+        routed = confidence(probabilities, self.measure) < threshold
+        if routed.any():
+            bert_probabilities = self.bert_scorer.predict_proba([texts[i] for i in np.flatnonzero(routed)])
+            probabilities[routed] = bert_probabilities[:, self.bert_columns]
+        return probabilities, routed
+
+    def score(self, texts):
+        """0-10 text sentiment scores (same weighting as get_text_sentiment) and the routed mask"""
+        probabilities, routed = self.predict_proba(texts)
+        return probabilities_to_score(probabilities), routed
+
+def load_cascade(threshold=DEFAULT_THRESHOLD, measure='max_probability', model_dir=MODEL_DIR, engine='sklearn',
+                 bert_checkpoint=None, bert_engine='int8', bert_export_dir=None, threads=None):
+    """CascadeScorer over sentiment_scorer.load_models(engine, model_dir) and a BertSentimentScorer"""
+    from BERT_predict import BertSentimentScorer
+    from bert_export import EXPORT_DIR
+    model, vectorizer, label_encoder = load_models(engine=engine, model_dir=model_dir)
+    bert_scorer = BertSentimentScorer(bert_checkpoint, bert_engine, bert_export_dir or EXPORT_DIR, threads)
+    return CascadeScorer(model, vectorizer, label_encoder, bert_scorer, threshold, measure)
+
+def score_feedback_cascade(feedback_df, cascade):
+    """sentiment_scorer.score_feedback through the cascade, plus a routed_to_bert column"""
+    probabilities, routed = cascade.predict_proba(feedback_df['Feedback'].fillna(''))
+    feedback_df = add_score_columns(feedback_df, probabilities)
+    feedback_df['routed_to_bert'] = routed
+    return feedback_df
+
+def held_out_indices(labels, seed, bert_seed):
+    """Rows in both TF_IDF_model.py's test split (at seed) and BERT_model.py's (at bert_seed).
+    Any other row was trained on by one of the models and would inflate its score."""
+    import TF_IDF_model
+    import BERT_model
+    if TF_IDF_model.TRAINING_DATA != BERT_model.TRAINING_DATA:
+        raise ValueError("TF_IDF_model.py and BERT_model.py train on different data, their splits can't be matched")
+    _, tfidf_test_index = TF_IDF_model.split_indices(labels, seed)
+    _, bert_test_index = BERT_model.split_indices(labels, bert_seed)
+    test_index = np.intersect1d(tfidf_test_index, bert_test_index)
+    if len(test_index) == 0:
+        raise ValueError(f"No review is in both test splits (TF-IDF seed {seed}, BERT seed {bert_seed})")
+    return test_index
+
+def threshold_report(cascade, thresholds, seed, bert_seed, repeat):
+    """Share routed, throughput and macro-F1 per threshold, plus the TF-IDF model and BERT alone,
+    on the reviews neither model was trained on"""
+    from sklearn.metrics import f1_score
+    import TF_IDF_model
+
+    combined_data, _, labels = TF_IDF_model.load_data()
+    test_index = held_out_indices(labels, seed, bert_seed)
+    texts = combined_data['Feedback'].iloc[test_index].tolist() * repeat
+    y_true = np.tile(labels[test_index], repeat)
+    cascade.predict_proba(texts[:cascade.batch_size], threshold=np.inf)  # warm up both models outside the timings
+
+    print(f"\n{len(test_index):,} reviews held out from both models (TF-IDF seed {seed}, BERT seed {bert_seed}) "
+          f"x {repeat}, confidence = {cascade.measure}\n")
+    print(f"{'threshold':<12} {'to BERT':>8} {'seconds':>8} {'reviews/s':>10} {'macro-F1':>9}")
+    for name, threshold in [('TF-IDF only', 0.0)] + [(f'{t:.2f}', t) for t in thresholds] + [('BERT only', np.inf)]:
+        start = time.perf_counter()
+        probabilities, routed = cascade.predict_proba(texts, threshold)
+        seconds = time.perf_counter() - start
+        y_pred = cascade.model.classes_[np.argmax(probabilities, axis=1)]
+        print(f"{name:<12} {routed.mean():>8.1%} {seconds:>8.2f} {len(texts) / seconds:>10,.0f} "
+              f"{f1_score(y_true, y_pred, average='macro'):>9.4f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Route uncertain TF-IDF predictions to BERT")
+    parser.add_argument('--measure', choices=CONFIDENCE_MEASURES, default='max_probability')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=DEFAULT_THRESHOLDS,
+                        help="thresholds compared in the report")
+    parser.add_argument('--seed', type=int, default=42, help="TF_IDF_model.py seed the TF-IDF model was trained with")
+    parser.add_argument('--bert-seed', type=int, default=42, help="BERT_model.py seed the BERT model was trained with")
+    parser.add_argument('--repeat', type=int, default=1, help="tile the test reviews this many times")
+    parser.add_argument('--score', metavar='INPUT', help="score this feedback CSV instead of reporting")
+    parser.add_argument('--output', default='clean-data/feedback_data_with_cascade_sentiment.csv',
+                        help="scored output (.csv, .parquet or .arrow) with --score")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="threshold used with --score")
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--engine', choices=['sklearn', 'flat', 'compact'], default='sklearn',
+                        help="TF-IDF model engine (see sentiment_scorer.py)")
+    parser.add_argument('--bert-checkpoint', help="BERT model directory to load as fp32")
+    parser.add_argument('--bert-engine', default='int8', help="bert_export.py artifact, without --bert-checkpoint")
+    parser.add_argument('--bert-export-dir')
+    parser.add_argument('--threads', type=int, help="BERT intra-op threads")
+    args = parser.parse_args()
+
+    cascade = load_cascade(args.threshold, args.measure, args.model_dir, args.engine, args.bert_checkpoint,
+                           args.bert_engine, args.bert_export_dir, args.threads)
+    if args.score:
+        feedback_df = score_feedback_cascade(pd.read_csv(args.score), cascade)
+        write_scored(feedback_df, args.output)
+        print(f"Scored {len(feedback_df):,} reviews, {feedback_df['routed_to_bert'].mean():.1%} by BERT, "
+              f"saved to {args.output}")
+    else:
+        threshold_report(cascade, args.thresholds, args.seed, args.bert_seed, args.repeat)
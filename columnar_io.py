@@ -0,0 +1,159 @@
+import os
+from pathlib import Path
+import pandas as pd
+
+'''
+summary:
+    Reading and writing scored feedback as CSV, Parquet or Arrow IPC (Feather v2), picked by file suffix.
+    The columnar formats store the scores as float64, and the company and sentiment class columns as
+    dictionary-encoded categoricals, so a reader that only needs a few columns (e.g. Company Name and the
+    sentiment scores) can load just those instead of parsing every row of a CSV.
+    Parquet is zstd-compressed (smallest files), Arrow is uncompressed and memory-mapped on read (fastest
+    reads). pyarrow is only imported when one of the columnar formats is used.
+'''
+
+OUTPUT_FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'arrow': '.arrow',
+}
+
+SENTIMENT_CLASSES = ['Negative', 'Neutral', 'Positive']
+
+# Columns written with a fixed set of categories, so every chunk of a streamed file shares one dictionary
+CLASS_COLUMNS = ['text_sentiment_class', 'combined_sentiment_class', 'predicted_sentiment']
+
+# Columns whose categories depend on the data
+CATEGORICAL_COLUMNS = ['Company Name']
+
+def output_path_for(path, output_format):
+    """path with the suffix of output_format (csv, parquet or arrow)"""
+    return Path(path).with_suffix(OUTPUT_FORMATS[output_format])
+
+def format_of(path):
+    suffix = Path(path).suffix.lower()
+    for output_format, format_suffix in OUTPUT_FORMATS.items():
+        if suffix == format_suffix:
+            return output_format
+    raise ValueError(f"Unknown output format for {path}, expected one of {list(OUTPUT_FORMATS.values())}")
+
+def find_scored_output(path):
+    """The most recently written of path's csv/parquet/arrow variants, or path itself if none exist"""
+    candidates = [output_path_for(path, output_format) for output_format in OUTPUT_FORMATS]
+    existing = [candidate for candidate in candidates if candidate.exists()]
+    if not existing:
+        return Path(path)
+    return max(existing, key=os.path.getmtime)
+
+def with_columnar_dtypes(df):
+    """Copy of df with the class and company columns as categoricals.
+
+    Raises ValueError if a class column holds a label outside SENTIMENT_CLASSES (e.g. from a label encoder
+    trained with other class names), which pd.Categorical would otherwise silently turn into NaN."""
+    df = df.copy()
+    for col in CLASS_COLUMNS:
+        if col in df.columns:
+            values = df[col].dropna()
+            unknown = sorted(set(values[~values.isin(SENTIMENT_CLASSES)].astype(str)))
+            if unknown:
+                raise ValueError(f"Column '{col}' has labels {unknown[:10]} outside {SENTIMENT_CLASSES}")
+            df[col] = pd.Categorical(df[col], categories=SENTIMENT_CLASSES)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+def arrow_schema(df, fixed_dictionaries_only=False):
+    """Arrow schema for the columns of df.
+
+    Built once from the first chunk when streaming, so later chunks are cast to the same types instead of
+    whatever pandas infers for them (e.g. an integer Rating column turning float in a chunk with a gap).
+    Arrow IPC files allow only one dictionary per column, so chunked Arrow output sets
+    fixed_dictionaries_only and stores the data-dependent categorical columns as plain strings."""
+    import pyarrow as pa
+    fields = []
+    for col, dtype in df.dtypes.items():
+        if col in CLASS_COLUMNS:
+            arrow_type = pa.dictionary(pa.int8(), pa.string())
+        elif col in CATEGORICAL_COLUMNS:
+            arrow_type = pa.string() if fixed_dictionaries_only else pa.dictionary(pa.int32(), pa.string())
+        elif pd.api.types.is_bool_dtype(dtype):
+            arrow_type = pa.bool_()
+        elif pd.api.types.is_integer_dtype(dtype):
+            arrow_type = pa.int64()
+        elif pd.api.types.is_float_dtype(dtype):
+            arrow_type = pa.float64()
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            arrow_type = pa.timestamp('ns')
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(col, arrow_type))
+    return pa.schema(fields)
+
+def to_arrow_table(df, schema):
+    import pyarrow as pa
+    return pa.Table.from_pandas(with_columnar_dtypes(df), schema=schema, preserve_index=False)
+
+def write_scored(df, path):
+    """Write df to path in the format given by its suffix"""
+    output_format = format_of(path)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if output_format == 'csv':
+        df.to_csv(path, index=False)
+        return
+    with ScoredWriter(path) as writer:
+        writer.write(df)
+
+class ScoredWriter:
+    """Writes a scored file chunk by chunk, in the format given by the suffix of path"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.format = format_of(path)
+        self.schema = None
+        self.writer = None
+        self.chunks_written = 0
+
+    def write(self, chunk):
+        if self.format == 'csv':
+            chunk.to_csv(self.path, mode='w' if self.chunks_written == 0 else 'a',
+                         header=self.chunks_written == 0, index=False)
+        else:
+            if self.writer is None:
+                self._open(chunk)
+            self.writer.write_table(to_arrow_table(chunk, self.schema))
+        self.chunks_written += 1
+
+    def _open(self, first_chunk):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.schema = arrow_schema(first_chunk, fixed_dictionaries_only=self.format == 'arrow')
+        if self.format == 'parquet':
+            self.writer = pq.ParquetWriter(self.path, self.schema, compression='zstd')
+        else:
+            self.writer = pa.ipc.new_file(self.path, self.schema)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def read_scored(path, columns=None, **read_csv_kwargs):
+    """Read a scored file, only loading `columns` (all columns if None).
+
+    Company and class columns come back as categoricals whatever the format."""
+    output_format = format_of(path)
+    if output_format == 'csv':
+        df = pd.read_csv(path, usecols=columns, **read_csv_kwargs)
+    elif output_format == 'parquet':
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        import pyarrow.feather as feather
+        df = feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+    return with_columnar_dtypes(df)
@@ -1,110 +1,117 @@
 # %%
+import argparse
 import pandas as pd
 import nltk
 from nltk.corpus import words
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
 
-nltk.download('words')  # list of common english words
-nltk.download('wordnet')  # large thesaurus with word relationships
-nltk.download('punkt')  # required for tokenization
-nltk.download('punkt_tab')
-nltk.download('stopwords')  # list of words like "the" and "a"
+# Raw feedback export (tab separated) and the cleaned output, relative to the repo root
+FEEDBACK_DATA = 'Datasets/feedbackData.csv'
+CLEANED_DATA = 'clean-data/feedback_data_cleaned.csv'
 
-# %%
-# Load initial data
-feedback_data = pd.read_csv(
-    "C:/Users/LAWSON_l/Documents/GitHub/Customer_Sentiment_Analysis/Datasets/feedbackData.csv", sep="\t")
-initial_count = len(feedback_data)
-print(f"\nInitial number of records: {initial_count}")
+def download_nltk_data(quiet=False):
+    nltk.download('words', quiet=quiet)  # list of common english words
+    nltk.download('wordnet', quiet=quiet)  # large thesaurus with word relationships
+    nltk.download('punkt', quiet=quiet)  # required for tokenization
+    nltk.download('punkt_tab', quiet=quiet)
+    nltk.download('stopwords', quiet=quiet)  # list of words like "the" and "a"
 
-# Track missing values
-missing_feedback = feedback_data['Feedback'].isna().sum()
-string_nan = (feedback_data['Feedback'].str.lower() == 'nan').sum()
-missing_ratings = feedback_data['Rating'].isna().sum()
+# %%
+# Remove missing values and duplicates
+def drop_missing_and_duplicates(feedback_data):
+    # Track missing values
+    missing_feedback = feedback_data['Feedback'].isna().sum()
+    string_nan = (feedback_data['Feedback'].str.lower() == 'nan').sum()
+    missing_ratings = feedback_data['Rating'].isna().sum()
 
-print("\nMissing values removed:")
-print(f"- Feedback NaN values: {missing_feedback}")
-print(f"- Feedback 'nan' strings: {string_nan}")
-print(f"- Missing ratings: {missing_ratings}")
+    print("\nMissing values removed:")
+    print(f"- Feedback NaN values: {missing_feedback}")
+    print(f"- Feedback 'nan' strings: {string_nan}")
+    print(f"- Missing ratings: {missing_ratings}")
 
-# Remove missing values
-feedback_data = feedback_data[~feedback_data['Feedback'].isna()]
-feedback_data = feedback_data[~(
-    feedback_data['Feedback'].str.lower() == 'nan')]
-feedback_data = feedback_data[~feedback_data['Rating'].isna()]
+    # Remove missing values
+    feedback_data = feedback_data[~feedback_data['Feedback'].isna()]
+    feedback_data = feedback_data[~(
+        feedback_data['Feedback'].str.lower() == 'nan')]
+    feedback_data = feedback_data[~feedback_data['Rating'].isna()]
 
-# Track duplicates
-duplicate_count = feedback_data.duplicated(subset=['Feedback']).sum()
-print(f"\nDuplicate feedback entries removed: {duplicate_count}")
+    # Track duplicates
+    duplicate_count = feedback_data.duplicated(subset=['Feedback']).sum()
+    print(f"\nDuplicate feedback entries removed: {duplicate_count}")
 
-# Remove duplicates
-feedback_data = feedback_data.drop_duplicates(subset=['Feedback'])
+    # Remove duplicates
+    feedback_data = feedback_data.drop_duplicates(subset=['Feedback'])
 
-print(f"\nRecords after initial cleaning: {len(feedback_data)}")
+    print(f"\nRecords after initial cleaning: {len(feedback_data)}")
 
-# %%
-print(feedback_data['Feedback'].dtype)
-feedback_data['Feedback'] = feedback_data['Feedback'].astype(str).str.strip()
-print(feedback_data['Feedback'].dtype)
+    feedback_data = feedback_data.copy()
+    feedback_data['Feedback'] = feedback_data['Feedback'].astype(str).str.strip()
+    return feedback_data
 
 # %%
-# Track non-English or gibberish entries
-english_words = set(words.words())
-
-
-def contains_english_word(text):
+# Remove non-English or gibberish entries
+def contains_english_word(text, english_words):
     text_words = set(text.lower().split())
     return bool(english_words.intersection(text_words))
 
-
-non_english_count = sum(
-    ~feedback_data['Feedback'].apply(contains_english_word))
-print(f"\nNon-English entries removed: {non_english_count}")
-
-filtered_data = feedback_data[feedback_data['Feedback'].apply(
-    contains_english_word)]
+def drop_non_english(feedback_data, english_words):
+    is_english = feedback_data['Feedback'].apply(contains_english_word, english_words=english_words)
+    print(f"\nNon-English entries removed: {(~is_english).sum()}")
+    return feedback_data[is_english].copy()
 
 # %%
 # Lemmatizing to get words base form in new column
-
-lemmatizer = WordNetLemmatizer()
-
-
-def lemmatize_text(text):
+def lemmatize_text(text, lemmatizer):
     tokens = nltk.word_tokenize(text)  # tokenizing
     lemmas = [lemmatizer.lemmatize(token).lower() for token in tokens]
     return " ".join(lemmas)
 
+# %%
+# Full cleaning pass: missing values, duplicates, non-English entries, lemmatizing, final checks
+def clean_feedback(feedback_data):
+    initial_count = len(feedback_data)
+    print(f"\nInitial number of records: {initial_count}")
 
-filtered_data['lem_feedback'] = filtered_data['Feedback'].apply(lemmatize_text)
+    feedback_data = drop_missing_and_duplicates(feedback_data)
+    filtered_data = drop_non_english(feedback_data, set(words.words()))
 
-print(filtered_data.head())
+    lemmatizer = WordNetLemmatizer()
+    filtered_data['lem_feedback'] = filtered_data['Feedback'].apply(lemmatize_text, lemmatizer=lemmatizer)
+    print(filtered_data.head())
 
-# %%
-# Removing stopwords to only have core words
+    # Removing stopwords to only have core words
+    filtered_data['feedback_prepped'] = filtered_data['lem_feedback']
+
+    # Final cleaning checks
+    final_nan_count = filtered_data.isna().sum().sum()
+    final_empty_strings = sum(
+        filtered_data['lem_feedback'].str.strip().str.len() == 0)
+
+    print("\nFinal cleaning removed:")
+    print(f"- NaN values: {final_nan_count}")
+    print(f"- Empty strings after preprocessing: {final_empty_strings}")
+
+    # Remove final problematic entries
+    filtered_data = filtered_data.dropna()
+    filtered_data = filtered_data[~(
+        filtered_data['lem_feedback'].str.lower() == 'nan')]
 
-filtered_data['feedback_prepped'] = filtered_data['lem_feedback']
+    print(f"\nFinal number of clean records: {len(filtered_data)}")
+    print(f"Total records removed: {initial_count - len(filtered_data)}")
+    print(
+        f"Percentage of data retained: {(len(filtered_data)/initial_count)*100:.2f}%")
+    return filtered_data
 
 # %%
-# Final cleaning checks
-final_nan_count = filtered_data.isna().sum().sum()
-final_empty_strings = sum(
-    filtered_data['lem_feedback'].str.strip().str.len() == 0)
-
-print("\nFinal cleaning removed:")
-print(f"- NaN values: {final_nan_count}")
-print(f"- Empty strings after preprocessing: {final_empty_strings}")
-
-# Remove final problematic entries
-filtered_data = filtered_data.dropna()
-filtered_data = filtered_data[~(
-    filtered_data['lem_feedback'].str.lower() == 'nan')]
-
-print(f"\nFinal number of clean records: {len(filtered_data)}")
-print(f"Total records removed: {initial_count - len(filtered_data)}")
-print(
-    f"Percentage of data retained: {(len(filtered_data)/initial_count)*100:.2f}%")
-
-filtered_data.to_csv('clean-data/feedback_data_cleaned.csv', index=False)
-print('\nCleaning successful')
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the raw feedback export")
+    parser.add_argument('--input', default=FEEDBACK_DATA, help="tab separated feedback export")
+    parser.add_argument('--output', default=CLEANED_DATA)
+    args = parser.parse_args()
+
+    download_nltk_data()
+    feedback_data = pd.read_csv(args.input, sep="\t")
+    filtered_data = clean_feedback(feedback_data)
+    filtered_data.to_csv(args.output, index=False)
+    print('\nCleaning successful')
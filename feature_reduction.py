@@ -0,0 +1,26 @@
+from functools import partial
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_selection import SelectKBest, chi2, mutual_info_classif
+
+'''
+summary:
+    Optional reduction stage between the TF-IDF vectorizer and the forest.
+    "chi2" and "mutual_info" keep the k TF-IDF columns most associated with the labels (the matrix stays
+    sparse and the kept columns keep their n-gram names), "svd" projects onto k dense TruncatedSVD
+    components. The fitted reducer is saved next to the other artifacts as models/feature_reducer.joblib
+    (sentiment_scorer.REDUCER_FILENAME), and sentiment_scorer.load_models chains it after the vectorizer
+    when that file exists. TF_IDF_model.py only imports this module when it fits a reducer.
+'''
+
+REDUCTION_METHODS = ['chi2', 'mutual_info', 'svd']
+
+def make_reducer(method, k, random_state=42):
+    """Unfitted reducer keeping k features"""
+    if method == 'chi2':
+        return SelectKBest(chi2, k=k)
+    if method == 'mutual_info':
+        # partial rather than a lambda so the fitted selector can be pickled
+        return SelectKBest(partial(mutual_info_classif, random_state=random_state), k=k)
+    if method == 'svd':
+        return TruncatedSVD(n_components=k, random_state=random_state)
+    raise ValueError(f"Unknown reduction method '{method}', expected one of {REDUCTION_METHODS}")
@@ -0,0 +1,211 @@
+import os
+import time
+import warnings
+import argparse
+import numpy as np
+import joblib
+from forest_engine import FlatForest
+
+'''
+summary:
+    Post-training compaction of the random forest into a smaller FlatForest artifact (see forest_engine.py).
+    Every step is optional: keep only the first n trees, cap the depth (nodes at the cap become leaves with
+    their own class distribution), and collapse low-impact subtrees into a leaf with the subtree root's class
+    distribution. A subtree's impact is the share of the tree's (weighted) training samples that reach it
+    times the largest class probability difference between its root and any leaf below it, which bounds how
+    much collapsing it moves that tree's probabilities on average over the training rows; subtrees with an
+    impact <= `tolerance` are collapsed. The node arrays are then stored with the smallest
+    dtypes that hold them: int16/int32 feature and child indices, float32 thresholds and leaf distributions.
+    Thresholds are rounded down to float32, which is exact: the trees compare float32 feature values, and
+    x <= t holds for a float32 x exactly when x <= (largest float32 <= t). With no trees dropped, no depth cap
+    and tolerance=0 the compact forest's predictions therefore match the original up to float32 rounding of
+    the leaf distributions. The result is saved uncompressed (memory-mappable) or joblib-compressed, and
+    sentiment_scorer loads it with engine='compact'.
+'''
+
+COMPACT_FILENAME = 'random_forest_compact.joblib'
+
+def smallest_int_dtype(max_value):
+    for dtype in (np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def float32_at_most(values):
+    """Largest float32 <= each value (inf stays inf)"""
+    rounded = values.astype(np.float32)
+    too_large = rounded > values
+    rounded[too_large] = np.nextafter(rounded[too_large], np.float32(-np.inf))
+    return rounded
+
+def _subtree_impact(tree, value):
+    """Per node, share of training samples reaching it x largest class probability difference to a leaf below it"""
+    leaf_min, leaf_max = value.copy(), value.copy()
+    # sklearn numbers nodes depth-first, children always after their parent
+    for node in range(tree.node_count - 1, -1, -1):
+        left, right = tree.children_left[node], tree.children_right[node]
+        if left != -1:
+            leaf_min[node] = np.minimum(leaf_min[left], leaf_min[right])
+            leaf_max[node] = np.maximum(leaf_max[left], leaf_max[right])
+    deviation = np.maximum(leaf_max - value, value - leaf_min).max(axis=1)
+    return deviation * tree.weighted_n_node_samples / tree.weighted_n_node_samples[0]
+
+def _compact_tree(tree, n_classes, max_depth, tolerance):
+    """Kept nodes of one tree in depth-first order, as (feature, threshold, left, right, value, depth) arrays
+    with tree-local child ids (leaves point to themselves)"""
+    # Same normalization as DecisionTreeClassifier.predict_proba
+    value = tree.value[:, 0, :n_classes]
+    normalizer = value.sum(axis=1, keepdims=True)
+    normalizer[normalizer == 0.0] = 1.0
+    value = value / normalizer
+    impact = _subtree_impact(tree, value)
+
+    kept, depths, is_leaf = [], [], []
+    new_ids = {}
+    stack = [(0, 0)]
+    while stack:
+        node, depth = stack.pop()
+        new_ids[node] = len(kept)
+        kept.append(node)
+        depths.append(depth)
+        leaf = (tree.children_left[node] == -1 or (max_depth is not None and depth >= max_depth)
+                or impact[node] <= tolerance)
+        is_leaf.append(leaf)
+        if not leaf:
+            # Right pushed first so the left subtree comes out first (depth-first, like sklearn)
+            stack.append((tree.children_right[node], depth + 1))
+            stack.append((tree.children_left[node], depth + 1))
+
+    kept = np.array(kept)
+    is_leaf = np.array(is_leaf)
+    local_ids = np.arange(len(kept))
+    left = np.array([new_ids.get(child, -1) for child in tree.children_left[kept]])
+    right = np.array([new_ids.get(child, -1) for child in tree.children_right[kept]])
+    return (np.where(is_leaf, 0, tree.feature[kept]),
+            np.where(is_leaf, np.inf, tree.threshold[kept]),
+            np.where(is_leaf, local_ids, left),
+            np.where(is_leaf, local_ids, right),
+            value[kept],
+            max(depths))
+
+def compact_forest(forest, n_trees=None, max_depth=None, tolerance=0.0):
+    """FlatForest of the first n_trees trees of a fitted RandomForestClassifier, pruned and in compact dtypes"""
+    estimators = forest.estimators_[:n_trees] if n_trees else forest.estimators_
+    features, thresholds, lefts, rights, values, roots, depths = [], [], [], [], [], [], []
+    offset = 0
+    for estimator in estimators:
+        feature, threshold, left, right, value, depth = _compact_tree(estimator.tree_, forest.n_classes_,
+                                                                      max_depth, tolerance)
+        features.append(feature)
+        thresholds.append(threshold)
+        lefts.append(left + offset)
+        rights.append(right + offset)
+        values.append(value)
+        roots.append(offset)
+        depths.append(depth)
+        offset += len(feature)
+
+    index_dtype = smallest_int_dtype(offset)
+    return FlatForest(
+        feature=np.concatenate(features).astype(smallest_int_dtype(forest.n_features_in_)),
+        threshold=float32_at_most(np.concatenate(thresholds)),
+        children_left=np.concatenate(lefts).astype(index_dtype),
+        children_right=np.concatenate(rights).astype(index_dtype),
+        value=np.concatenate(values).astype(np.float32),
+        roots=np.array(roots, dtype=index_dtype),
+        max_depth=max(depths),
+        classes=forest.classes_,
+        n_features=forest.n_features_in_,
+    )
+
+def save_compact_forest(flat_forest, path, compress=0):
+    """compress=0 keeps the file memory-mappable, 1-9 trades load time for size (zlib)"""
+    joblib.dump(flat_forest.to_arrays(), path, compress=compress)
+
+def load_compact_forest(path, mmap_mode='r'):
+    with warnings.catch_warnings():
+        # joblib ignores mmap_mode (with a warning) when the file is compressed
+        warnings.filterwarnings('ignore', message='.*mmap_mode', category=UserWarning)
+        return FlatForest(**joblib.load(path, mmap_mode=mmap_mode))
+
+def measure(name, path, load, X, y):
+    """Artifact size, load time, scoring throughput and macro-F1 of one artifact"""
+    from sklearn.metrics import f1_score
+    start = time.perf_counter()
+    model = load(path)
+    load_seconds = time.perf_counter() - start
+    model.predict_proba(X[:1])  # compile the flat kernel (or load it from numba's cache) outside the timing
+    start = time.perf_counter()
+    probabilities = model.predict_proba(X)
+    rows_per_second = X.shape[0] / (time.perf_counter() - start)
+    y_pred = model.classes_[np.argmax(probabilities, axis=1)]
+    return {'name': name, 'size_mb': os.path.getsize(path) / 1e6, 'load_ms': load_seconds * 1000,
+            'rows_per_second': rows_per_second, 'f1_macro': f1_score(y, y_pred, average='macro'),
+            'probabilities': probabilities}
+
+def confirmed_seed(model_dir, seed=None):
+    """The training seed saved with the model (TF_IDF_model.training_seed). A different --seed evaluates on
+    rows the model may have been trained on, so it is only used with a warning, and without a saved seed
+    an explicit --seed is required."""
+    import TF_IDF_model
+    trained_seed = TF_IDF_model.training_seed(model_dir)
+    if trained_seed is None:
+        if seed is None:
+            raise SystemExit(f"No {TF_IDF_model.TRAINING_INFO_FILENAME} in {model_dir}, so the training seed can't be "
+                             f"confirmed. Retrain with TF_IDF_model.py, or pass --seed to report on that split anyway.")
+        warnings.warn(f"Training seed of {model_dir} unknown, the seed {seed} test split may contain training rows "
+                      f"and overstate macro-F1")
+        return seed
+    if seed is not None and seed != trained_seed:
+        warnings.warn(f"{model_dir} was trained with seed {trained_seed}, the seed {seed} test split contains "
+                      f"training rows and overstates macro-F1")
+        return seed
+    return trained_seed
+
+def main(model_path, output_path, n_trees, max_depth, tolerance, compress, seed, repeat):
+    import scipy.sparse as sp
+    import TF_IDF_model
+    import sentiment_scorer
+
+    seed = confirmed_seed(os.path.dirname(model_path), seed)
+    forest = joblib.load(model_path)
+    start = time.perf_counter()
+    flat_forest = compact_forest(forest, n_trees, max_depth, tolerance)
+    save_compact_forest(flat_forest, output_path, compress)
+    print(f"Compacted {forest.n_estimators} trees ({sum(e.tree_.node_count for e in forest.estimators_):,} nodes) "
+          f"to {flat_forest.n_estimators} trees ({flat_forest.node_count:,} nodes, max depth {flat_forest.max_depth}) "
+          f"in {time.perf_counter() - start:.1f}s, saved to {output_path}")
+
+    # Before/after on the test split of TF_IDF_model.py's pipeline, at the seed stored with the model
+    combined_data, _, labels = TF_IDF_model.load_data()
+    # The forest's own input space, load_models chains the feature reducer after the vectorizer when there is one
+    _, vectorizer, _ = sentiment_scorer.load_models(model_dir=os.path.dirname(model_path))
+    _, test_index = TF_IDF_model.split_indices(labels, seed)
+    X_test = vectorizer.transform(combined_data['Feedback'].iloc[test_index])
+    # svd reduction gives dense features
+    X_test = sp.vstack([X_test] * repeat).tocsr() if sp.issparse(X_test) else np.vstack([X_test] * repeat)
+    y_test = np.tile(labels[test_index], repeat)
+
+    results = [measure('sklearn forest', model_path, joblib.load, X_test, y_test),
+               measure('compact forest', output_path, load_compact_forest, X_test, y_test)]
+    max_difference = np.abs(results[0]['probabilities'] - results[1]['probabilities']).max()
+    print(f"\n{X_test.shape[0]:,} test rows (seed {seed}), max |probability difference| {max_difference:.2e}\n")
+    print(f"{'artifact':<16} {'size MB':>8} {'load ms':>8} {'rows/sec':>10} {'macro-F1':>9}")
+    for result in results:
+        print(f"{result['name']:<16} {result['size_mb']:>8.2f} {result['load_ms']:>8.1f} "
+              f"{result['rows_per_second']:>10,.0f} {result['f1_macro']:>9.4f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact the random forest and report size/load/throughput/F1")
+    parser.add_argument('--model', default='models/random_forest_model.joblib')
+    parser.add_argument('--output', default=f'models/{COMPACT_FILENAME}')
+    parser.add_argument('--trees', type=int, help="keep only the first N trees")
+    parser.add_argument('--max-depth', type=int, help="turn nodes at this depth into leaves")
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help="collapse subtrees whose impact (sample share x leaf deviation) is at most this")
+    parser.add_argument('--compress', type=int, default=0, help="joblib zlib level, 0 keeps the file memory-mappable")
+    parser.add_argument('--seed', type=int,
+                        help="TF_IDF_model.py seed of the test split to report on, default the one saved with --model")
+    parser.add_argument('--repeat', type=int, default=100, help="tile the test rows this many times for throughput")
+    args = parser.parse_args()
+    main(args.model, args.output, args.trees, args.max_depth, args.tolerance, args.compress, args.seed, args.repeat)
@@ -0,0 +1,218 @@
+import os
+import argparse
+import numpy as np
+import joblib
+
+try:
+    from numba import njit, prange
+except ImportError:
+    # numba is optional, without it FlatForest falls back to the vectorized NumPy walk
+    njit = None
+    prange = range
+
+'''
+summary:
+    Array-backed inference engine for the RandomForestClassifier in models/.
+    export_forest() flattens every tree of the trained forest into one set of contiguous NumPy
+    node arrays (feature, threshold, children, leaf class distributions). FlatForest.predict_proba
+    scores sparse TF-IDF rows directly against those arrays: with numba installed through a compiled,
+    multi-threaded kernel, otherwise by walking all trees for a block of rows at once with vectorized
+    NumPy operations. Either way there are no Python-level estimator objects involved and results
+    match sklearn's predict_proba within float tolerance. The saved arrays are plain numpy, so they
+    can be memory-mapped and shared between processes.
+'''
+
+FLAT_FOREST_PATH = 'models/random_forest_flat.joblib'
+
+# Rows densified and pushed through all trees at once
+BLOCK_SIZE = 1024
+
+def _predict_proba_csr(indptr, indices, data, n_features, feature, threshold,
+                       children_left, children_right, value, roots, probabilities):
+    """Add up the leaf distributions of every tree for every CSR row (compiled with numba below)"""
+    for i in prange(len(indptr) - 1):
+        # Scatter the row's non-zero TF-IDF values into a dense buffer
+        x = np.zeros(n_features, dtype=np.float32)
+        for k in range(indptr[i], indptr[i + 1]):
+            x[indices[k]] = data[k]
+        # Add up the trees in order, like RandomForestClassifier.predict_proba
+        for root in roots:
+            node = root
+            while children_left[node] != node:
+                if x[feature[node]] <= threshold[node]:
+                    node = children_left[node]
+                else:
+                    node = children_right[node]
+            for c in range(value.shape[1]):
+                probabilities[i, c] += value[node, c]
+
+if njit is not None:
+    # Multi-threaded over rows, and a single-threaded build for use inside worker processes
+    _predict_proba_csr_parallel = njit(parallel=True, cache=True)(_predict_proba_csr)
+    _predict_proba_csr_serial = njit(cache=True)(_predict_proba_csr)
+
+class FlatForest:
+    """RandomForestClassifier flattened into contiguous node arrays
+
+    Node ids are global across trees. Leaves point to themselves with a +inf threshold, so a fixed
+    number of "go left or right" steps (the depth of the deepest tree) lands every row on a leaf."""
+
+    def __init__(self, feature, threshold, children_left, children_right, value, roots, max_depth,
+                 classes, n_features):
+        # Use all cores in the compiled kernel (turned off in scoring worker processes)
+        self.parallel = True
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :forest.n_classes_]
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+            roots.append(offset)
+            offset += tree.node_count
+
+        index_dtype = np.int32 if offset < np.iinfo(np.int32).max else np.int64
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children_left=np.concatenate(lefts).astype(index_dtype),
+            children_right=np.concatenate(rights).astype(index_dtype),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.array(roots, dtype=index_dtype),
+            max_depth=max(estimator.tree_.max_depth for estimator in forest.estimators_),
+            classes=forest.classes_,
+            n_features=forest.n_features_in_,
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    def _leaves(self, X_dense):
+        """Leaf node id reached in every tree by every row, shape (n_trees, n_rows)
+        
+        Every step moves all (tree, row) pairs that are not on a leaf yet one level down."""
+        n_rows, n_features = X_dense.shape
+        X_flat = X_dense.ravel()
+        children = np.stack([self.children_right, self.children_left], axis=1)
+        nodes = np.repeat(self.roots[None, :], n_rows, axis=0).T.ravel()
+        row_offsets = np.tile(np.arange(n_rows) * n_features, self.n_estimators)
+        active = np.arange(nodes.size)
+        for _ in range(self.max_depth):
+            active_nodes = nodes[active]
+            go_left = X_flat[row_offsets[active] + self.feature[active_nodes]] <= self.threshold[active_nodes]
+            active_nodes = children[active_nodes, go_left.astype(np.intp)]
+            nodes[active] = active_nodes
+            active = active[children[active_nodes, 1] != active_nodes]
+            if active.size == 0:
+                break
+        return nodes.reshape(self.n_estimators, n_rows)
+
+    def predict_proba(self, X, block_size=BLOCK_SIZE, compiled=None):
+        """Class probabilities for the rows of X (sparse or dense).
+        
+        compiled=None uses the numba kernel for sparse input when numba is installed,
+        compiled=False forces the NumPy walk."""
+        if compiled is None:
+            compiled = njit is not None
+        # sklearn trees compare float32 feature values against float64 thresholds
+        X = X.tocsr().astype(np.float32) if hasattr(X, 'tocsr') else np.asarray(X, dtype=np.float32)
+        # The kernel scatters column indices into an n_features_in_ buffer without bounds checks
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the forest expects {self.n_features_in_}")
+        probabilities = np.zeros((X.shape[0], len(self.classes_)))
+        if compiled and hasattr(X, 'indptr'):
+            kernel = _predict_proba_csr_parallel if self.parallel else _predict_proba_csr_serial
+            kernel(X.indptr, X.indices, X.data, self.n_features_in_, self.feature, self.threshold,
+                   self.children_left, self.children_right, self.value, self.roots, probabilities)
+        else:
+            for start in range(0, X.shape[0], block_size):
+                block = X[start:start + block_size]
+                X_dense = block.toarray() if hasattr(block, 'toarray') else block
+                for tree_leaves in self._leaves(X_dense):
+                    probabilities[start:start + block_size] += self.value[tree_leaves]
+        probabilities /= self.n_estimators
+        return probabilities
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def to_arrays(self):
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'children_left': self.children_left,
+            'children_right': self.children_right,
+            'value': self.value,
+            'roots': self.roots,
+            'max_depth': self.max_depth,
+            'classes': self.classes_,
+            'n_features': self.n_features_in_,
+        }
+
+    def save(self, path=FLAT_FOREST_PATH):
+        # Only plain arrays are stored (no pickled classes), uncompressed so they can be loaded with mmap_mode='r'
+        joblib.dump(self.to_arrays(), path, compress=0)
+
+def export_forest(model_path='models/random_forest_model.joblib', output_path=FLAT_FOREST_PATH):
+    """Flatten the trained forest in model_path and save it to output_path"""
+    forest = joblib.load(model_path)
+    flat_forest = FlatForest.from_sklearn(forest)
+    flat_forest.save(output_path)
+    print(f"Exported {flat_forest.n_estimators} trees ({flat_forest.node_count:,} nodes, "
+          f"max depth {flat_forest.max_depth}) to {output_path}")
+    return forest, flat_forest
+
+def load_forest(path=FLAT_FOREST_PATH, mmap_mode='r'):
+    return FlatForest(**joblib.load(path, mmap_mode=mmap_mode))
+
+def load_or_export_forest(model_path='models/random_forest_model.joblib', path=FLAT_FOREST_PATH, mmap_mode='r'):
+    """Load the flat forest, (re)exporting it first if it is missing or older than model_path"""
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(model_path):
+        export_forest(model_path, path)
+    return load_forest(path, mmap_mode)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the random forest to flat node arrays")
+    parser.add_argument('--model', default='models/random_forest_model.joblib')
+    parser.add_argument('--output', default=FLAT_FOREST_PATH)
+    args = parser.parse_args()
+
+    forest, flat_forest = export_forest(args.model, args.output)
+
+    # Check the export against sklearn on the labeled feedback, with the features the forest was trained on
+    # (load_models chains the feature reducer after the vectorizer when there is one)
+    import pandas as pd
+    import sentiment_scorer
+    _, vectorizer, _ = sentiment_scorer.load_models(model_dir=os.path.dirname(args.model))
+    texts = pd.read_csv('clean-data/labeled_feedback.csv')['Feedback'].fillna('')
+    X = vectorizer.transform(texts)
+    max_difference = np.abs(forest.predict_proba(X) - flat_forest.predict_proba(X)).max()
+    print(f"Max |difference| vs sklearn predict_proba on {X.shape[0]} reviews: {max_difference:.2e}")
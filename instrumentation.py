@@ -0,0 +1,161 @@
+import os
+import sys
+import csv
+import json
+import time
+import cProfile
+import pstats
+from pathlib import Path
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS then falls back to psutil's current RSS (if installed)
+    resource = None
+
+'''
+summary:
+    Per-stage wall time, CPU time, peak RSS and row counts for the training and scoring scripts.
+    Wrap a stage in `with timer.stage('vectorize', rows=n):` and call timer.save() at the end to get a
+    JSON or CSV run report. Entering the same stage name again (e.g. once per chunk) adds to its totals.
+    A disabled StageTimer hands out one shared no-op stage, so leaving the calls in costs next to nothing.
+    One stage can also be run under cProfile, its stats are written next to the report.
+
+    TF_IDF_model.py reads its settings from the environment (see StageTimer.from_env):
+        INSTRUMENT=1  INSTRUMENT_REPORT=reports/train.json  INSTRUMENT_PROFILE=train
+'''
+
+REPORT_DIR = 'reports'
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far in MB (current RSS if the peak isn't available)"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 1e6
+
+class _NullStage:
+    """Stand-in returned by a disabled StageTimer"""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class _Stage:
+    def __init__(self, timer, name, rows):
+        self.timer = timer
+        self.name = name
+        self.rows = rows
+        self.profiler = None
+
+    def __enter__(self):
+        if self.name == self.timer.profile_stage:
+            self.profiler = self.timer.profiler
+            self.profiler.enable()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.timer._record(self.name, wall, cpu, self.rows)
+        return False
+
+class StageTimer:
+    """Collects wall time, CPU time, peak RSS and rows per named stage of a run"""
+
+    def __init__(self, enabled=True, profile_stage=None, run_name=None, report_path=None):
+        self.enabled = enabled
+        self.profile_stage = profile_stage if enabled else None
+        self.profiler = cProfile.Profile() if self.profile_stage else None
+        self.run_name = run_name or Path(sys.argv[0]).stem or 'run'
+        self.report_path = report_path
+        self.started = datetime.now()
+        self.stages = {}
+
+    @classmethod
+    def from_env(cls, run_name=None):
+        """Timer configured by INSTRUMENT (on/off), INSTRUMENT_PROFILE (stage to profile)
+        and INSTRUMENT_REPORT (report path, used by save())"""
+        return cls(enabled=os.environ.get('INSTRUMENT', '0') not in ('', '0', 'false'),
+                   profile_stage=os.environ.get('INSTRUMENT_PROFILE'), run_name=run_name,
+                   report_path=os.environ.get('INSTRUMENT_REPORT'))
+
+    def stage(self, name, rows=None):
+        """Context manager timing one stage. rows can also be set on the returned object inside the block."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, rows)
+
+    def _record(self, name, wall, cpu, rows):
+        record = self.stages.setdefault(name, {
+            'stage': name, 'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rows': None, 'peak_rss_mb': None,
+        })
+        record['calls'] += 1
+        record['wall_seconds'] += wall
+        record['cpu_seconds'] += cpu
+        if rows is not None:
+            record['rows'] = (record['rows'] or 0) + int(rows)
+        record['peak_rss_mb'] = peak_rss_mb()
+
+    def report(self):
+        """One dict per stage in the order the stages first ran, with rows/sec where rows are known"""
+        records = []
+        for record in self.stages.values():
+            record = dict(record)
+            record['rows_per_second'] = (record['rows'] / record['wall_seconds']
+                                         if record['rows'] and record['wall_seconds'] else None)
+            records.append(record)
+        return records
+
+    def print_report(self):
+        if not self.enabled:
+            return
+        print(f"\n{'stage':<24} {'wall s':>9} {'cpu s':>9} {'peak RSS MB':>12} {'rows':>10}")
+        for record in self.report():
+            rows = f"{record['rows']:,}" if record['rows'] is not None else '-'
+            peak = f"{record['peak_rss_mb']:.0f}" if record['peak_rss_mb'] is not None else '-'
+            print(f"{record['stage']:<24} {record['wall_seconds']:>9.3f} {record['cpu_seconds']:>9.3f} "
+                  f"{peak:>12} {rows:>10}")
+
+    def save(self, path=None):
+        """Write the report to path (.json or .csv), default reports/<run name>_<timestamp>.json.
+
+        Returns the report path, or None when the timer is disabled."""
+        if not self.enabled:
+            return None
+        path = path or self.report_path or \
+            f"{REPORT_DIR}/{self.run_name}_{self.started.strftime('%Y%m%d_%H%M%S')}.json"
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        records = self.report()
+        if path.suffix == '.csv':
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(records[0]) if records else ['stage'])
+                writer.writeheader()
+                writer.writerows(records)
+        else:
+            with open(path, 'w') as f:
+                json.dump({'run': self.run_name, 'started': self.started.isoformat(), 'stages': records}, f, indent=2)
+        print(f"Stage report saved to {path}")
+
+        if self.profiler is not None and self.profile_stage in self.stages:
+            profile_path = path.with_suffix(f'.{self.profile_stage}.prof')
+            self.profiler.dump_stats(profile_path)
+            print(f"cProfile of stage '{self.profile_stage}' saved to {profile_path}, top functions:")
+            pstats.Stats(self.profiler).sort_stats('cumulative').print_stats(15)
+        return path
@@ -0,0 +1,176 @@
+import os
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score, classification_report, confusion_matrix
+
+'''
+summary:
+    Evaluation and report figures shared by TF_IDF_model.py and BERT_model.py.
+    evaluate_probabilities derives the predictions, accuracy, macro-F1, ROC-AUC, confusion matrix and
+    classification report from one matrix of class probabilities, so a model is only run over the test
+    set once (the forest used to be run twice, by predict and predict_proba, and the metrics recomputed
+    again for the plots). The plot functions only take plain arrays and an output path, and
+    render_figures draws a list of them in parallel worker processes.
+'''
+
+def evaluate_probabilities(y_true, probabilities, class_names, classes=None):
+    """Every report metric from predicted probabilities (n_rows x n_classes).
+
+    classes are the labels of the probability columns (model.classes_), 0..n_classes-1 by default.
+    The predicted label is the most probable one, the same as model.predict."""
+    y_true = np.asarray(y_true)
+    probabilities = np.asarray(probabilities)
+    classes = np.arange(probabilities.shape[1]) if classes is None else np.asarray(classes)
+    y_pred = classes[np.argmax(probabilities, axis=1)]
+    return {
+        'y_true': y_true,
+        'y_pred': y_pred,
+        'probabilities': probabilities,
+        'class_names': list(class_names),
+        'accuracy': accuracy_score(y_true, y_pred),
+        'f1_macro': f1_score(y_true, y_pred, average='macro'),
+        'roc_auc': roc_auc_score(y_true, probabilities, multi_class='ovr', labels=classes),
+        'confusion_matrix': confusion_matrix(y_true, y_pred, labels=classes),
+        'classification_report': classification_report(y_true, y_pred, labels=classes,
+                                                       target_names=list(class_names), zero_division=0),
+    }
+
+def evaluate_classifier(model, X_test, y_test, class_names):
+    """evaluate_probabilities over a single model.predict_proba pass"""
+    return evaluate_probabilities(y_test, model.predict_proba(X_test), class_names, model.classes_)
+
+def summary_metrics(evaluation):
+    """The scores shown in the metrics comparison plot"""
+    return {
+        'Accuracy': evaluation['accuracy'],
+        'F1 Score': evaluation['f1_macro'],
+        'ROC-AUC': evaluation['roc_auc'],
+    }
+
+def print_metrics(evaluation, model_name):
+    print(f"\n=== {model_name} Model Metrics ===")
+    print(f"Accuracy: {evaluation['accuracy']:.4f}")
+    print(f"F1 Score: {evaluation['f1_macro']:.4f}")
+    print(f"ROC-AUC: {evaluation['roc_auc']:.4f}")
+    print("\nClassification Report:")
+    print(evaluation['classification_report'])
+
+def write_metrics(evaluation, model_name, output_path, include_report=True):
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as f:
+        f.write(f"=== {model_name} Model Metrics ===\n")
+        f.write(f"Accuracy: {evaluation['accuracy']:.4f}\n")
+        f.write(f"F1 Score: {evaluation['f1_macro']:.4f}\n")
+        f.write(f"ROC-AUC: {evaluation['roc_auc']:.4f}\n")
+        if include_report:
+            f.write("\nClassification Report:\n")
+            f.write(evaluation['classification_report'])
+
+# Plots. Each one draws and saves a single figure on its own, so they can run in any process
+# (plotting libraries are imported where they are used so importing this module stays fast)
+
+def plot_confusion_matrix(cm, class_names, accuracy, title, output_path, figsize=(6, 4)):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    plt.figure(figsize=figsize)
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=class_names, yticklabels=class_names)
+    plt.title(title)
+    plt.xlabel('Predicted')
+    plt.ylabel('Actual')
+    plt.text(0.5, -0.1, f'Accuracy: {accuracy:.2f}', ha='center', va='center', transform=plt.gca().transAxes)
+    plt.savefig(output_path)
+    plt.close()
+
+def plot_distribution(actual, predicted, class_names, output_path, note=None):
+    """Counts of the actual and predicted sentiment names, overlaid"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    plt.figure(figsize=(10, 6))
+    sns.countplot(x=actual, order=class_names, color='blue', label='Actual')
+    sns.countplot(x=predicted, order=class_names, color='red', alpha=0.6, label='Predicted')
+    plt.title('Sentiment Distribution: Actual vs Predictions')
+    plt.xlabel('Sentiment')
+    plt.ylabel('Count')
+    plt.legend(title='Legend')
+    if note:
+        plt.text(0.5, -0.1, note, ha='center', va='center', transform=plt.gca().transAxes)
+    plt.savefig(output_path)
+    plt.close()
+
+def plot_metrics(metrics, title, output_path):
+    """Bar chart of {model name: summary_metrics(...)}"""
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    metrics_df = pd.DataFrame(metrics).T.reset_index().rename(columns={'index': 'Model'})
+    metrics_melted = metrics_df.melt(id_vars='Model', var_name='Metric', value_name='Score')
+
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x='Metric', y='Score', hue='Model', data=metrics_melted)
+    plt.title(title)
+    plt.ylim(0, 1)
+    plt.xlabel('Performance Metric')
+    plt.ylabel('Score')
+    plt.legend(title='Model')
+    for index, row in metrics_melted.iterrows():
+        plt.text(index, row['Score'] + 0.02, f"{row['Score']:.2f}", ha='center', va='bottom')
+    plt.savefig(output_path)
+    plt.close()
+
+def plot_feature_importance(importances, feature_names, title, output_path, top=20):
+    import matplotlib.pyplot as plt
+    indices = np.argsort(importances)[-top:]
+    plt.figure(figsize=(10, 6))
+    plt.title(f'Top {top} Most Important Features ({title})')
+    plt.barh(range(len(indices)), importances[indices], color='skyblue')
+    plt.yticks(range(len(indices)), [feature_names[i] for i in indices])
+    plt.xlabel('Importance Score')
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+
+def report_figures(evaluation, model_name, output_dir, confusion_title, confusion_filename,
+                   metrics_title='Model Performance Comparison', confusion_figsize=(6, 4), distribution_note=None):
+    """The (plot function, kwargs) jobs of the standard evaluation figures, for render_figures"""
+    output_dir = Path(output_dir)
+    # The targets are label encoded, so they index the class names directly
+    class_names = np.asarray(evaluation['class_names'])
+    return [
+        (plot_confusion_matrix, dict(cm=evaluation['confusion_matrix'], class_names=list(class_names),
+                                     accuracy=evaluation['accuracy'], title=confusion_title,
+                                     output_path=output_dir / f'{confusion_filename}.png',
+                                     figsize=confusion_figsize)),
+        (plot_distribution, dict(actual=class_names[evaluation['y_true']],
+                                 predicted=class_names[evaluation['y_pred']], class_names=list(class_names), note=distribution_note,
+                                 output_path=output_dir / 'distribution_comparison.png')),
+        (plot_metrics, dict(metrics={model_name: summary_metrics(evaluation)}, title=metrics_title,
+                            output_path=output_dir / 'metrics_comparison.png')),
+    ]
+
+def _init_render_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _render(job):
+    plot, kwargs = job
+    plot(**kwargs)
+    return kwargs['output_path']
+
+def render_figures(jobs, n_jobs=None):
+    """Draw every (plot function, kwargs) job, one figure per worker process.
+
+    Workers are forked so they don't re-import the calling script and everything it imports (torch for
+    BERT_model.py). Where fork isn't available, or with a single worker, the
+    figures are drawn in this process one after the other."""
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count()
+    n_jobs = min(n_jobs, len(jobs))
+    for _, kwargs in jobs:
+        Path(kwargs['output_path']).parent.mkdir(parents=True, exist_ok=True)
+    if n_jobs <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return [_render(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context('fork'),
+                             initializer=_init_render_worker) as pool:
+        return list(pool.map(_render, jobs))
@@ -0,0 +1,183 @@
+import csv
+import json
+import time
+import warnings
+from functools import partial
+from pathlib import Path
+from datetime import datetime
+import numpy as np
+from scipy.stats import rankdata
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (registers HalvingRandomSearchCV)
+from sklearn.model_selection import (GridSearchCV, HalvingRandomSearchCV, ParameterGrid, ParameterSampler,
+                                     RandomizedSearchCV, check_cv)
+
+'''
+summary:
+    Hyperparameter search strategies for the TF-IDF random forest, with a compute budget.
+    "grid" is the original exhaustive GridSearchCV. "halving" runs successive halving over the number
+    of trees: `budget` random candidates start with few trees, and each round keeps the best third and
+    triples their trees, up to the largest n_estimators in the grid. "random" cross-validates `budget`
+    random candidates at full size. "warm_start" grows one forest per combination of the other parameters
+    (`budget` random ones, or all of them with budget=None) through the n_estimators values with
+    warm_start=True and scores it at each of them, so a 400-tree forest reuses the trees of the 200- and
+    300-tree ones; with oob=True it is scored on its out-of-bag samples instead of CV folds.
+    Every search is appended to a log with its best params, best CV
+    macro-F1, number of forests fitted, trees grown and total fit time, so strategies can be compared.
+'''
+
+SEARCH_STRATEGIES = ['grid', 'halving', 'random', 'warm_start']
+
+SEARCH_LOG_PATH = 'visuals/tf-idf_class/search_log.csv'
+
+class WarmStartForestSearch:
+    """Search over param_grid that grows every forest through the n_estimators checkpoints.
+
+    Follows the fitted-search attributes run_search and the callers use (best_estimator_, best_params_,
+    best_score_, cv_results_, n_splits_). The forest's random state doesn't depend on warm starting,
+    so the score at each checkpoint is the score a forest of that size would get when fitted from scratch."""
+
+    def __init__(self, param_grid, budget=None, cv=5, oob=False, random_state=42, n_jobs=-1, verbose=1):
+        self.estimator = RandomForestClassifier(random_state=random_state)
+        self.checkpoints = sorted(param_grid.get('n_estimators', [self.estimator.n_estimators]))
+        self.param_grid = {name: values for name, values in param_grid.items() if name != 'n_estimators'}
+        self.budget = budget
+        self.cv = cv
+        self.oob = oob
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.verbose = verbose
+
+    def candidates(self):
+        n_combinations = len(ParameterGrid(self.param_grid))
+        if self.budget is None or self.budget >= n_combinations:
+            return list(ParameterGrid(self.param_grid))
+        return list(ParameterSampler(self.param_grid, self.budget, random_state=self.random_state))
+
+    def _grow(self, params, X_train, y_train, X_test=None, y_test=None):
+        """Macro-F1 at every checkpoint of one forest, on the test rows or out-of-bag"""
+        forest = clone(self.estimator).set_params(warm_start=True, n_jobs=1, **params)
+        if self.oob:
+            forest.set_params(oob_score=partial(f1_score, average='macro'))
+        scores = []
+        for n_estimators in self.checkpoints:
+            with warnings.catch_warnings():
+                # Every warm fit sees the same rows, so the 'balanced' class weights don't drift between them
+                warnings.filterwarnings('ignore', message='class_weight presets', category=UserWarning)
+                forest.set_params(n_estimators=n_estimators).fit(X_train, y_train)
+            scores.append(forest.oob_score_ if self.oob else f1_score(y_test, forest.predict(X_test), average='macro'))
+        return scores
+
+    def fit(self, X, y):
+        y = np.asarray(y)
+        candidates = self.candidates()
+        if self.oob:
+            splits = [(np.arange(X.shape[0]), None)]
+        else:
+            splits = list(check_cv(self.cv, y, classifier=True).split(X, y))
+        self.n_splits_ = len(splits)
+        if self.verbose:
+            source = 'out-of-bag' if self.oob else f'{self.n_splits_}-fold CV'
+            print(f"Growing {len(candidates)} candidates x {self.n_splits_} splits through n_estimators "
+                  f"{self.checkpoints}, scored {source}")
+
+        if self.oob:
+            tasks = [delayed(self._grow)(params, X, y) for params in candidates]
+        else:
+            tasks = [delayed(self._grow)(params, X[train], y[train], X[test], y[test])
+                     for params in candidates for train, test in splits]
+        scores = np.array(Parallel(n_jobs=self.n_jobs)(tasks))
+        # (candidate, split, checkpoint) -> mean over splits
+        scores = scores.reshape(len(candidates), self.n_splits_, len(self.checkpoints))
+        mean_scores = scores.mean(axis=1).ravel()
+
+        params = [{**candidate, 'n_estimators': n_estimators}
+                  for candidate in candidates for n_estimators in self.checkpoints]
+        self.cv_results_ = {
+            'params': params,
+            'mean_test_score': mean_scores,
+            'std_test_score': scores.std(axis=1).ravel(),
+            'rank_test_score': rankdata(-mean_scores, method='min').astype(int),
+        }
+        self.best_index_ = int(np.argmax(mean_scores))
+        self.best_params_ = params[self.best_index_]
+        self.best_score_ = float(mean_scores[self.best_index_])
+        self.n_fits_ = len(tasks) + 1
+        self.n_trees_ = len(tasks) * self.checkpoints[-1] + self.best_params_['n_estimators']
+
+        self.best_estimator_ = clone(self.estimator).set_params(n_jobs=self.n_jobs, **self.best_params_)
+        self.best_estimator_.fit(X, y)
+        return self
+
+def make_search(strategy, param_grid, budget=60, cv=5, random_state=42, n_jobs=-1, verbose=1, oob=False):
+    """Unfitted sklearn search object for the strategy over param_grid (a dict of lists, like rf_params).
+
+    oob only applies to the warm_start strategy."""
+    rf = RandomForestClassifier(random_state=random_state)
+    if strategy == 'grid':
+        return GridSearchCV(rf, param_grid, cv=cv, scoring='f1_macro', n_jobs=n_jobs, verbose=verbose)
+    if strategy == 'random':
+        return RandomizedSearchCV(rf, param_grid, n_iter=min(budget, len(ParameterGrid(param_grid))), cv=cv,
+                                  scoring='f1_macro', n_jobs=n_jobs, random_state=random_state, verbose=verbose)
+    if strategy == 'halving':
+        # The number of trees is the resource being halved over, so it is not searched directly
+        max_trees = max(param_grid.get('n_estimators', [400]))
+        param_grid = {name: values for name, values in param_grid.items() if name != 'n_estimators'}
+        return HalvingRandomSearchCV(rf, param_grid, n_candidates=budget, resource='n_estimators',
+                                     min_resources=max(max_trees // 9, 10), max_resources=max_trees, factor=3,
+                                     cv=cv, scoring='f1_macro', n_jobs=n_jobs, random_state=random_state,
+                                     verbose=verbose)
+    if strategy == 'warm_start':
+        return WarmStartForestSearch(param_grid, budget, cv=cv, oob=oob, random_state=random_state,
+                                     n_jobs=n_jobs, verbose=verbose)
+    raise ValueError(f"Unknown search strategy '{strategy}', expected one of {SEARCH_STRATEGIES}")
+
+def search_cost(search):
+    """(forests fitted, trees grown) over all candidates and CV folds of a fitted search"""
+    if isinstance(search, WarmStartForestSearch):
+        return search.n_fits_, search.n_trees_
+    n_splits = search.n_splits_
+    params = search.cv_results_['params']
+    default_trees = search.estimator.n_estimators
+    trees = sum(candidate.get('n_estimators', default_trees) for candidate in params) * n_splits
+    return len(params) * n_splits, trees
+
+def run_search(X, y, param_grid, strategy='halving', budget=60, cv=5, random_state=42, n_jobs=-1, verbose=1,
+               log_path=SEARCH_LOG_PATH, oob=False):
+    """Fit the search and log it. Returns (fitted search, summary dict)."""
+    search = make_search(strategy, param_grid, budget, cv, random_state, n_jobs, verbose, oob)
+    start = time.perf_counter()
+    search.fit(X, y)
+    fit_seconds = time.perf_counter() - start
+
+    n_fits, n_trees = search_cost(search)
+    summary = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'strategy': strategy + ('+oob' if oob and strategy == 'warm_start' else ''),
+        'budget': budget if strategy != 'grid' else len(ParameterGrid(param_grid)),
+        'n_fits': n_fits,
+        'n_trees': n_trees,
+        'fit_seconds': round(fit_seconds, 2),
+        'best_cv_f1_macro': round(float(search.best_score_), 4),
+        'best_params': json.dumps(search.best_params_, default=str),
+        'n_samples': X.shape[0],
+    }
+    print(f"{summary['strategy']} search: {n_fits} forests ({n_trees:,} trees) in {fit_seconds:.1f}s, "
+          f"best CV macro-F1 {search.best_score_:.4f}")
+    print(f"Best parameters found: {search.best_params_}")
+    if log_path:
+        append_search_log(summary, log_path)
+    return search, summary
+
+def append_search_log(summary, log_path=SEARCH_LOG_PATH):
+    log_path = Path(log_path)
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    write_header = not log_path.exists()
+    with open(log_path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(summary))
+        if write_header:
+            writer.writeheader()
+        writer.writerow(summary)
@@ -0,0 +1,110 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+import joblib
+import scipy.sparse as sp
+from prediction_cache import artifact_fingerprint
+
+'''
+summary:
+    On-disk checkpoints for the stages of a training pipeline (used by TF_IDF_model.py).
+    A stage's key is a sha256 over its name, its parameters and the key of the stage before it, so
+    changing a parameter (or an input file, when its fingerprint is one of the first stage's parameters)
+    invalidates that stage and every stage after it, while a rerun loads every stage before the first
+    invalidated one from cache/pipeline/<stage>/<key>.joblib instead of recomputing it.
+    Stages that write files (models, figures) list them as outputs, and their checkpoint also stores a
+    fingerprint of those files, so the stage reruns when they are missing or were overwritten since.
+    Sparse matrices in a stage's result (e.g. the vectorize stage's TF-IDF feature matrix) are saved with
+    scipy.sparse.save_npz next to the checkpoint, as <key>.<position>.npz, and reloaded with load_npz.
+'''
+
+PIPELINE_CACHE_DIR = 'cache/pipeline'
+
+class _SparseFile:
+    """Stands in for a sparse matrix of a checkpointed result, which is stored in its own .npz file"""
+
+    def __init__(self, filename):
+        self.filename = filename
+
+def stage_key(name, params, upstream_key=''):
+    digest = hashlib.sha256()
+    digest.update(upstream_key.encode())
+    digest.update(name.encode())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+class StageCache:
+    """Runs pipeline stages in order, resuming each one from its checkpoint when its key still matches.
+
+    stages is the pipeline's stage order; rerun_from forces that stage and every later one to recompute.
+    With enabled=False every stage is computed and nothing is read or written."""
+
+    def __init__(self, stages, cache_dir=PIPELINE_CACHE_DIR, enabled=True, rerun_from=None):
+        self.stages = list(stages)
+        self.cache_dir = Path(cache_dir)
+        self.enabled = enabled
+        self.rerun_index = self.stages.index(rerun_from) if rerun_from is not None else len(self.stages)
+        self.key = ''
+        self.resumed = []
+
+    def path(self, name, key):
+        return self.cache_dir / name / f'{key}.joblib'
+
+    def _load(self, name, key, outputs):
+        if not self.enabled or self.stages.index(name) >= self.rerun_index:
+            return None
+        path = self.path(name, key)
+        if not path.exists():
+            return None
+        checkpoint = joblib.load(path)
+        result = checkpoint['result']
+        if isinstance(result, tuple) and any(isinstance(item, _SparseFile) for item in result):
+            if not all((path.parent / item.filename).exists() for item in result if isinstance(item, _SparseFile)):
+                return None
+            checkpoint['result'] = tuple(sp.load_npz(path.parent / item.filename) if isinstance(item, _SparseFile)
+                                         else item for item in result)
+        if outputs:
+            if not all(Path(output).exists() for output in outputs):
+                return None
+            if checkpoint['outputs_fingerprint'] != artifact_fingerprint(outputs):
+                return None
+        return checkpoint
+
+    def _save_sparse(self, result, path):
+        """result with each sparse matrix (of a tuple result) written to <key>.<position>.npz and replaced
+        by a _SparseFile. The checkpoint is written after these files, so it never points to a missing one."""
+        if not isinstance(result, tuple):
+            return result
+        stored = []
+        for position, item in enumerate(result):
+            if sp.issparse(item):
+                filename = f'{path.stem}.{position}.npz'
+                temporary_path = path.parent / f'{path.stem}.{position}.tmp.npz'
+                sp.save_npz(temporary_path, item.tocsr())
+                os.replace(temporary_path, path.parent / filename)
+                item = _SparseFile(filename)
+            stored.append(item)
+        return tuple(stored)
+
+    def run(self, name, params, compute, outputs=()):
+        """compute() for this stage, or its checkpointed result. outputs are the files compute() writes."""
+        key = stage_key(name, params, self.key)
+        checkpoint = self._load(name, key, outputs)
+        if checkpoint is not None:
+            print(f"Resuming '{name}' from {self.path(name, key)}")
+            self.resumed.append(name)
+            result = checkpoint['result']
+        else:
+            result = compute()
+            if self.enabled:
+                path = self.path(name, key)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                checkpoint = {'result': self._save_sparse(result, path),
+                              'outputs_fingerprint': artifact_fingerprint(outputs) if outputs else None}
+                # Write to a temporary file first, so an interrupted run never leaves a truncated checkpoint
+                temporary_path = path.with_suffix('.tmp')
+                joblib.dump(checkpoint, temporary_path)
+                os.replace(temporary_path, path)
+        self.key = key
+        return result
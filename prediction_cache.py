@@ -0,0 +1,115 @@
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+import numpy as np
+
+'''
+summary:
+    Persistent on-disk cache of class probabilities and text scores for sentiment_scorer.
+    Entries are keyed by a hash of the normalized text plus a fingerprint of the model artifacts,
+    so retraining (new artifact bytes) never hits an entry cached before. Entries of other artifact sets
+    (e.g. alternating --model-dir between runs) stay in the cache until the LRU eviction drops them.
+'''
+
+MODEL_ARTIFACTS = [
+    'models/random_forest_model.joblib',
+    'models/tfidf_vectorizer.joblib',
+    'models/label_encoder.joblib',
+]
+
+# sqlite limits the number of ? parameters per statement
+SQL_BATCH_SIZE = 900
+
+def artifact_fingerprint(paths=MODEL_ARTIFACTS):
+    """sha256 over the contents of the model artifacts"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(Path(path).name.encode())
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def normalize_text(text, lowercase=True):
+    """Collapse whitespace (and lowercase) so trivially different copies of a review share a cache entry.
+
+    The TF-IDF tokenizer ignores whitespace and lowercases by default, so this never changes the prediction."""
+    text = ' '.join(str(text).split())
+    return text.lower() if lowercase else text
+
+class PredictionCache:
+    """sqlite-backed cache of (probabilities, score) per normalized text with least-recently-used eviction"""
+
+    def __init__(self, path, fingerprint, max_entries=1_000_000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS predictions (
+            key TEXT PRIMARY KEY,
+            fingerprint TEXT,
+            probabilities BLOB,
+            score REAL,
+            last_used REAL
+        )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON predictions (last_used)")
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def key(self, normalized_text):
+        return hashlib.sha256(f"{self.fingerprint}\0{normalized_text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, keys):
+        """Return {key: (probabilities, score)} for the keys that are cached and update the counters"""
+        found = {}
+        now = time.time()
+        for start in range(0, len(keys), SQL_BATCH_SIZE):
+            batch = keys[start:start + SQL_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.conn.execute(
+                f"SELECT key, probabilities, score FROM predictions WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, probabilities, score in rows:
+                found[key] = (np.frombuffer(probabilities, dtype=np.float64), score)
+            self.conn.execute(
+                f"UPDATE predictions SET last_used = ? WHERE key IN ({placeholders})", [now] + batch
+            )
+        self.conn.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, keys, probabilities, scores):
+        """Store freshly computed predictions, then evict the least recently used entries over max_entries"""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)",
+            [(key, self.fingerprint, np.asarray(p, dtype=np.float64).tobytes(), float(score), now)
+             for key, p, score in zip(keys, probabilities, scores)]
+        )
+        self.size += len(keys)
+        if self.size > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM predictions WHERE key IN "
+                "(SELECT key FROM predictions ORDER BY last_used LIMIT ?)",
+                (self.size - self.max_entries,)
+            )
+            self.size = self.max_entries
+        self.conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': self.size,
+        }
+
+    def close(self):
+        self.conn.close()
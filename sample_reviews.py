@@ -1,20 +1,32 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from columnar_io import find_scored_output, read_scored
 
 # Set up paths
 current_dir = Path(__file__).parent
-input_file = current_dir / 'clean-data' / 'feedback_data_with_sentiment.csv'
+# Newest of feedback_data_with_sentiment.csv/.parquet/.arrow written by sentiment_scorer.py
+input_file = find_scored_output(current_dir / 'clean-data' / 'feedback_data_with_sentiment.csv')
 output_dir = current_dir / 'visuals'
 output_file = output_dir / 'sample_reviews.csv'
 
 # Ensure output directory exists
 output_dir.mkdir(parents=True, exist_ok=True)
 
+# Only the columns used below are read
+columns_to_keep = [
+    'Feedback',
+    'Rating',
+    'text_sentiment',
+    'combined_sentiment',
+    'text_sentiment_class',
+    'combined_sentiment_class'
+]
+
 try:
     # Read the feedback data
     print(f"Reading data from {input_file}")
-    df = pd.read_csv(input_file)
+    df = read_scored(input_file, columns=columns_to_keep)
     
     print("\nInitial data shape:", df.shape)
     print("\nColumns in the DataFrame:")
@@ -51,15 +63,6 @@ try:
     final_sample = final_sample.sort_values('text_sentiment_class')
     
     # Select relevant columns
-    columns_to_keep = [
-        'Feedback',
-        'Rating',
-        'text_sentiment',
-        'combined_sentiment',
-        'text_sentiment_class',
-        'combined_sentiment_class'
-    ]
-    
     final_sample = final_sample[columns_to_keep]
     
     # Save to CSV
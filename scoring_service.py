@@ -0,0 +1,235 @@
+import json
+import math
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import sentiment_scorer
+
+'''
+summary:
+    Long-running local HTTP service that scores feedback live with the TF-IDF model.
+    The models are loaded once at start-up. Concurrent requests are queued and a single scoring
+    thread coalesces them into micro-batches (up to --max-batch-size texts, waiting at most
+    --max-wait-ms for more to arrive), so many small requests share one vectorizer/forest call.
+
+    POST /score   {"texts": [...], "ratings": [...]}  or  {"text": "...", "rating": 4}
+    GET  /stats   request latency percentiles, throughput and batch sizes
+    GET  /health
+'''
+
+DEFAULT_PORT = 8765
+
+# Number of recent requests kept for the latency percentiles
+LATENCY_WINDOW = 10000
+
+class ScoringRequest:
+    def __init__(self, texts):
+        self.texts = texts
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.probabilities = None
+        self.error = None
+
+class MicroBatcher:
+    """Coalesces concurrent scoring requests into batches scored by one background thread"""
+
+    def __init__(self, model, vectorizer, label_encoder, max_batch_size=256, max_wait_ms=5.0):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.label_encoder = label_encoder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self.texts_scored = 0
+        self.requests_served = 0
+        self.started = time.perf_counter()
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def score(self, texts):
+        """Block until the texts have been scored in some batch, return their class probabilities"""
+        request = ScoringRequest(texts)
+        self.requests.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.probabilities
+
+    def _collect_batch(self):
+        """Wait for a first request, then take more until the batch is full or max_wait has passed"""
+        batch = [self.requests.get()]
+        n_texts = len(batch[0].texts)
+        deadline = time.perf_counter() + self.max_wait
+        while n_texts < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            n_texts += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for request in batch for text in request.texts]
+            try:
+                probabilities = sentiment_scorer.get_text_probabilities_batch(
+                    texts, self.model, self.vectorizer, batch_size=max(len(texts), 1)
+                )
+            except Exception as error:
+                for request in batch:
+                    request.error = error
+                    request.done.set()
+                continue
+
+            finished = time.perf_counter()
+            start = 0
+            for request in batch:
+                request.probabilities = probabilities[start:start + len(request.texts)]
+                start += len(request.texts)
+                request.done.set()
+            with self.lock:
+                self.latencies.extend(finished - request.enqueued for request in batch)
+                self.batch_sizes.append(len(texts))
+                self.texts_scored += len(texts)
+                self.requests_served += len(batch)
+
+    def stats(self):
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            batch_sizes = np.array(self.batch_sizes)
+            uptime = time.perf_counter() - self.started
+            return {
+                'requests_served': self.requests_served,
+                'texts_scored': self.texts_scored,
+                'uptime_seconds': uptime,
+                'texts_per_second': self.texts_scored / uptime if uptime else 0.0,
+                'latency_ms_p50': float(np.percentile(latencies, 50)) if len(latencies) else None,
+                'latency_ms_p99': float(np.percentile(latencies, 99)) if len(latencies) else None,
+                'mean_batch_size': float(batch_sizes.mean()) if len(batch_sizes) else None,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+            }
+
+def is_rating(rating):
+    """A rating is a finite number (not a bool) or None"""
+    if rating is None:
+        return True
+    return isinstance(rating, (int, float)) and not isinstance(rating, bool) and math.isfinite(rating)
+
+def build_results(probabilities, ratings, label_encoder):
+    """Same scores and classes as sentiment_scorer writes to feedback_data_with_sentiment.csv"""
+    text_scores = sentiment_scorer.probabilities_to_score(probabilities)
+    text_classes = sentiment_scorer.score_to_sentiment_batch(text_scores)
+    results = []
+    for i, score in enumerate(text_scores):
+        result = {
+            'text_sentiment': float(score),
+            'text_sentiment_class': str(text_classes[i]),
+            'probabilities': {class_name: float(p) for class_name, p in zip(label_encoder.classes_, probabilities[i])},
+        }
+        if ratings is not None and ratings[i] is not None:
+            combined = sentiment_scorer.combine_scores(score, float(ratings[i]))
+            result['combined_sentiment'] = float(combined)
+            result['combined_sentiment_class'] = sentiment_scorer.score_to_sentiment(combined)
+        results.append(result)
+    return results
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 resets connections under a burst of concurrent clients
+    request_queue_size = 128
+
+def make_handler(batcher):
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {'status': 'ok'})
+            elif self.path == '/stats':
+                self._send_json(200, batcher.stats())
+            else:
+                self._send_json(404, {'error': 'Not found'})
+
+        def do_POST(self):
+            if self.path != '/score':
+                self._send_json(404, {'error': 'Not found'})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                single = 'text' in payload
+                texts = [payload['text']] if single else payload['texts']
+                ratings = [payload.get('rating')] if single else payload.get('ratings')
+                if not isinstance(texts, list):
+                    raise ValueError("expected 'text' or 'texts' (list)")
+                if ratings is not None and (not isinstance(ratings, list) or len(ratings) != len(texts)):
+                    raise ValueError("'ratings' must be a list of the same length as 'texts'")
+                if ratings is not None and not all(is_rating(rating) for rating in ratings):
+                    raise ValueError("ratings must be numbers or null")
+                texts = ['' if text is None else str(text) for text in texts]
+            except (ValueError, KeyError, TypeError) as error:
+                self._send_json(400, {'error': str(error)})
+                return
+
+            try:
+                probabilities = batcher.score(texts) if texts else np.empty((0, len(batcher.label_encoder.classes_)))
+                results = build_results(probabilities, ratings, batcher.label_encoder)
+            except Exception as error:
+                # Answer instead of dropping the connection, the client would only see a disconnect
+                self._send_json(500, {'error': f"{type(error).__name__}: {error}"})
+                return
+            self._send_json(200, results[0] if single else {'results': results})
+
+        def log_message(self, format, *args):
+            # Per-request logging would dominate the latency under load
+            pass
+
+    return ScoringHandler
+
+def main(port=DEFAULT_PORT, max_batch_size=256, max_wait_ms=5.0, engine='sklearn'):
+    print("Loading models...")
+    model, vectorizer, label_encoder = sentiment_scorer.load_models(engine=engine)
+    # Warm up the vectorizer/model (and compile the flat engine) before taking traffic. Scored directly rather
+    # than through the batcher, so /stats (and its uptime) only covers real requests
+    sentiment_scorer.get_text_probabilities_batch(['warm up'], model, vectorizer)
+    batcher = MicroBatcher(model, vectorizer, label_encoder, max_batch_size, max_wait_ms)
+
+    server = ScoringServer(('127.0.0.1', port), make_handler(batcher))
+    print(f"Scoring service listening on http://127.0.0.1:{port} "
+          f"(max batch {max_batch_size}, max wait {max_wait_ms} ms)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local micro-batching sentiment scoring service")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-batch-size', type=int, default=256, help="max texts per model call")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                        help="how long a batch waits for more requests before it is scored")
+    parser.add_argument('--engine', choices=['sklearn', 'flat', 'compact'], default='sklearn')
+    args = parser.parse_args()
+    main(args.port, args.max_batch_size, args.max_wait_ms, args.engine)
@@ -1,16 +1,130 @@
 import pandas as pd
 import numpy as np
 import joblib
+import time
+import argparse
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.pipeline import Pipeline
 from pathlib import Path
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
+from prediction_cache import PredictionCache, artifact_fingerprint, normalize_text
+from columnar_io import OUTPUT_FORMATS, ScoredWriter, output_path_for, read_scored, write_scored
+from instrumentation import StageTimer
 
-def load_models():
-    """Load the trained modelswe saved in models/"""
-    model = joblib.load('models/random_forest_model.joblib')
-    vectorizer = joblib.load('models/tfidf_vectorizer.joblib')
-    label_encoder = joblib.load('models/label_encoder.joblib')
+# Number of reviews transformed and scored per model call in the batch scoring path
+BATCH_SIZE = 10000
+
+# Number of CSV rows read, scored and appended per step in streaming mode
+CHUNK_SIZE = 50000
+
+# Default location of the persistent prediction cache
+CACHE_PATH = 'cache/prediction_cache.sqlite'
+
+# Columns identifying a feedback row (user email + date) for incremental re-scoring
+ID_COLUMNS = ['UserId', 'Timestamp']
+
+# Columns that score_feedback adds to the feedback data
+SCORE_COLUMNS = ['text_sentiment', 'combined_sentiment', 'text_sentiment_class', 'combined_sentiment_class']
+
+# Directory with the trained TF-IDF + random forest artifacts
+MODEL_DIR = 'models'
+
+# load_models uses the first of these files that exists in its model_dir, so another artifact set
+# (e.g. the out-of-core SGD model that SGD_online_model.py writes to models/online, or the sparse linear
+# model TF_IDF_model.py --linear writes to models/linear) is a drop-in replacement
+MODEL_FILENAMES = ['random_forest_model.joblib', 'linear_model.joblib', 'sgd_model.joblib']
+VECTORIZER_FILENAMES = ['tfidf_vectorizer.joblib', 'hashing_vectorizer.joblib']
+LABEL_ENCODER_FILENAME = 'label_encoder.joblib'
+
+# Optional feature reducer (TF_IDF_model.py --reduce, see feature_reduction.py), chained after the vectorizer if present
+REDUCER_FILENAME = 'feature_reducer.joblib'
+
+# Single uncompressed bundle of the three artifacts used by load_models(fast_start=True), kept inside the model_dir
+FAST_START_FILENAME = 'fast_start.joblib'
+FAST_START_PATH = f'{MODEL_DIR}/{FAST_START_FILENAME}'
+
+# Models used by the scoring worker processes, either inherited from the parent (fork) or loaded once per worker
+_worker_models = None
+
+def model_artifacts(model_dir=MODEL_DIR):
+    """Paths of the model, vectorizer and label encoder in model_dir, plus the feature reducer if there is one"""
+    def first_existing(filenames):
+        for filename in filenames:
+            path = os.path.join(model_dir, filename)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"None of {filenames} found in {model_dir}")
+    artifacts = [first_existing(MODEL_FILENAMES), first_existing(VECTORIZER_FILENAMES),
+                 os.path.join(model_dir, LABEL_ENCODER_FILENAME)]
+    reducer_path = os.path.join(model_dir, REDUCER_FILENAME)
+    if os.path.exists(reducer_path):
+        artifacts.append(reducer_path)
+    return artifacts
+
+def artifact_stats(model_dir=MODEL_DIR):
+    """(name, size, mtime) of the model artifacts, a cheap way to tell whether they were rewritten"""
+    return [(Path(path).name, os.path.getsize(path), os.path.getmtime(path)) for path in model_artifacts(model_dir)]
+
+def export_fast_start_artifacts(model_dir=MODEL_DIR):
+    """Bundle model, vectorizer and label encoder into one uncompressed joblib file for fast startup.
+    
+    The bundle is read with a single open and its numpy arrays are memory-mapped instead of copied.
+    It remembers which artifacts it was built from so a retrain makes it stale instead of wrong."""
+    path = os.path.join(model_dir, FAST_START_FILENAME)
+    model, vectorizer, label_encoder = load_models(model_dir=model_dir)
+    bundle = {
+        'model': model,
+        'vectorizer': vectorizer,
+        'label_encoder': label_encoder,
+        'source_artifacts': artifact_stats(model_dir),
+    }
+    joblib.dump(bundle, path, compress=0)
+    print(f"Saved fast-start artifacts to {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+def load_models(mmap_mode=None, fast_start=False, engine='sklearn', model_dir=MODEL_DIR):
+    """Load the trained modelswe saved in models/ (or another model_dir, see MODEL_FILENAMES)
+    
+    mmap_mode='r' memory-maps the numpy arrays stored in the (uncompressed) joblib files
+    instead of reading them into memory. fast_start=True loads the bundle written by
+    export_fast_start_artifacts (memory-mapped) when it is up to date with models/.
+    engine='flat' swaps the sklearn forest for the array-backed FlatForest from forest_engine
+    (exported from random_forest_model.joblib on first use, always memory-mapped), engine='compact' for
+    the pruned, compact-dtype FlatForest that forest_compaction.py writes to random_forest_compact.joblib.
+    If model_dir has a feature_reducer.joblib, the returned vectorizer is a Pipeline of vectorizer and reducer."""
+    model_path, vectorizer_path, label_encoder_path = model_artifacts(model_dir)[:3]
+    if fast_start:
+        fast_start_path = os.path.join(model_dir, FAST_START_FILENAME)
+        if engine == 'sklearn' and Path(fast_start_path).exists():
+            bundle = joblib.load(fast_start_path, mmap_mode='r')
+            if bundle['source_artifacts'] == artifact_stats(model_dir):
+                return bundle['model'], bundle['vectorizer'], bundle['label_encoder']
+            print(f"{fast_start_path} is older than the artifacts in {model_dir}/, loading those instead")
+        mmap_mode = 'r'
+    if engine in ('flat', 'compact'):
+        if Path(model_path).name != 'random_forest_model.joblib':
+            raise ValueError(f"engine='{engine}' needs a random forest, {model_dir} has {Path(model_path).name}")
+    if engine == 'flat':
+        # Imported here so the sklearn path doesn't pay for importing numba
+        import forest_engine
+        model = forest_engine.load_or_export_forest(model_path, os.path.join(model_dir, 'random_forest_flat.joblib'))
+    elif engine == 'compact':
+        import forest_compaction
+        compact_path = os.path.join(model_dir, forest_compaction.COMPACT_FILENAME)
+        # Compaction settings are a choice (trees, depth, tolerance), so a missing or stale file isn't rebuilt here
+        if not os.path.exists(compact_path) or os.path.getmtime(compact_path) < os.path.getmtime(model_path):
+            raise FileNotFoundError(f"{compact_path} is missing or older than {model_path}, "
+                                    f"run python forest_compaction.py --model {model_path} --output {compact_path}")
+        model = forest_compaction.load_compact_forest(compact_path)
+    else:
+        model = joblib.load(model_path, mmap_mode=mmap_mode)
+    vectorizer = joblib.load(vectorizer_path, mmap_mode=mmap_mode)
+    reducer_path = os.path.join(model_dir, REDUCER_FILENAME)
+    if os.path.exists(reducer_path):
+        # The forest was trained on reduced features, chain the reducer so callers still just call transform
+        vectorizer = Pipeline([('vectorizer', vectorizer), ('reducer', joblib.load(reducer_path, mmap_mode=mmap_mode))])
+    label_encoder = joblib.load(label_encoder_path)
     return model, vectorizer, label_encoder
 
 def get_text_sentiment(text, model, vectorizer, label_encoder):
@@ -26,8 +140,70 @@ def get_text_sentiment(text, model, vectorizer, label_encoder):
     score = (probabilities[0] * 0 + probabilities[1] * 5 + probabilities[2] * 10)
     return score
 
+def get_text_probabilities_batch(texts, model, vectorizer, batch_size=BATCH_SIZE):
+    """Predict class probabilities for many texts, transforming and predicting one block of rows at a time"""
+    texts = list(texts)
+    probabilities = np.empty((len(texts), len(model.classes_)))
+    for start in range(0, len(texts), batch_size):
+        text_features = vectorizer.transform(texts[start:start + batch_size])
+        probabilities[start:start + batch_size] = model.predict_proba(text_features)
+    return probabilities
+
+def probabilities_to_score(probabilities):
+    """Weighted 0-10 score for each row of class probabilities (Negative, Neutral, Positive)"""
+    # Same weighting (and order of operations) as get_text_sentiment so scores match exactly
+    return probabilities[:, 0] * 0 + probabilities[:, 1] * 5 + probabilities[:, 2] * 10
+
+def get_text_sentiment_batch(texts, model, vectorizer, label_encoder, batch_size=BATCH_SIZE):
+    """Vectorized version of get_text_sentiment, returns an array with one 0-10 score per text"""
+    probabilities = get_text_probabilities_batch(texts, model, vectorizer, batch_size)
+    return probabilities_to_score(probabilities)
+
+def _init_scoring_worker(engine, model_dir=MODEL_DIR):
+    """Make the models available in a scoring worker process"""
+    global _worker_models
+    if _worker_models is None:
+        # Not forked from the parent: memory-map the model arrays rather than reading a private copy
+        _worker_models = load_models(mmap_mode='r', engine=engine, model_dir=model_dir)
+    if engine in ('flat', 'compact'):
+        # The pool already provides the parallelism, keep each worker's kernel single-threaded
+        _worker_models[0].parallel = False
+
+def _score_shard(texts):
+    model, vectorizer, _ = _worker_models
+    return get_text_probabilities_batch(texts, model, vectorizer)
+
+def make_scoring_pool(model, vectorizer, label_encoder, n_jobs=-1, engine='sklearn', model_dir=MODEL_DIR):
+    """Create a process pool for get_text_probabilities_parallel.
+    
+    Where fork is available the workers inherit the models already loaded in this process, so all of
+    them share one read-only copy through copy-on-write pages and nothing is unpickled per worker.
+    Elsewhere each worker loads model_dir once with mmap_mode='r' (with engine='flat' that maps the
+    whole forest, so every worker reads the same pages)."""
+    global _worker_models
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count()
+    if 'fork' in multiprocessing.get_all_start_methods():
+        _worker_models = (model, vectorizer, label_encoder)
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=n_jobs, mp_context=context, initializer=_init_scoring_worker,
+                               initargs=(engine, model_dir))
+
+def get_text_probabilities_parallel(texts, model, pool, shard_size=BATCH_SIZE):
+    """Split texts into shards, predict them across the pool and return the probabilities in input order.
+    model is the one the pool's workers score with (its classes_ give the shape of an empty result)."""
+    texts = list(texts)
+    shards = [texts[start:start + shard_size] for start in range(0, len(texts), shard_size)]
+    if not shards:
+        return np.empty((0, len(model.classes_)))
+    return np.vstack(list(pool.map(_score_shard, shards)))
+
 def combine_scores(text_score, rating, weight_text=0.7):
-    """Combine text-based sentiment score with numerical rating with default weight of 0.7*text + 0.3*rating"""
+    """Combine text-based sentiment score with numerical rating with default weight of 0.7*text + 0.3*rating
+    
+    Works on single values as well as whole arrays/Series of scores and ratings."""
     # Convert rating to 0-10 scale
     rating_normalized = (rating / 5) * 10
     
@@ -44,86 +220,331 @@ def score_to_sentiment(score):
     else:
         return 'Positive'
 
-def main():
-    # Load the trained models
-    print("Loading models...")
-    model, vectorizer, label_encoder = load_models()
+def get_text_probabilities_cached(texts, model, vectorizer, cache, batch_size=BATCH_SIZE, pool=None):
+    """Batch scoring through a PredictionCache.
     
-    # Load the feedback data
-    print("Loading feedback data...")
-    feedback_df = pd.read_csv('clean-data/feedback_data_with_company.csv')
+    Texts are normalized and deduplicated first, cached unique texts are looked up and only the
+    remaining ones are sent to the model (and then added to the cache)."""
+    normalized = pd.Series([normalize_text(text, getattr(vectorizer, 'lowercase', False)) for text in texts],
+                           dtype=object)
+    codes, unique_texts = pd.factorize(normalized)
+    keys = [cache.key(text) for text in unique_texts]
     
-    # Handle NaN values in Feedback column
-    print("Handling missing values...")
-    feedback_df['Feedback'] = feedback_df['Feedback'].fillna('')
-    
-    # Calculate text-only sentiment scores
-    print("Calculating text-only sentiment scores...")
-    feedback_df['text_sentiment'] = feedback_df['Feedback'].apply(
-        lambda x: get_text_sentiment(x, model, vectorizer, label_encoder)
-    )
+    unique_probabilities = np.empty((len(unique_texts), len(model.classes_)))
+    cached = cache.get_many(keys)
+    missing = []
+    for i, key in enumerate(keys):
+        if key in cached:
+            unique_probabilities[i] = cached[key][0]
+        else:
+            missing.append(i)
     
-    # Calculate combined scores (text + rating)
-    print("Calculating combined sentiment scores...")
-    feedback_df['combined_sentiment'] = feedback_df.apply(
-        lambda row: combine_scores(row['text_sentiment'], row['Rating']),
-        axis=1
-    )
+    if missing:
+        missing_texts = [unique_texts[i] for i in missing]
+        if pool is not None:
+            missing_probabilities = get_text_probabilities_parallel(missing_texts, model, pool, batch_size)
+        else:
+            missing_probabilities = get_text_probabilities_batch(missing_texts, model, vectorizer, batch_size)
+        unique_probabilities[missing] = missing_probabilities
+        cache.put_many([keys[i] for i in missing], missing_probabilities,
+                       probabilities_to_score(missing_probabilities))
     
-    # Convert scores to sentiment categories
-    feedback_df['text_sentiment_class'] = feedback_df['text_sentiment'].apply(score_to_sentiment)
-    feedback_df['combined_sentiment_class'] = feedback_df['combined_sentiment'].apply(score_to_sentiment)
+    return unique_probabilities[codes]
+
+def score_to_sentiment_batch(scores):
+    """Vectorized version of score_to_sentiment"""
+    scores = np.asarray(scores, dtype=float)
+    return np.select([scores < 4.5, scores < 6], ['Negative', 'Neutral'], default='Positive')
+
+def score_feedback(feedback_df, model, vectorizer, label_encoder, batch_size=BATCH_SIZE, pool=None, cache=None):
+    """Add text/combined sentiment scores and classes to a feedback DataFrame using the batch scoring path
     
-    # Save the results
-    output_path = 'clean-data/feedback_data_with_sentiment.csv'
-    print(f"Saving results to {output_path}...")
-    feedback_df.to_csv(output_path, index=False)
-    print("Done!")
+    If a pool from make_scoring_pool is given the text scoring is sharded across its worker processes,
+    and with a PredictionCache repeated and previously seen texts are not scored again."""
+    if cache is not None:
+        probabilities = get_text_probabilities_cached(feedback_df['Feedback'], model, vectorizer, cache,
+                                                      batch_size, pool)
+    elif pool is not None:
+        probabilities = get_text_probabilities_parallel(feedback_df['Feedback'], model, pool, batch_size)
+    else:
+        probabilities = get_text_probabilities_batch(feedback_df['Feedback'], model, vectorizer, batch_size)
+    return add_score_columns(feedback_df, probabilities)
+
+def add_score_columns(feedback_df, probabilities):
+    """Add the SCORE_COLUMNS computed from the text class probabilities (Negative, Neutral, Positive) and Rating"""
+    feedback_df['text_sentiment'] = probabilities_to_score(probabilities)
+    feedback_df['combined_sentiment'] = combine_scores(
+        feedback_df['text_sentiment'].to_numpy(), feedback_df['Rating'].to_numpy()
+    )
+    feedback_df['text_sentiment_class'] = score_to_sentiment_batch(feedback_df['text_sentiment'])
+    feedback_df['combined_sentiment_class'] = score_to_sentiment_batch(feedback_df['combined_sentiment'])
+    return feedback_df
+
+def sample_sentiment_differences(feedback_df, current_sample=None, n=10):
+    """Keep a uniform random sample of rows whose text-only and combined classes differ.
     
-    # Save examples where text and combined sentiments differ
-    print("\nFinding examples of sentiment differences...")
+    Can be called once per chunk: each candidate gets a random key and the n smallest keys are kept,
+    so the result is a uniform sample over everything seen so far."""
     different_sentiments = feedback_df[feedback_df['text_sentiment_class'] != feedback_df['combined_sentiment_class']]
-    if len(different_sentiments) > 0:
-        examples = different_sentiments.sample(min(10, len(different_sentiments)))
-        examples = examples[['Feedback', 'Rating', 'text_sentiment', 'text_sentiment_class', 
-                           'combined_sentiment', 'combined_sentiment_class']]
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        examples_file = f"visuals/sentiment_differences_{timestamp}.txt"
-        with open(examples_file, 'w', encoding='utf-8') as f:
-            f.write("Examples where Text Sentiment differs from Combined Sentiment\n")
-            f.write("=====================================================\n\n")
-            for idx, row in examples.iterrows():
-                f.write(f"Example {idx + 1}:\n")
-                f.write(f"Feedback: {row['Feedback']}\n")
-                f.write(f"Rating: {row['Rating']}\n")
-                f.write(f"Text-only sentiment: {row['text_sentiment_class']} (score: {row['text_sentiment']:.2f})\n")
-                f.write(f"Combined sentiment: {row['combined_sentiment_class']} (score: {row['combined_sentiment']:.2f})\n")
-                f.write("-" * 80 + "\n\n")
-        print(f"Saved {len(examples)} example differences to {examples_file}")
-    
-    # Print some statistics
+    candidates = different_sentiments[['Feedback', 'Rating', 'text_sentiment', 'text_sentiment_class',
+                                       'combined_sentiment', 'combined_sentiment_class']].copy()
+    candidates['sample_key'] = np.random.random(len(candidates))
+    if current_sample is not None:
+        candidates = pd.concat([current_sample, candidates])
+    return candidates.nsmallest(n, 'sample_key')
+
+def save_sentiment_differences(examples):
+    """Save examples where text and combined sentiments differ to visuals/"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    examples_file = f"visuals/sentiment_differences_{timestamp}.txt"
+    with open(examples_file, 'w', encoding='utf-8') as f:
+        f.write("Examples where Text Sentiment differs from Combined Sentiment\n")
+        f.write("=====================================================\n\n")
+        for idx, row in examples.iterrows():
+            f.write(f"Example {idx + 1}:\n")
+            f.write(f"Feedback: {row['Feedback']}\n")
+            f.write(f"Rating: {row['Rating']}\n")
+            f.write(f"Text-only sentiment: {row['text_sentiment_class']} (score: {row['text_sentiment']:.2f})\n")
+            f.write(f"Combined sentiment: {row['combined_sentiment_class']} (score: {row['combined_sentiment']:.2f})\n")
+            f.write("-" * 80 + "\n\n")
+    print(f"Saved {len(examples)} example differences to {examples_file}")
+
+def save_sentiment_stats(text_counts, combined_counts):
+    """Print the sentiment class distribution and save it to visuals/"""
     print("\nSentiment Class Distribution:")
     print("\nText-only sentiment classes:")
-    print(feedback_df['text_sentiment_class'].value_counts())
+    print(text_counts)
     print("\nCombined sentiment classes:")
-    print(feedback_df['combined_sentiment_class'].value_counts())
+    print(combined_counts)
     
-    # Save statistics to file
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     stats_file = f"visuals/sentiment_stats_{timestamp}.txt"
     with open(stats_file, 'w') as f:
         f.write("Sentiment Class Distribution\n")
         f.write("==========================\n\n")
         f.write("Text-only Sentiment Classes:\n")
-        f.write(feedback_df['text_sentiment_class'].value_counts().to_string())
+        f.write(text_counts.to_string())
         f.write("\n\nCombined Sentiment Classes:\n")
-        f.write(feedback_df['combined_sentiment_class'].value_counts().to_string())
+        f.write(combined_counts.to_string())
+
+def add_counts(running_counts, new_counts):
+    """Add one chunk's value_counts to a running total"""
+    if running_counts is None:
+        return new_counts
+    return running_counts.add(new_counts, fill_value=0).astype(int).sort_values(ascending=False)
+
+def score_csv_in_chunks(input_path, output_path, model, vectorizer, label_encoder,
+                        chunksize=CHUNK_SIZE, batch_size=BATCH_SIZE, pool=None, cache=None, timer=None):
+    """Score a feedback CSV chunk by chunk, appending each scored chunk to output_path
+    (CSV, Parquet or Arrow, by its suffix).
+    
+    Only one chunk is held in memory at a time, so peak memory depends on chunksize and not on the
+    size of the input. Every finished chunk is already on disk if the run is interrupted.
+    Yields the scored chunks so callers can keep running statistics."""
+    timer = timer or StageTimer(enabled=False)
+    start_time = time.perf_counter()
+    rows_scored = 0
+    chunks = pd.read_csv(input_path, chunksize=chunksize)
+    with ScoredWriter(output_path) as writer:
+        while True:
+            with timer.stage('read_input') as stage:
+                chunk = next(chunks, None)
+                stage.rows = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                break
+            with timer.stage('score', rows=len(chunk)):
+                chunk['Feedback'] = chunk['Feedback'].fillna('')
+                chunk = score_feedback(chunk, model, vectorizer, label_encoder, batch_size, pool, cache)
+            with timer.stage('write_output', rows=len(chunk)):
+                writer.write(chunk)
+            
+            rows_scored += len(chunk)
+            elapsed = time.perf_counter() - start_time
+            print(f"Scored {rows_scored:,} rows ({rows_scored / elapsed:,.0f} rows/sec)")
+            yield chunk
+
+def row_hashes(feedback_df, id_columns=ID_COLUMNS):
+    """64-bit identity and content hashes for each feedback row.
+    
+    The identity hash covers the id columns plus a running count so repeated ids stay distinct,
+    the content hash covers the scoring inputs (Feedback and Rating)."""
+    id_columns = [col for col in id_columns if col in feedback_df.columns]
+    if id_columns:
+        ids = feedback_df[id_columns].astype(str)
+        ids['occurrence'] = ids.groupby(id_columns).cumcount()
+    else:
+        ids = pd.DataFrame({'position': np.arange(len(feedback_df))})
+    row_ids = pd.util.hash_pandas_object(ids, index=False).to_numpy()
+    content_hashes = pd.util.hash_pandas_object(feedback_df[['Feedback', 'Rating']], index=False).to_numpy()
+    return row_ids, content_hashes
+
+def manifest_path_for(output_path):
+    output_path = Path(output_path)
+    if output_path.suffix == '.csv':
+        return output_path.with_suffix('.manifest.npz')
+    # Keep one manifest per output format
+    return output_path.with_suffix(f'{output_path.suffix}.manifest.npz')
+
+def load_manifest(output_path, fingerprint):
+    """Row hashes of the previous scored output, or None if it can't be reused
+    (missing, written by other model artifacts, or out of sync with the output file)"""
+    manifest_path = manifest_path_for(output_path)
+    if not manifest_path.exists() or not Path(output_path).exists():
+        return None
+    manifest = np.load(manifest_path)
+    if str(manifest['model_fingerprint']) != fingerprint:
+        print("Model artifacts changed since the last run, rescoring everything...")
+        return None
+    if int(manifest['output_size']) != os.path.getsize(output_path):
+        print(f"{output_path} does not match its manifest, rescoring everything...")
+        return None
+    return manifest
+
+def save_manifest(output_path, row_ids, content_hashes, fingerprint):
+    """Record the rows of a freshly written output file (call after the output is written)"""
+    np.savez(manifest_path_for(output_path), row_ids=row_ids, content_hashes=content_hashes,
+             model_fingerprint=np.array(fingerprint), output_size=np.array(os.path.getsize(output_path)))
+
+def score_incrementally(feedback_df, output_path, model, vectorizer, label_encoder,
+                        batch_size=BATCH_SIZE, pool=None, cache=None, model_dir=MODEL_DIR):
+    """Score only the rows that are new or changed since the last run and write output_path.
+    
+    A manifest next to the output records each row's identity and content hash and the fingerprint
+    of the model artifacts. Rows whose identity and content are unchanged reuse their previous scores,
+    everything is rescored when the model artifacts change. Reading and hashing the input is still a
+    full pass, but that is cheap next to the model, so the run time follows the size of the delta."""
+    fingerprint = artifact_fingerprint(model_artifacts(model_dir))
+    row_ids, content_hashes = row_hashes(feedback_df)
+    current = pd.DataFrame({'row_id': row_ids, 'content_hash': content_hashes})
+    
+    manifest = load_manifest(output_path, fingerprint)
+    if manifest is not None:
+        previous = pd.DataFrame({'row_id': manifest['row_ids'], 'content_hash': manifest['content_hashes'],
+                                 'previous_position': np.arange(len(manifest['row_ids']))})
+        positions = current.merge(previous, how='left', on=['row_id', 'content_hash'])['previous_position']
+        reuse = positions.notna().to_numpy()
+    else:
+        reuse = np.zeros(len(feedback_df), dtype=bool)
+    
+    n_new = int((~reuse).sum())
+    print(f"Reusing {int(reuse.sum()):,} scored rows, scoring {n_new:,} new or changed rows...")
+    
+    for col in SCORE_COLUMNS:
+        feedback_df[col] = np.nan if col.endswith('sentiment') else ''
+    if reuse.any():
+        previous_scores = read_scored(output_path, columns=SCORE_COLUMNS, float_precision='round_trip')
+        reuse_positions = positions[reuse].astype(int).to_numpy()
+        for col in SCORE_COLUMNS:
+            feedback_df.loc[reuse, col] = previous_scores[col].to_numpy()[reuse_positions]
+    if n_new:
+        delta = score_feedback(feedback_df.loc[~reuse, ['Feedback', 'Rating']].copy(),
+                               model, vectorizer, label_encoder, batch_size, pool, cache)
+        for col in SCORE_COLUMNS:
+            feedback_df.loc[~reuse, col] = delta[col].to_numpy()
+    
+    print(f"Saving results to {output_path}...")
+    write_scored(feedback_df, output_path)
+    save_manifest(output_path, row_ids, content_hashes, fingerprint)
+    return feedback_df
+
+def main(stream=False, chunksize=CHUNK_SIZE, n_jobs=1, cache_path=None, incremental=False, fast_start=False,
+         engine='sklearn', output_format='csv', timer=None, model_dir=MODEL_DIR):
+    # Per-stage timing/memory report, disabled unless a timer is passed in
+    timer = timer or StageTimer(enabled=False)
+    
+    # Load the trained models
+    print("Loading models...")
+    with timer.stage('load_models'):
+        model, vectorizer, label_encoder = load_models(fast_start=fast_start, engine=engine, model_dir=model_dir)
+    
+    # Optionally shard the scoring across several processes
+    pool = None
+    if n_jobs != 1:
+        n_jobs = n_jobs if n_jobs > 0 else os.cpu_count()
+        print(f"Scoring with {n_jobs} worker processes...")
+        with timer.stage('start_workers'):
+            pool = make_scoring_pool(model, vectorizer, label_encoder, n_jobs, engine, model_dir)
+    
+    # Optionally reuse predictions for texts scored by earlier runs with the same model artifacts
+    cache = None
+    if cache_path is not None:
+        cache = PredictionCache(cache_path, artifact_fingerprint(model_artifacts(model_dir)))
+        print(f"Using prediction cache {cache_path} ({cache.size:,} entries)")
+    
+    input_path = 'clean-data/feedback_data_with_company.csv'
+    output_path = output_path_for('clean-data/feedback_data_with_sentiment.csv', output_format)
+    
+    if stream:
+        # Read, score and write one chunk at a time, keeping only running statistics in memory
+        print(f"Streaming feedback data from {input_path} to {output_path} in chunks of {chunksize:,} rows...")
+        text_counts, combined_counts, examples = None, None, None
+        manifest_path_for(output_path).unlink(missing_ok=True)
+        for chunk in score_csv_in_chunks(input_path, output_path, model, vectorizer, label_encoder,
+                                         chunksize, pool=pool, cache=cache, timer=timer):
+            text_counts = add_counts(text_counts, chunk['text_sentiment_class'].value_counts())
+            combined_counts = add_counts(combined_counts, chunk['combined_sentiment_class'].value_counts())
+            examples = sample_sentiment_differences(chunk, examples)
+        print("Done!")
+    else:
+        # Load the feedback data
+        print("Loading feedback data...")
+        with timer.stage('read_input') as stage:
+            feedback_df = pd.read_csv(input_path)
+            stage.rows = len(feedback_df)
+        
+        # Handle NaN values in Feedback column
+        print("Handling missing values...")
+        feedback_df['Feedback'] = feedback_df['Feedback'].fillna('')
+        
+        if incremental:
+            # Only score rows added or changed since the previous run (includes reading and writing the output)
+            with timer.stage('score_incremental', rows=len(feedback_df)):
+                feedback_df = score_incrementally(feedback_df, output_path, model, vectorizer, label_encoder,
+                                                  pool=pool, cache=cache, model_dir=model_dir)
+        else:
+            # Calculate text-only and combined (text + rating) scores in batches
+            print("Calculating sentiment scores...")
+            with timer.stage('score', rows=len(feedback_df)):
+                feedback_df = score_feedback(feedback_df, model, vectorizer, label_encoder, pool=pool, cache=cache)
+            
+            # Save the results, with a manifest so the next run can be incremental
+            print(f"Saving results to {output_path}...")
+            with timer.stage('write_output', rows=len(feedback_df)):
+                write_scored(feedback_df, output_path)
+                save_manifest(output_path, *row_hashes(feedback_df), artifact_fingerprint(model_artifacts(model_dir)))
+        print("Done!")
+        
+        with timer.stage('summarize', rows=len(feedback_df)):
+            text_counts = feedback_df['text_sentiment_class'].value_counts()
+            combined_counts = feedback_df['combined_sentiment_class'].value_counts()
+            examples = sample_sentiment_differences(feedback_df)
+    
+    if pool is not None:
+        pool.shutdown()
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Prediction cache: {stats['hits']:,} hits, {stats['misses']:,} misses "
+              f"({stats['hit_rate']:.1%} hit rate), {stats['entries']:,} entries")
+        cache.close()
+    
+    # Save examples where text and combined sentiments differ
+    print("\nFinding examples of sentiment differences...")
+    if examples is not None and len(examples) > 0:
+        save_sentiment_differences(examples)
+    
+    # Print and save some statistics
+    if text_counts is not None:
+        save_sentiment_stats(text_counts, combined_counts)
+    
+    timer.print_report()
+    timer.save()
 
 
-  """ Ran into some issues with seaborn  
+    """ Ran into some issues with seaborn  
 
     # Create visualizations
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     plt.style.use('seaborn')
    
     # Bar plot of text sentiment classes
@@ -164,4 +585,41 @@ def main():
 """
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Score feedback sentiment with the trained TF-IDF model")
+    parser.add_argument('--stream', action='store_true',
+                        help="read, score and write the input in fixed-size chunks (bounded memory)")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE,
+                        help="rows per chunk in streaming mode")
+    parser.add_argument('--n-jobs', type=int, default=1,
+                        help="number of scoring processes (-1 for all cores)")
+    parser.add_argument('--cache', nargs='?', const=CACHE_PATH, default=None, metavar='PATH',
+                        help=f"reuse predictions from a persistent cache (default path: {CACHE_PATH})")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only score rows that are new or changed since the last run")
+    parser.add_argument('--model-dir', default=MODEL_DIR,
+                        help="directory with the model artifacts, e.g. models/online for the out-of-core SGD model")
+    parser.add_argument('--fast-start', action='store_true',
+                        help=f"load the memory-mapped bundle <model dir>/{FAST_START_FILENAME} if it is up to date")
+    parser.add_argument('--export-fast-start', action='store_true',
+                        help=f"write <model dir>/{FAST_START_FILENAME} from the artifacts in the model dir and exit")
+    parser.add_argument('--engine', choices=['sklearn', 'flat', 'compact'], default='sklearn',
+                        help="forest implementation: sklearn, the array-backed engine in forest_engine.py, "
+                             "or its compacted version from forest_compaction.py")
+    parser.add_argument('--output-format', choices=list(OUTPUT_FORMATS), default='csv',
+                        help="file format of the scored output (parquet and arrow need pyarrow)")
+    parser.add_argument('--report', nargs='?', const='', default=None, metavar='PATH',
+                        help="record per-stage wall/CPU time, peak RSS and rows to a .json or .csv report "
+                             "(default: reports/sentiment_scorer_<timestamp>.json)")
+    parser.add_argument('--profile-stage', default=None, metavar='STAGE',
+                        help="run one stage (e.g. score) under cProfile, saved next to the report")
+    args = parser.parse_args()
+    if args.export_fast_start:
+        export_fast_start_artifacts(args.model_dir)
+        raise SystemExit
+    if args.stream and args.incremental:
+        parser.error("--stream and --incremental can't be combined")
+    timer = StageTimer(enabled=args.report is not None or args.profile_stage is not None,
+                       profile_stage=args.profile_stage, report_path=args.report or None)
+    main(stream=args.stream, chunksize=args.chunksize, n_jobs=args.n_jobs, cache_path=args.cache,
+         incremental=args.incremental, fast_start=args.fast_start, engine=args.engine,
+         output_format=args.output_format, timer=timer, model_dir=args.model_dir)
\ No newline at end of file
@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+import pandas as pd
+import pytest
+
+# Run from the repo root: python -m pytest tests
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+import sentiment_scorer
+
+MODEL_DIR = REPO_ROOT / 'models'
+FEEDBACK_PATH = REPO_ROOT / 'clean-data/feedback_data_cleaned.csv'
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    """The scripts read models/, clean-data/ and External_Datasets/ relative to the repo root"""
+    monkeypatch.chdir(REPO_ROOT)
+    return REPO_ROOT
+
+@pytest.fixture(scope='session')
+def models():
+    """(model, vectorizer, label encoder) of the trained forest in models/"""
+    return sentiment_scorer.load_models(model_dir=str(MODEL_DIR))
+
+@pytest.fixture
+def feedback():
+    return pd.read_csv(FEEDBACK_PATH)
+
+@pytest.fixture(scope='session')
+def reduced_model_dir(tmp_path_factory):
+    """A small forest trained on chi2-reduced TF-IDF features, exported by TF_IDF_model.py's stages"""
+    from sklearn.ensemble import RandomForestClassifier
+    import TF_IDF_model
+
+    model_dir = tmp_path_factory.mktemp('reduced_models')
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(REPO_ROOT)
+        combined_data, le, labels = TF_IDF_model.load_data()
+        tfidf, features = TF_IDF_model.vectorize(combined_data['Feedback'])
+    train_index, test_index = TF_IDF_model.split_indices(labels, seed=0)
+    feature_reducer, X_train, _ = TF_IDF_model.reduce_features(features[train_index], labels[train_index],
+                                                               features[test_index], ('chi2', 200), seed=0)
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X_train, labels[train_index])
+    TF_IDF_model.export_models(model, tfidf, le, feature_reducer, seed=0, model_dir=str(model_dir))
+    return model_dir
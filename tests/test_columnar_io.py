@@ -0,0 +1,21 @@
+import pandas as pd
+import pytest
+from columnar_io import read_scored, with_columnar_dtypes, write_scored
+
+def test_parquet_and_arrow_read_back_identically(models, feedback, tmp_path):
+    import sentiment_scorer
+    model, vectorizer, label_encoder = models
+    scored = sentiment_scorer.score_feedback(feedback, model, vectorizer, label_encoder)
+    scored['Company Name'] = scored['UserId'].str.split('@').str[-1]
+
+    frames = {}
+    for suffix in ['.parquet', '.arrow']:
+        path = tmp_path / f'scored{suffix}'
+        write_scored(scored, path)
+        frames[suffix] = read_scored(path)
+    pd.testing.assert_frame_equal(frames['.parquet'], frames['.arrow'])
+    pd.testing.assert_frame_equal(frames['.parquet'], with_columnar_dtypes(scored))
+
+def test_unknown_class_labels_are_rejected():
+    with pytest.raises(ValueError, match="LABEL_0"):
+        with_columnar_dtypes(pd.DataFrame({'predicted_sentiment': ['LABEL_0', 'Neutral']}))
@@ -0,0 +1,22 @@
+import numpy as np
+import forest_compaction
+import forest_engine
+import sentiment_scorer
+
+def test_reduced_model_scores_end_to_end(reduced_model_dir, feedback):
+    model, vectorizer, label_encoder = sentiment_scorer.load_models(model_dir=str(reduced_model_dir))
+    features = vectorizer.transform(feedback['Feedback'].fillna(''))
+    assert features.shape[1] == model.n_features_in_ == 200
+    assert len(vectorizer.get_feature_names_out()) == model.n_features_in_
+
+    scored = sentiment_scorer.score_feedback(feedback, model, vectorizer, label_encoder)
+    assert scored['text_sentiment'].between(0, 10).all()
+
+    expected = model.predict_proba(features)
+    flat_forest = forest_engine.FlatForest.from_sklearn(model)
+    assert np.abs(flat_forest.predict_proba(features) - expected).max() <= 1e-9
+    compact_forest = forest_compaction.compact_forest(model)
+    assert np.abs(compact_forest.predict_proba(features) - expected).max() <= 1e-6
+
+def test_reduced_model_records_its_training_seed(reduced_model_dir):
+    assert forest_compaction.confirmed_seed(str(reduced_model_dir)) == 0
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+import forest_engine
+
+@pytest.fixture(scope='module')
+def features(models):
+    import pandas as pd
+    from conftest import REPO_ROOT
+    _, vectorizer, _ = models
+    texts = pd.read_csv(REPO_ROOT / 'clean-data/labeled_feedback.csv')['Feedback'].fillna('')
+    return vectorizer.transform(texts)
+
+@pytest.mark.parametrize('compiled', [False, pytest.param(True, marks=pytest.mark.skipif(
+    forest_engine.njit is None, reason="numba not installed"))])
+def test_flat_forest_matches_sklearn(models, features, compiled):
+    forest = models[0]
+    flat_forest = forest_engine.FlatForest.from_sklearn(forest)
+    difference = np.abs(flat_forest.predict_proba(features, compiled=compiled) - forest.predict_proba(features))
+    assert difference.max() <= 1e-9
+
+def test_flat_forest_rejects_wrong_feature_count(models, features):
+    flat_forest = forest_engine.FlatForest.from_sklearn(models[0])
+    with pytest.raises(ValueError, match="features"):
+        flat_forest.predict_proba(features[:, :-1])
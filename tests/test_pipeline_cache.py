@@ -0,0 +1,40 @@
+import numpy as np
+import scipy.sparse as sp
+from pipeline_cache import StageCache
+
+STAGES = ['load', 'vectorize', 'train']
+
+def run_pipeline(cache_dir, calls, alpha=1.0):
+    cache = StageCache(STAGES, cache_dir=cache_dir)
+
+    def stage(name, result):
+        def compute():
+            calls.append(name)
+            return result
+        return compute
+    data = cache.run('load', {}, stage('load', np.arange(6)))
+    _, features = cache.run('vectorize', {}, stage('vectorize', ('vectorizer', sp.random(6, 4, density=0.5,
+                                                                                        format='csr', random_state=0))))
+    model = cache.run('train', {'alpha': alpha}, stage('train', features.sum() * alpha + data.sum()))
+    return cache, features, model
+
+def test_stage_cache_resumes_a_run(tmp_path):
+    calls = []
+    _, features, model = run_pipeline(tmp_path, calls)
+    assert calls == STAGES
+
+    calls.clear()
+    cache, resumed_features, resumed_model = run_pipeline(tmp_path, calls)
+    assert calls == []
+    assert cache.resumed == STAGES
+    assert resumed_model == model
+    # The sparse feature matrix is stored as .npz beside its checkpoint
+    assert list((tmp_path / 'vectorize').glob('*.npz'))
+    assert (resumed_features != features).nnz == 0
+
+def test_stage_cache_reruns_from_a_changed_stage(tmp_path):
+    calls = []
+    run_pipeline(tmp_path, calls)
+    calls.clear()
+    run_pipeline(tmp_path, calls, alpha=2.0)
+    assert calls == ['train']
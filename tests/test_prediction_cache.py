@@ -0,0 +1,35 @@
+import numpy as np
+from prediction_cache import PredictionCache
+
+def put(cache, texts):
+    keys = [cache.key(text) for text in texts]
+    cache.put_many(keys, [np.full(3, i, dtype=float) for i in range(len(keys))], [float(i) for i in range(len(keys))])
+    return keys
+
+def test_hits_and_misses(tmp_path):
+    cache = PredictionCache(tmp_path / 'cache.sqlite', 'model-a')
+    keys = put(cache, ['good', 'bad'])
+    found = cache.get_many(keys + [cache.key('unseen')])
+    assert set(found) == set(keys)
+    np.testing.assert_array_equal(found[keys[1]][0], np.ones(3))
+    assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 1
+    cache.close()
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = PredictionCache(tmp_path / 'cache.sqlite', 'model-a', max_entries=2)
+    first, second = put(cache, ['first']) + put(cache, ['second'])
+    cache.get_many([first])  # first is now more recently used than second
+    put(cache, ['third'])
+    assert set(cache.get_many([first, second, cache.key('third')])) == {first, cache.key('third')}
+    assert cache.stats()['entries'] == 2
+    cache.close()
+
+def test_other_fingerprints_are_kept(tmp_path):
+    path = tmp_path / 'cache.sqlite'
+    cache = PredictionCache(path, 'model-a')
+    keys = put(cache, ['good'])
+    cache.close()
+    PredictionCache(path, 'model-b').close()
+    cache = PredictionCache(path, 'model-a')
+    assert set(cache.get_many(keys)) == set(keys)
+    cache.close()
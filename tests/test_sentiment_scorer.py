@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import sentiment_scorer
+from conftest import MODEL_DIR
+
+def test_parallel_scoring_matches_serial(models, feedback):
+    model, vectorizer, label_encoder = models
+    texts = feedback['Feedback'].fillna('').tolist()
+    expected = sentiment_scorer.get_text_probabilities_batch(texts, model, vectorizer)
+    with sentiment_scorer.make_scoring_pool(model, vectorizer, label_encoder, n_jobs=2) as pool:
+        probabilities = sentiment_scorer.get_text_probabilities_parallel(texts, model, pool, shard_size=7)
+        empty = sentiment_scorer.get_text_probabilities_parallel([], model, pool)
+    np.testing.assert_array_equal(probabilities, expected)
+    assert empty.shape == (0, len(model.classes_))
+
+def test_incremental_rescore_matches_full_rescore(models, feedback, tmp_path):
+    model, vectorizer, label_encoder = models
+    output_path = tmp_path / 'scored.csv'
+    sentiment_scorer.score_incrementally(feedback.copy(), output_path, model, vectorizer, label_encoder,
+                                         model_dir=str(MODEL_DIR))
+
+    # Change two reviews and add one, then rescore only those
+    changed = feedback.copy()
+    changed.loc[[0, 5], 'Feedback'] = ['Terrible, it crashes every day.', 'Absolutely love the new dashboard!']
+    changed = pd.concat([changed, changed.iloc[[3]]], ignore_index=True)
+    incremental = sentiment_scorer.score_incrementally(changed.copy(), output_path, model, vectorizer, label_encoder,
+                                                       model_dir=str(MODEL_DIR))
+    full = sentiment_scorer.score_feedback(changed.copy(), model, vectorizer, label_encoder)
+
+    for col in ['text_sentiment', 'combined_sentiment']:
+        np.testing.assert_allclose(incremental[col].astype(float), full[col], rtol=1e-12)
+    for col in ['text_sentiment_class', 'combined_sentiment_class']:
+        assert incremental[col].astype(str).tolist() == full[col].astype(str).tolist()
@@ -0,0 +1,50 @@
+import os
+import shutil
+from pathlib import Path
+from pipeline_cache import stage_key
+
+'''
+summary:
+    On-disk cache of tokenized datasets for the BERT scripts. cached_map runs dataset.map(function,
+    batched=True) across num_proc worker processes and saves the result as Arrow files under
+    cache/tokenized/<key>/, where the key is a sha256 over the caller's params (the fingerprint of the
+    source CSVs, the tokenizer name and the tokenization settings, see pipeline_cache.stage_key). A rerun
+    with the same key memory-maps the saved files with load_from_disk instead of tokenizing again, so the
+    encodings are available at once and aren't copied into memory.
+'''
+
+TOKENIZATION_CACHE_DIR = 'cache/tokenized'
+
+# Below this many rows per worker, starting the worker processes costs more than it saves
+MIN_ROWS_PER_PROCESS = 10000
+
+def default_num_proc(n_rows):
+    return max(1, min(os.cpu_count() or 1, n_rows // MIN_ROWS_PER_PROCESS))
+
+def cached_map(build_dataset, function, params, cache_dir=TOKENIZATION_CACHE_DIR, enabled=True, num_proc=None,
+               fn_kwargs=None, remove_columns=None):
+    """build_dataset().map(function, batched=True), or its saved result when params match an earlier run.
+
+    build_dataset is only called on a cache miss. num_proc defaults to one process per MIN_ROWS_PER_PROCESS rows."""
+    from datasets import load_from_disk
+    path = Path(cache_dir) / stage_key('tokenize', params)
+    if enabled and path.exists():
+        print(f"Loading tokenized dataset from {path}")
+        return load_from_disk(str(path))
+
+    dataset = build_dataset()
+    num_proc = num_proc or default_num_proc(len(dataset))
+    tokenized = dataset.map(function, batched=True, num_proc=num_proc if num_proc > 1 else None,
+                            fn_kwargs=fn_kwargs, remove_columns=remove_columns)
+    if not enabled:
+        return tokenized
+    # Saved to a temporary directory first, so an interrupted run never leaves a partial dataset behind
+    temporary_path = path.with_suffix('.tmp')
+    shutil.rmtree(temporary_path, ignore_errors=True)
+    tokenized.save_to_disk(str(temporary_path))
+    if path.exists():
+        # Another run saved the same dataset in the meantime
+        shutil.rmtree(temporary_path)
+    else:
+        os.replace(temporary_path, path)
+    return load_from_disk(str(path))
@@ -4,6 +4,7 @@ const cors = require('cors');
 const csv = require('csv-parser');
 const fs = require('fs');
 const path = require('path');
+const http = require('http');
 
 const app = express();
 app.use(cors());
@@ -264,6 +265,30 @@ app.get('/api/debug/data', (req, res) => {
   });
 });
 
+// Score new feedback live through the local Python scoring service (scoring_service.py)
+const SCORING_SERVICE_PORT = process.env.SCORING_SERVICE_PORT || 8765;
+
+app.post('/api/sentiment/score', (req, res) => {
+  const body = JSON.stringify(req.body);
+  const proxyReq = http.request({
+    host: '127.0.0.1',
+    port: SCORING_SERVICE_PORT,
+    path: '/score',
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(body) }
+  }, (proxyRes) => {
+    res.status(proxyRes.statusCode);
+    res.set('Content-Type', 'application/json');
+    proxyRes.pipe(res);
+  });
+
+  proxyReq.on('error', (err) => {
+    console.error('Scoring service error:', err.message);
+    res.status(503).json({ error: 'Scoring service unavailable' });
+  });
+  proxyReq.end(body);
+});
+
 const startServer = async () => {
   const PORT = process.env.PORT || 5001; // Changed to 5001
   